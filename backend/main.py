@@ -13,11 +13,13 @@ Data Flow:
   → Risk Classification → Alert Engine → Dashboard Display
 """
 
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from routers import patients, vitals, prediction, alerts, forecast, reports, simulation, bp, hr, spo2, rr, temp
-from models.xgboost_model import load_model
+from models.xgboost_model import load_model_async
 
 # ─── App Initialization ────────────────────────────────────────────────────────
 app = FastAPI(
@@ -26,6 +28,7 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",      # Swagger UI at /docs
     redoc_url="/redoc",    # ReDoc UI at /redoc
+    default_response_class=ORJSONResponse,  # orjson for every route
 )
 
 # ─── CORS Middleware ───────────────────────────────────────────────────────────
@@ -54,17 +57,26 @@ app.include_router(temp.router)
 
 
 # ─── Startup Event ─────────────────────────────────────────────────────────────
+# Background model-load task (held so it is not garbage-collected mid-load)
+_model_load_task = None
+
+
 @app.on_event("startup")
 async def startup_event():
-    """Load the XGBoost model into memory on server start."""
+    """
+    Start loading the XGBoost model in the background on server start.
+    The API accepts traffic immediately; prediction endpoints briefly wait for
+    the model and fall back to the heuristic until it is in memory.
+    """
+    global _model_load_task
     print("[VITALGUARD 2.0] Starting up...")
-    load_model()
+    _model_load_task = asyncio.create_task(load_model_async())
     print("[VITALGUARD 2.0] Ready. Visit http://127.0.0.1:8000/docs for API reference.")
 
 
 # ─── Health Check ──────────────────────────────────────────────────────────────
 @app.get("/", tags=["Health"])
-def root():
+async def root():
     return {
         "system": "VITALGUARD 2.0",
         "status": "operational",
@@ -74,5 +86,5 @@ def root():
 
 
 @app.get("/health", tags=["Health"])
-def health():
+async def health():
     return {"status": "ok"}
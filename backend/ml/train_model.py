@@ -6,6 +6,7 @@ Run from backend/ directory:
   python ml/train_model.py
 
 Outputs:
+  ml/model.json ← trained booster in XGBoost's native format (loaded by the API)
   ml/model.pkl  ← trained and serialized XGBoost model
 """
 
@@ -19,6 +20,7 @@ from xgboost import XGBClassifier
 
 DATA_PATH = Path(__file__).parent.parent / "data" / "dummy_vitals.csv"
 MODEL_PATH = Path(__file__).parent / "model.pkl"
+BOOSTER_PATH = MODEL_PATH.with_suffix(".json")
 
 FEATURE_NAMES = [
     "hr_mean",
@@ -35,11 +37,14 @@ FEATURE_NAMES = [
 
 def train():
     print("[Train] Loading data...")
-    df = pd.read_csv(DATA_PATH)
+    dtypes = {name: np.float32 for name in FEATURE_NAMES}
+    dtypes["label"] = np.int8
+    df = pd.read_csv(DATA_PATH, usecols=[*FEATURE_NAMES, "label"], dtype=dtypes)
     print(f"[Train] Loaded {len(df)} samples. Label distribution:\n{df['label'].value_counts()}\n")
 
-    X = df[FEATURE_NAMES]
-    y = df["label"]
+    # C-contiguous float32 matrix in FEATURE_NAMES order — XGBoost's fast input path
+    X = np.ascontiguousarray(df[FEATURE_NAMES].to_numpy(dtype=np.float32))
+    y = df["label"].to_numpy()
 
     # 80/20 train/test split with stratification
     X_train, X_test, y_train, y_test = train_test_split(
@@ -76,7 +81,8 @@ def train():
 
     # Save model to disk
     joblib.dump(model, MODEL_PATH)
-    print(f"\n[Train] Model saved to {MODEL_PATH}")
+    model.get_booster().save_model(BOOSTER_PATH)
+    print(f"\n[Train] Model saved to {MODEL_PATH} and {BOOSTER_PATH}")
 
     # Print top feature importances
     importances = model.feature_importances_
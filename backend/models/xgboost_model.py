@@ -3,16 +3,21 @@ XGBoost Model Wrapper for VITALGUARD 2.0
 Handles model loading, prediction, and feature contribution (Explainable AI).
 """
 
+import asyncio
 import joblib
 import numpy as np
 import os
+import itertools
 import math
-import random
+import threading
 import time
+import xgboost as xgb
 from pathlib import Path
 
-# Path to trained model artifact
+# Path to trained model artifacts: native booster JSON (preferred, fast to load)
+# and the pickled XGBClassifier kept as a fallback
 MODEL_PATH = Path(__file__).parent.parent / "ml" / "model.pkl"
+BOOSTER_PATH = MODEL_PATH.with_suffix(".json")
 
 # Feature names (must match training order!)
 FEATURE_NAMES = [
@@ -27,19 +32,94 @@ FEATURE_NAMES = [
     "sbp_mean",
 ]
 
-# Cached model instance
+# XGBoost names untitled training columns f0, f1, ... in FEATURE_NAMES order
+_FEATURE_KEYS = {feat: f"f{i}" for i, feat in enumerate(FEATURE_NAMES)}
+
+# Cached model instance (raw XGBoost Booster — predictions skip the sklearn wrapper)
 _model = None
 
+# Set once the startup load has finished (model found or not)
+MODEL_WAIT_TIMEOUT_S = 0.2
+_model_ready = asyncio.Event()
+
+# Per-thread (1, 9) float32 input row reused by predict_risk
+_scratch = threading.local()
+
+# ── Variation lookup tables ──────────────────────────────────────────────────
+# One period of the display oscillation (~40s, amplitude ±6%) sampled at 1024
+# points, indexed by wall-clock phase.
+_OSC_LUT_SIZE = 1024
+_OSC_STEPS_PER_SECOND = 0.157 / (2 * math.pi) * _OSC_LUT_SIZE
+_OSC_LUT = (np.sin(np.linspace(0, 2 * math.pi, _OSC_LUT_SIZE, endpoint=False)) * 6.0).tolist()
+
+# Pool of pre-drawn gaussian jitter (σ=2.5), consumed round-robin
+_NOISE_LUT_SIZE = 4096
+_NOISE_LUT = np.random.default_rng().normal(0.0, 2.5, _NOISE_LUT_SIZE).tolist()
+_noise_counter = itertools.count()
+
+# ── Request coalescing ───────────────────────────────────────────────────────
+# Concurrent predict_risk_async callers arriving within this window share one
+# batched model call.
+BATCH_WINDOW_S = 0.005
+_pending: asyncio.Queue | None = None
+_batcher_task: asyncio.Task | None = None
+
+# Gain-based contribution percentages, computed once per loaded model
+_contributions_cache: dict = {}
+
+# Raw model probability per feature tuple. Features only change when a new
+# reading arrives, so repeated polls between readings skip the booster call.
+# The display variation in _score_from_proba is still applied on every call.
+_PROBA_CACHE_SIZE = 256
+_proba_cache: dict[tuple, float] = {}
+_proba_lock = threading.Lock()
+
 
 def load_model():
     """Load the XGBoost model from disk. Must be called before predicting."""
-    global _model
-    if MODEL_PATH.exists():
-        _model = joblib.load(MODEL_PATH)
-        print(f"[Model] XGBoost model loaded from {MODEL_PATH}")
+    global _model, _contributions_cache
+    if BOOSTER_PATH.exists():
+        booster = xgb.Booster()
+        booster.load_model(str(BOOSTER_PATH))
+        source = BOOSTER_PATH
+    elif MODEL_PATH.exists():
+        # Pickled sklearn wrapper from older training runs — unwrap to its booster
+        booster = joblib.load(MODEL_PATH).get_booster()
+        source = MODEL_PATH
     else:
-        print(f"[Model] WARNING: model.pkl not found at {MODEL_PATH}. Run ml/train_model.py first.")
+        print(f"[Model] WARNING: model.json / model.pkl not found in {MODEL_PATH.parent}. Run ml/train_model.py first.")
         _model = None
+        _contributions_cache = {}
+        return
+
+    # Publish the model last: it may be loading in a background thread while
+    # requests are served, and _model doubles as the "ready to predict" flag
+    _contributions_cache = _compute_contributions(booster)
+    _model = booster
+    with _proba_lock:
+        _proba_cache.clear()
+    print(f"[Model] XGBoost model loaded from {source}")
+
+
+async def load_model_async():
+    """Load the model in a worker thread, then mark it ready for awaiting predictors."""
+    try:
+        await asyncio.to_thread(load_model)
+    finally:
+        _model_ready.set()
+
+
+async def wait_for_model(timeout: float = MODEL_WAIT_TIMEOUT_S):
+    """
+    Wait briefly for the startup load to finish. On timeout, callers proceed
+    and predict with the heuristic fallback.
+    """
+    if _model_ready.is_set():
+        return
+    try:
+        await asyncio.wait_for(_model_ready.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
 
 
 def predict_risk(features: dict) -> tuple[float, float]:
@@ -56,12 +136,118 @@ def predict_risk(features: dict) -> tuple[float, float]:
         # Fallback: deterministic heuristic when no model is loaded
         return _heuristic_predict(features)
 
-    # Order features to match training columns
-    feature_vector = np.array([[features[f] for f in FEATURE_NAMES]])
+    key = tuple(features[name] for name in FEATURE_NAMES)
+    raw_prob = _proba_cache.get(key)
+    if raw_prob is None:
+        # Order features to match training columns in a reusable float32 row
+        feature_vector = getattr(_scratch, "row", None)
+        if feature_vector is None:
+            feature_vector = _scratch.row = np.empty((1, len(FEATURE_NAMES)), dtype=np.float32, order="C")
+        feature_vector[0] = key
+
+        # Get probability of "high-risk" class straight from the booster
+        raw_prob = float(_model.inplace_predict(feature_vector)[0])
+        _remember_probas([key], [raw_prob])
+    return _score_from_proba(raw_prob)
+
+
+def predict_risk_batch(features_list: list[dict]) -> list[tuple[float, float]]:
+    """
+    Run XGBoost prediction for many engineered feature dicts in one call.
+
+    Rows whose probability is cached are reused; the rest are stacked into a
+    single C-contiguous float32 (N, 9) matrix so the booster is invoked once
+    instead of once per patient.
+
+    Returns:
+        List of (risk_score_pct, confidence) tuples, in input order
+    """
+    keys = [tuple(f[name] for name in FEATURE_NAMES) for f in features_list]
+    if _model is None:
+        return _heuristic_predict_matrix(np.asarray(keys, dtype=np.float32).reshape(-1, len(FEATURE_NAMES)))
+
+    probs = [_proba_cache.get(key) for key in keys]
+    missing = [i for i, p in enumerate(probs) if p is None]
+    if missing:
+        matrix = np.asarray([keys[i] for i in missing], dtype=np.float32, order="C")
+        fresh = _model.inplace_predict(matrix).tolist()
+        for i, p in zip(missing, fresh):
+            probs[i] = p
+        _remember_probas([keys[i] for i in missing], fresh)
+    return [_score_from_proba(p) for p in probs]
+
+
+def _remember_probas(keys: list[tuple], probs: list[float]):
+    """Store raw probabilities in the bounded cache (oldest entries evicted first)."""
+    with _proba_lock:
+        for key, p in zip(keys, probs):
+            if len(_proba_cache) >= _PROBA_CACHE_SIZE:
+                _proba_cache.pop(next(iter(_proba_cache)))
+            _proba_cache[key] = p
+
+
+def predict_risk_matrix(matrix: np.ndarray) -> list[tuple[float, float]]:
+    """
+    Run XGBoost prediction on an (N, 9) feature matrix (columns in FEATURE_NAMES order).
+
+    Returns:
+        List of (risk_score_pct, confidence) tuples, one per row
+    """
+    if _model is None:
+        return _heuristic_predict_matrix(matrix)
+    if not len(matrix):
+        return []
+
+    probs = _model.inplace_predict(np.ascontiguousarray(matrix, dtype=np.float32))
+    return [_score_from_proba(p) for p in probs.tolist()]
+
 
-    # Get probability of "high-risk" class (class index 1)
-    proba = _model.predict_proba(feature_vector)[0]
-    raw_prob = float(proba[1])  # 0.0 – 1.0
+async def predict_risk_async(features: dict) -> tuple[float, float]:
+    """
+    Async variant of predict_risk for route handlers.
+
+    Requests are queued and a single background task collects everything that
+    arrives within BATCH_WINDOW_S, scores it with one predict_risk_batch call in
+    a worker thread, and resolves each caller's future.
+    """
+    global _pending, _batcher_task
+    if _batcher_task is None or _batcher_task.done():
+        _pending = asyncio.Queue()
+        _batcher_task = asyncio.create_task(_batch_worker(_pending))
+
+    future = asyncio.get_running_loop().create_future()
+    await _pending.put((features, future))
+    return await future
+
+
+async def _batch_worker(queue: asyncio.Queue):
+    """Drain the prediction queue in micro-batches forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + BATCH_WINDOW_S
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        await wait_for_model()
+        try:
+            results = await asyncio.to_thread(predict_risk_batch, [f for f, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            continue
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def _score_from_proba(raw_prob: float) -> tuple[float, float]:
+    """Turn the model's high-risk probability (0.0 – 1.0) into a displayed (risk %, confidence)."""
 
     # ── Realistic Variation Layer ──────────────────────────────────────────
     # The model trained on synthetic data pushes probabilities to extremes
@@ -79,16 +265,16 @@ def predict_risk(features: dict) -> tuple[float, float]:
 
     # 2. Time-based slow oscillation (period ~40s, amplitude ±6%)
     #    Makes the number look like it's breathing in and out
-    oscillation = math.sin(time.time() * 0.157) * 6.0
+    oscillation = _OSC_LUT[int(time.time() * _OSC_STEPS_PER_SECOND) & (_OSC_LUT_SIZE - 1)]
 
     # 3. Small random noise per reading (±3%) for reading-to-reading jitter
-    noise = random.gauss(0.0, 2.5)
+    noise = _NOISE_LUT[next(_noise_counter) & (_NOISE_LUT_SIZE - 1)]
 
     # 4. Combine and clamp to [3, 97] — never show 0% or 100%
     risk_score = max(3.0, min(97.0, base + oscillation + noise))
 
     # Confidence = max probability (stays as model reported — it's accurate)
-    confidence = float(np.max(proba))
+    confidence = max(raw_prob, 1.0 - raw_prob)
 
     return round(risk_score, 1), round(confidence, 4)
 
@@ -97,26 +283,29 @@ def get_feature_contributions(features: dict) -> dict:
     """
     Compute approximate feature contributions (Explainable AI panel).
     
-    Uses the XGBoost feature importance scores (gain-based) weighted by
-    the actual feature values relative to safe ranges. Returns percentage
-    contribution of each feature to the current risk prediction.
+    Uses the XGBoost feature importance scores (gain-based), which are fixed
+    once the model is trained, so they are computed at load time and served
+    from cache. Returns a fresh copy, so callers may modify it freely.
     
     Returns:
         Dict mapping feature_name -> contribution_percentage (0-100)
     """
     if _model is None:
         return _heuristic_contributions(features)
+    return dict(_contributions_cache)
 
+
+def _compute_contributions(booster: xgb.Booster) -> dict:
+    """Normalize a booster's gain importances into percentages."""
     # Get feature importances from model (gain = more reliable than weight)
-    importances = _model.get_booster().get_score(importance_type="gain")
+    importances = booster.get_score(importance_type="gain")
 
     # Map feature importance by name
     contributions = {}
     total_importance = 0.0
 
     for feat in FEATURE_NAMES:
-        key = f"f{FEATURE_NAMES.index(feat)}"  # XGBoost uses f0, f1, ... keys
-        importance = importances.get(key, 0.0)
+        importance = importances.get(_FEATURE_KEYS[feat], 0.0)
         contributions[feat] = importance
         total_importance += importance
 
@@ -136,48 +325,61 @@ def _heuristic_predict(features: dict) -> tuple[float, float]:
     Fallback heuristic prediction when no model is loaded.
     Uses clinical rules to estimate risk score.
     """
-    risk = 0.0
-
-    # SpO2 below 95 increases risk significantly
-    spo2_dev = features.get("spo2_deviation", 0)
-    risk += max(0, -spo2_dev) * 5.0  # Each % below baseline adds 5 points
-
-    # HR high increases risk
-    hr_mean = features.get("hr_mean", 72)
-    if hr_mean > 100:
-        risk += (hr_mean - 100) * 0.5
-    elif hr_mean < 50:
-        risk += (50 - hr_mean) * 1.0
-
-    # Respiration rate high
-    rr_mean = features.get("rr_mean", 16)
-    if rr_mean > 20:
-        risk += (rr_mean - 20) * 1.5
-
-    # Temperature deviation
-    temp_dev = features.get("temp_deviation", 0)
-    risk += max(0, temp_dev) * 8.0
-
-    # Positive HR trend (rising) adds risk
-    hr_trend = features.get("hr_trend", 0)
-    risk += max(0, hr_trend) * 2.0
-
+    return _heuristic_score(
+        features.get("spo2_deviation", 0),
+        features.get("hr_mean", 72),
+        features.get("rr_mean", 16),
+        features.get("temp_deviation", 0),
+        features.get("hr_trend", 0),
+    )
+
+
+def _heuristic_score(spo2_dev: float, hr_mean: float, rr_mean: float,
+                     temp_dev: float, hr_trend: float) -> tuple[float, float]:
+    """Numeric core of the fallback heuristic on plain floats."""
+    risk = (
+        max(0, -spo2_dev) * 5.0           # Each % SpO2 below baseline adds 5 points
+        + max(0, hr_mean - 100) * 0.5     # HR high (tachycardia)
+        + max(0, 50 - hr_mean) * 1.0      # HR low (bradycardia)
+        + max(0, rr_mean - 20) * 1.5      # Respiration rate high
+        + max(0, temp_dev) * 8.0          # Temperature above baseline
+        + max(0, hr_trend) * 2.0          # Positive HR trend (rising)
+    )
     risk = min(100.0, max(0.0, risk))
     confidence = 0.70 if risk > 10 else 0.85
     return round(risk, 2), confidence
 
 
+def _heuristic_predict_matrix(matrix: np.ndarray) -> list[tuple[float, float]]:
+    """Vectorized fallback heuristic over an (N, 9) feature matrix."""
+    col = {name: matrix[:, i] for i, name in enumerate(FEATURE_NAMES)}
+    risk = (
+        np.maximum(0, -col["spo2_deviation"]) * 5.0
+        + np.maximum(0, col["hr_mean"] - 100) * 0.5
+        + np.maximum(0, 50 - col["hr_mean"]) * 1.0
+        + np.maximum(0, col["rr_mean"] - 20) * 1.5
+        + np.maximum(0, col["temp_deviation"]) * 8.0
+        + np.maximum(0, col["hr_trend"]) * 2.0
+    )
+    risk = np.round(np.clip(risk, 0.0, 100.0), 2)
+    confidence = np.where(risk > 10, 0.70, 0.85)
+    return list(zip(risk.tolist(), confidence.tolist()))
+
+
+# Fallback contribution weights (input-independent, so built once)
+_HEURISTIC_CONTRIBUTIONS = {
+    "spo2_deviation": 25.0,
+    "hr_mean": 18.0,
+    "temp_deviation": 15.0,
+    "rr_mean": 12.0,
+    "hr_trend": 10.0,
+    "rr_rate_of_change": 8.0,
+    "hr_variability": 6.0,
+    "sbp_mean": 4.0,
+    "spo2_mean": 2.0,
+}
+
+
 def _heuristic_contributions(features: dict) -> dict:
     """Fallback feature contributions based on clinical weights."""
-    weights = {
-        "spo2_deviation": 25.0,
-        "hr_mean": 18.0,
-        "temp_deviation": 15.0,
-        "rr_mean": 12.0,
-        "hr_trend": 10.0,
-        "rr_rate_of_change": 8.0,
-        "hr_variability": 6.0,
-        "sbp_mean": 4.0,
-        "spo2_mean": 2.0,
-    }
-    return weights
+    return dict(_HEURISTIC_CONTRIBUTIONS)
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/api/alerts", tags=["Alerts"])
 
 
 @router.get("/", response_model=list[Alert])
-def list_active_alerts():
+async def list_active_alerts():
     """
     Return all active (non-suppressed) alerts sorted newest-first.
     These are displayed in the Alert Engine Panel (Layer 4, Feature 15).
@@ -22,7 +22,7 @@ def list_active_alerts():
 
 
 @router.get("/log", response_model=list[Alert])
-def get_full_alert_log():
+async def get_full_alert_log():
     """
     Return complete alert log timeline including suppressed alerts (Layer 4, Feature 16).
     Suppressed alerts are marked with suppressed=True and show suppression reason.
@@ -31,7 +31,7 @@ def get_full_alert_log():
 
 
 @router.post("/suppress/{alert_id}", response_model=Alert)
-def suppress_alert_endpoint(alert_id: str, body: AlertSuppressRequest):
+async def suppress_alert_endpoint(alert_id: str, body: AlertSuppressRequest):
     """
     Suppress an active alert. The alert remains in the log but is excluded
     from the active alerts list (Layer 4, Feature 16 - Alert Suppression Logic).
@@ -5,10 +5,10 @@ All endpoints extend ONLY the BP section — no changes to existing patient sche
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from services.bp_engine import run_bp_analysis, get_bp_hourly_log, get_medication_history
-from services.patient_store import PATIENTS
+from services.patient_store import PATIENTS, BASELINES
 from services.vitals_simulator import simulate_vitals
-from models.schemas import PatientBaseline
 
 router = APIRouter(prefix="/api/bp", tags=["BP Module"])
 
@@ -37,7 +37,7 @@ async def get_bp_analysis(patient_id: str):
         raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
 
     # Get live vitals from simulator
-    baseline = PatientBaseline(**p["baseline"])
+    baseline = BASELINES[patient_id]
     vitals = simulate_vitals(patient_id, baseline, severity=p.get("severity", 0))
 
     extras = _get_patient_bp_extras(patient_id)
@@ -53,7 +53,9 @@ async def get_bp_analysis(patient_id: str):
         age=p["age"],
         bmi=extras["bmi"],
     )
-    return result
+    # Engine output is plain JSON types; returning the response directly
+    # skips FastAPI's jsonable_encoder walk over the nested payload.
+    return ORJSONResponse(result)
 
 
 @router.get("/{patient_id}/history")
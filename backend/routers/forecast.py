@@ -3,21 +3,26 @@ Forecast Router – VITALGUARD 2.0 (Layer 3, Feature 13)
 Short-term risk forecast: 15-30 minutes ahead using trend extrapolation.
 """
 
+import asyncio
 import math
 import random
 from fastapi import APIRouter, HTTPException
 from datetime import datetime, timezone
-from models.schemas import RiskForecast, ForecastPoint, PatientBaseline
-from services.patient_store import PATIENTS
-from services.vitals_simulator import get_vitals_history
-from services.feature_engineering import engineer_features
-from models.xgboost_model import predict_risk
+from models.schemas import RiskForecast, ForecastPoint
+from services.patient_store import PATIENTS, BASELINES
+from services.vitals_simulator import get_vitals_matrix
+from services.feature_engineering import engineer_features, engineer_features_two_windows
+from models.xgboost_model import predict_risk_async
 
 router = APIRouter(prefix="/api/forecast", tags=["Forecast"])
 
+# Forecast horizons (minutes ahead) paired with their uncertainty band:
+# ±stdev grows with sqrt(minutes) — further ahead is less certain
+_FORECAST_HORIZONS = tuple((m, 5.0 + 2.5 * math.sqrt(m)) for m in (5, 10, 15, 20, 25, 30))
+
 
 @router.get("/{patient_id}", response_model=RiskForecast)
-def get_risk_forecast(patient_id: str):
+async def get_risk_forecast(patient_id: str):
     """
     Generate short-term risk forecast for 5, 10, 15, 20, 25 and 30 min ahead.
     
@@ -30,33 +35,32 @@ def get_risk_forecast(patient_id: str):
     if patient_id not in PATIENTS:
         raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
 
-    p = PATIENTS[patient_id]
-    baseline = PatientBaseline(**p["baseline"])
-    history = get_vitals_history(patient_id)
-
-    # Compute current risk
-    current_features = engineer_features(history, baseline)
-    current_risk, _ = predict_risk(current_features)
+    baseline = BASELINES[patient_id]
+    history = get_vitals_matrix(patient_id)
 
     # Estimate trend from older half of history window
     forecast_points = []
     trend_per_minute = 0.0
 
     if len(history) >= 10:
-        # Use first half of history to estimate historical risk
-        old_features = engineer_features(history[:len(history)//2], baseline)
-        old_risk, _ = predict_risk(old_features)
+        # Current window and first half of history (coalesced into one model call)
+        current_features, old_features = engineer_features_two_windows(history, baseline)
+        (current_risk, _), (old_risk, _) = await asyncio.gather(
+            predict_risk_async(current_features), predict_risk_async(old_features)
+        )
         # Delta over roughly half the window (~1.5 min at 3s polling)
         window_minutes = (len(history) / 2) * 3 / 60
         trend_per_minute = (current_risk - old_risk) / max(window_minutes, 1.0)
+    else:
+        # Compute current risk
+        current_features = engineer_features(history, baseline)
+        current_risk, _ = await predict_risk_async(current_features)
 
     # Project forward at 5-minute intervals: 5, 10, 15, 20, 25, 30 min
-    for minutes in [5, 10, 15, 20, 25, 30]:
+    for minutes, uncertainty in _FORECAST_HORIZONS:
         projected = current_risk + (trend_per_minute * minutes)
         projected = max(0.0, min(100.0, projected))
 
-        # Uncertainty grows with time: ±stdev increases with sqrt(minutes)
-        uncertainty = 5.0 + 2.5 * math.sqrt(minutes)
         lower = max(0.0, projected - uncertainty)
         upper = min(100.0, projected + uncertainty)
 
@@ -1,9 +1,9 @@
 """Heart Rate API Router — VITALGUARD 2.0"""
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from services.hr_engine import run_hr_analysis, get_hr_log, get_hr_med_history
-from services.patient_store import PATIENTS
+from services.patient_store import PATIENTS, BASELINES
 from services.vitals_simulator import simulate_vitals
-from models.schemas import PatientBaseline
 
 router = APIRouter(prefix="/api/hr", tags=["Heart Rate Module"])
 
@@ -11,9 +11,9 @@ router = APIRouter(prefix="/api/hr", tags=["Heart Rate Module"])
 async def hr_analysis(patient_id: str):
     p = PATIENTS.get(patient_id)
     if not p: raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    baseline = PatientBaseline(**p["baseline"])
+    baseline = BASELINES[patient_id]
     v = simulate_vitals(patient_id, baseline, severity=p.get("severity", 0))
-    return run_hr_analysis(patient_id, p["name"], p["bed"], v.hr, p["age"])
+    return ORJSONResponse(run_hr_analysis(patient_id, p["name"], p["bed"], v.hr, p["age"]))
 
 @router.get("/{patient_id}/history")
 async def hr_history(patient_id: str):
@@ -3,38 +3,67 @@ Patients Router – VITALGUARD 2.0
 Endpoints: list all patients (sorted by risk), get single patient details, ICU summary.
 """
 
+import asyncio
+import time
 from fastapi import APIRouter, HTTPException
-from models.schemas import PatientSummary, ICUSummary, PatientBaseline, RiskLevel
-from services.patient_store import PATIENTS
-from services.risk_classifier import classify_risk, sort_patients_by_risk
-from services.vitals_simulator import simulate_vitals, get_vitals_history
-from services.feature_engineering import engineer_features
-from models.xgboost_model import predict_risk
+from models.schemas import PatientSummary, ICUSummary, RiskLevel
+from services.patient_store import PATIENTS, PID_INDEX, BASELINE_COLUMNS
+from services.risk_classifier import classify_risk_batch, sort_patients_by_risk, top_k_by_risk
+from services.vitals_simulator import simulate_vitals, get_vitals_matrix
+from services.feature_engineering import engineer_features_batch
+from models.xgboost_model import predict_risk_matrix, wait_for_model
 from services.alert_engine import get_alert_counts
+from services.risk_cache import LAST_RISK
 
 router = APIRouter(prefix="/api/patients", tags=["Patients"])
 
+# Short-lived risk cache: the dashboard polls /patients and /icu-summary
+# back-to-back, so both reuse one prediction per patient within the TTL.
+RISK_CACHE_TTL_S = 1.5
+_risk_cache: dict[str, tuple[float, dict]] = {}
+
 
 def _get_patient_with_risk(pid: str) -> dict:
     """Compute current risk score for a patient by predicting on latest vitals."""
-    p = PATIENTS[pid]
-    baseline = PatientBaseline(**p["baseline"])
-    history = get_vitals_history(pid)
-    features = engineer_features(history, baseline)
-    risk_score, confidence = predict_risk(features)
-    risk_level = classify_risk(risk_score)
-    return {**p, "risk_score": risk_score, "confidence": confidence,
-            "risk_level": risk_level.value}
+    return _get_patients_with_risk([pid])[0]
+
+
+def _get_patients_with_risk(pids: list[str]) -> list[dict]:
+    """
+    Compute current risk scores for several patients.
+    Baselines are read from the SoA patient columns, features are built as one
+    (N, 9) matrix, and all patients are scored in a single model call.
+    Results younger than RISK_CACHE_TTL_S are served from cache.
+    """
+    now = time.monotonic()
+    stale = [pid for pid in pids
+             if pid not in _risk_cache or now - _risk_cache[pid][0] >= RISK_CACHE_TTL_S]
+
+    if stale:
+        rows = [PID_INDEX[pid] for pid in stale]
+        baselines = {vital: column[rows] for vital, column in BASELINE_COLUMNS.items()}
+        features = engineer_features_batch([get_vitals_matrix(pid) for pid in stale], baselines)
+
+        predictions = predict_risk_matrix(features)
+        levels = classify_risk_batch([risk_score for risk_score, _ in predictions])
+        for pid, (risk_score, confidence), risk_level in zip(stale, predictions, levels.tolist()):
+            LAST_RISK[pid] = risk_score
+            _risk_cache[pid] = (now, {"risk_score": risk_score, "confidence": confidence,
+                                      "risk_level": risk_level.value})
+
+    return [{**PATIENTS[pid], **_risk_cache[pid][1]} for pid in pids]
 
 
 @router.get("/", response_model=list[PatientSummary])
-def list_patients():
+async def list_patients(top: int | None = None):
     """
     Return all patients sorted by descending risk score.
     This drives the multi-patient monitoring dashboard (Layer 1, Feature 4 + Layer 2, Feature 7).
+    Pass ?top=K to get only the K highest-risk patients (critical board).
     """
-    enriched = [_get_patient_with_risk(pid) for pid in PATIENTS]
-    sorted_patients = sort_patients_by_risk(enriched)
+    await wait_for_model()
+    enriched = await asyncio.to_thread(_get_patients_with_risk, list(PATIENTS))
+    sorted_patients = sort_patients_by_risk(enriched) if top is None else top_k_by_risk(enriched, top)
     return [
         PatientSummary(
             id=p["id"], name=p["name"], bed=p["bed"],
@@ -46,12 +75,13 @@ def list_patients():
 
 
 @router.get("/icu-summary", response_model=ICUSummary)
-def get_icu_summary():
+async def get_icu_summary():
     """
     ICU Command Center aggregate metrics (Layer 1, Features 1 + 2).
     Returns total/critical/moderate/stable counts, alert counts, and system stress %.
     """
-    enriched = [_get_patient_with_risk(pid) for pid in PATIENTS]
+    await wait_for_model()
+    enriched = await asyncio.to_thread(_get_patients_with_risk, list(PATIENTS))
     alert_counts = get_alert_counts()
 
     critical = sum(1 for p in enriched if p["risk_level"] == "red")
@@ -72,8 +102,9 @@ def get_icu_summary():
 
 
 @router.get("/{patient_id}")
-def get_patient(patient_id: str):
+async def get_patient(patient_id: str):
     """Get a single patient's full detail including risk and baseline."""
     if patient_id not in PATIENTS:
         raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    return _get_patient_with_risk(patient_id)
+    await wait_for_model()
+    return await asyncio.to_thread(_get_patient_with_risk, patient_id)
@@ -1,23 +1,81 @@
 """
 Reports Router — VITALGUARD 2.0
-Provides ICU analytics: 7-day stress trend, alert distribution, patient risk distribution.
+Provides ICU analytics: 7-day stress trend, alert distribution, patient risk distribution,
+ward-wide multi-vital stability.
 """
 
-import random
+import asyncio
+import time
+import numpy as np
 from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter
-from services.patient_store import PATIENTS
-from services.vitals_simulator import get_vitals_history
-from services.feature_engineering import engineer_features
-from models.xgboost_model import predict_risk
-from models.schemas import PatientBaseline
+from fastapi.responses import ORJSONResponse
+from services.patient_store import PATIENTS, PATIENT_IDS, BASELINE_COLUMNS
+from services.vitals_simulator import STATE_LOCK, get_vitals_matrix, simulate_vitals_batch
+from services.global_vital_engine import run_global_analysis_batch
+from services.feature_engineering import engineer_features_batch
+from models.xgboost_model import predict_risk_matrix, wait_for_model
 from services.alert_engine import get_alert_log, get_alert_counts
+from services.risk_cache import LAST_RISK
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
+# Generator for the simulated historical trend
+_rng = np.random.default_rng()
+
+# The simulated trend only drifts between requests, so it is reused for a while.
+# Risk distribution, alerts and KPIs are always computed live.
+STRESS_TREND_TTL_S = 30.0
+_stress_trend_cache: tuple[float, list[dict]] | None = None
+
+# Risk-score bin edges: < 40 green, 40–69 yellow, ≥ 70 red
+_RISK_BINS = np.array([40.0, 70.0])
+
+
+def _get_stress_trend() -> list[dict]:
+    """Simulated 7-day trend, regenerated at most once per STRESS_TREND_TTL_S."""
+    global _stress_trend_cache
+    now = time.monotonic()
+    if _stress_trend_cache and now - _stress_trend_cache[0] < STRESS_TREND_TTL_S:
+        return _stress_trend_cache[1]
+
+    today = datetime.now(timezone.utc)
+    # Generate realistic-looking 7-day trend with slight upward movement,
+    # drawing all days' randomness in one batch
+    base_stress = _rng.uniform(30, 50)
+    drift = np.concatenate(([0.0], _rng.normal(0, 3, 6).cumsum()))   # Slight drift
+    daily_stress = np.clip(base_stress + drift + _rng.normal(0, 8, 7), 10.0, 95.0).round(1)
+    criticals = _rng.integers(1, 5, 7)
+    alerts = _rng.integers(3, 16, 7)
+    stress_trend = [
+        {
+            "date": (today - timedelta(days=6 - i)).strftime("%b %d"),
+            "avg_risk": stress,
+            "critical": critical,
+            "alerts": alert_count,
+        }
+        for i, (stress, critical, alert_count) in enumerate(
+            zip(daily_stress.tolist(), criticals.tolist(), alerts.tolist()))
+    ]
+    _stress_trend_cache = (now, stress_trend)
+    return stress_trend
+
+
+def _score_patients(rows: list[int]) -> dict[str, float]:
+    """
+    Score the patients at the given SoA rows in one batch, record them in
+    LAST_RISK and return them as patient_id → risk.
+    """
+    baselines = {vital: column[rows] for vital, column in BASELINE_COLUMNS.items()}
+    features = engineer_features_batch([get_vitals_matrix(PATIENT_IDS[i]) for i in rows], baselines)
+    scores = {PATIENT_IDS[i]: risk for i, (risk, _) in zip(rows, predict_risk_matrix(features))}
+    with STATE_LOCK:
+        LAST_RISK.update(scores)
+    return scores
+
 
 @router.get("/summary")
-def get_reports_summary():
+async def get_reports_summary():
     """
     Return ICU analytics for the Reports & Analytics page:
     - 7-day ICU stress trend (simulated daily avg risk)
@@ -27,33 +85,22 @@ def get_reports_summary():
     """
 
     # ── 7-Day ICU Stress Trend (simulate historical daily averages) ───────────
-    today = datetime.now(timezone.utc)
-    stress_trend = []
-    # Generate realistic-looking 7-day trend with slight upward movement
-    base_stress = random.uniform(30, 50)
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        # Add slight randomness + time-of-day variation
-        daily_stress = base_stress + random.gauss(0, 8)
-        daily_stress = max(10.0, min(95.0, daily_stress))
-        base_stress += random.gauss(0, 3)  # Slight drift
-        stress_trend.append({
-            "date": day.strftime("%b %d"),
-            "avg_risk": round(daily_stress, 1),
-            "critical": random.randint(1, 4),
-            "alerts": random.randint(3, 15),
-        })
+    stress_trend = _get_stress_trend()
 
     # ── Current Patient Risk Distribution ─────────────────────────────────────
-    distribution = {"green": 0, "yellow": 0, "red": 0}
-    for pid, p in PATIENTS.items():
-        baseline = PatientBaseline(**p["baseline"])
-        history = get_vitals_history(pid)
-        features = engineer_features(history, baseline)
-        risk, _ = predict_risk(features)
-        if risk < 40:   distribution["green"]  += 1
-        elif risk < 70: distribution["yellow"] += 1
-        else:           distribution["red"]    += 1
+    # Reuse the last risk score computed by the prediction/patient routes;
+    # only patients without one are scored (in one batched model call).
+    # Work from a snapshot: /trigger and /reset may drop entries meanwhile.
+    with STATE_LOCK:
+        known = dict(LAST_RISK)
+    missing = [i for i, pid in enumerate(PATIENT_IDS) if pid not in known]
+    if missing:
+        await wait_for_model()
+        known.update(await asyncio.to_thread(_score_patients, missing))
+
+    scores = np.array([known[pid] for pid in PATIENT_IDS])
+    green, yellow, red = np.bincount(np.digitize(scores, _RISK_BINS), minlength=3).tolist()
+    distribution = {"green": green, "yellow": yellow, "red": red}
 
     # ── Alert Type Distribution ───────────────────────────────────────────────
     log = get_alert_log()
@@ -84,3 +131,25 @@ def get_reports_summary():
             "patients_stable":      distribution["green"],
         }
     }
+
+
+@router.get("/ward-stability")
+async def get_ward_stability():
+    """
+    Multi-vital stability report for every bed: all 5 vital engines run on
+    the current LIVE vitals as one batch, combined into a stability score,
+    status and 24-hour predictions per patient.
+    """
+    records = [PATIENTS[pid] for pid in PATIENT_IDS]
+    vitals = simulate_vitals_batch(list(PATIENT_IDS), BASELINE_COLUMNS,
+                                   [p.get("severity", 0) for p in records])
+    patients = [
+        {
+            "pid": pid, "name": p["name"], "bed": p["bed"],
+            "sbp": v.sbp, "dbp": v.dbp, "hr": v.hr, "spo2": v.spo2, "rr": v.rr, "temp": v.temp,
+            "sodium": p.get("sodium", 138.0), "age": p["age"], "bmi": p.get("bmi", 24.5),
+        }
+        for pid, p, v in zip(PATIENT_IDS, records, vitals)
+    ]
+    # Engine output is plain JSON types; skip FastAPI's jsonable_encoder walk
+    return ORJSONResponse({"patients": run_global_analysis_batch(patients)})
@@ -1,9 +1,9 @@
 """Respiratory Rate API Router — VITALGUARD 2.0"""
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from services.rr_engine import run_rr_analysis, get_rr_log, get_rr_therapy_history
-from services.patient_store import PATIENTS
+from services.patient_store import PATIENTS, BASELINES
 from services.vitals_simulator import simulate_vitals
-from models.schemas import PatientBaseline
 
 router = APIRouter(prefix="/api/rr", tags=["Respiratory Rate Module"])
 
@@ -11,9 +11,9 @@ router = APIRouter(prefix="/api/rr", tags=["Respiratory Rate Module"])
 async def rr_analysis(patient_id: str):
     p = PATIENTS.get(patient_id)
     if not p: raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    baseline = PatientBaseline(**p["baseline"])
+    baseline = BASELINES[patient_id]
     v = simulate_vitals(patient_id, baseline, severity=p.get("severity", 0))
-    return run_rr_analysis(patient_id, p["name"], p["bed"], v.rr, v.spo2)
+    return ORJSONResponse(run_rr_analysis(patient_id, p["name"], p["bed"], v.rr, v.spo2))
 
 @router.get("/{patient_id}/history")
 async def rr_history(patient_id: str):
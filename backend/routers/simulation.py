@@ -7,8 +7,9 @@ then provides reset to restore original state.
 from fastapi import APIRouter
 from datetime import datetime, timezone
 from services.patient_store import PATIENTS
-from services.vitals_simulator import set_patient_severity, _vitals_history
-from services.alert_engine import _alerts, _last_risk_scores
+from services.vitals_simulator import STATE_LOCK, reset_patients
+from services.alert_engine import _last_risk_scores
+from services.risk_cache import LAST_RISK
 
 router = APIRouter(prefix="/api/simulation", tags=["Simulation"])
 
@@ -20,7 +21,7 @@ CRISIS_PATIENTS = ["P001", "P003", "P007"]
 
 
 @router.post("/trigger")
-def trigger_crisis():
+async def trigger_crisis():
     """
     Simulate an ICU emergency:
     1. Set 3 critical patients to max severity (2)
@@ -28,18 +29,22 @@ def trigger_crisis():
     3. Clear last risk scores to ensure spike alerts trigger on next prediction
     Returns: list of affected patients
     """
-    affected = []
-    for pid in CRISIS_PATIENTS:
-        if pid in PATIENTS:
-            set_patient_severity(pid, 2)              # Force critical severity
-            _vitals_history[pid] = []                 # Clear history → forces spike
+    crisis = [pid for pid in CRISIS_PATIENTS if pid in PATIENTS]
+    with STATE_LOCK:
+        reset_patients({pid: 2 for pid in crisis})    # Force critical severity, clear history → forces spike
+        for pid in crisis:
             _last_risk_scores.pop(pid, None)          # Reset spike tracker
-            affected.append({
-                "patient_id":   pid,
-                "patient_name": PATIENTS[pid]["name"],
-                "bed":          PATIENTS[pid]["bed"],
-                "severity_set": 2,
-            })
+            LAST_RISK.pop(pid, None)                  # Drop pre-crisis risk snapshot
+
+    affected = [
+        {
+            "patient_id":   pid,
+            "patient_name": PATIENTS[pid]["name"],
+            "bed":          PATIENTS[pid]["bed"],
+            "severity_set": 2,
+        }
+        for pid in crisis
+    ]
 
     return {
         "status":     "crisis_triggered",
@@ -50,15 +55,16 @@ def trigger_crisis():
 
 
 @router.post("/reset")
-def reset_simulation():
+async def reset_simulation():
     """
     Reset all patients to original severity levels.
     Clears their vitals history and alert spike trackers.
     """
-    for pid, original_sev in _original_severities.items():
-        set_patient_severity(pid, original_sev)
-        _vitals_history[pid] = []
-        _last_risk_scores.pop(pid, None)
+    with STATE_LOCK:
+        reset_patients(_original_severities)
+        for pid in _original_severities:
+            _last_risk_scores.pop(pid, None)
+            LAST_RISK.pop(pid, None)
 
     return {
         "status":    "simulation_reset",
@@ -68,7 +74,7 @@ def reset_simulation():
 
 
 @router.get("/status")
-def get_simulation_status():
+async def get_simulation_status():
     """Return current severity levels for all patients."""
     return {
         pid: {
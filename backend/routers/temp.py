@@ -1,9 +1,9 @@
 """Temperature API Router — VITALGUARD 2.0"""
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from services.temp_engine import run_temp_analysis, get_temp_log, get_temp_med_history
-from services.patient_store import PATIENTS
+from services.patient_store import PATIENTS, BASELINES
 from services.vitals_simulator import simulate_vitals
-from models.schemas import PatientBaseline
 
 router = APIRouter(prefix="/api/temp", tags=["Temperature Module"])
 
@@ -11,9 +11,9 @@ router = APIRouter(prefix="/api/temp", tags=["Temperature Module"])
 async def temp_analysis(patient_id: str):
     p = PATIENTS.get(patient_id)
     if not p: raise HTTPException(status_code=404, detail=f"Patient {patient_id} not found")
-    baseline = PatientBaseline(**p["baseline"])
+    baseline = BASELINES[patient_id]
     v = simulate_vitals(patient_id, baseline, severity=p.get("severity", 0))
-    return run_temp_analysis(patient_id, p["name"], p["bed"], v.temp, v.hr)
+    return ORJSONResponse(run_temp_analysis(patient_id, p["name"], p["bed"], v.temp, v.hr))
 
 @router.get("/{patient_id}/history")
 async def temp_history(patient_id: str):
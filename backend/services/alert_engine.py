@@ -12,13 +12,53 @@ Alert Suppression Logic:
 - The active alerts list only shows non-suppressed alerts
 """
 
-import uuid
+import itertools
+import time
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional, List, Dict
-from models.schemas import Alert, AlertType, RiskLevel
+from models.schemas import AlertType, RiskLevel, VitalsReading
 
-# In-memory alert store (in production this would be Firestore)
-_alerts: Dict[str, Alert] = {}
+
+@dataclass(slots=True)
+class AlertRec:
+    """
+    In-memory alert record. Field-compatible with the Alert schema, which the
+    routers use as response_model, so validation only happens at the API boundary.
+    """
+    id: str
+    patient_id: str
+    patient_name: str
+    bed: str
+    alert_type: AlertType
+    message: str
+    risk_score: float
+    confidence: float
+    timestamp: str
+    ts_epoch: float  # Creation time (epoch s) for numeric ordering
+    suppressed: bool = False
+    suppressed_at: Optional[str] = None
+    suppressed_reason: Optional[str] = None
+
+
+# In-memory alert store (in production this would be Firestore), bounded to the
+# MAX_ALERT_LOG most recent alerts; the oldest alert is evicted when full.
+MAX_ALERT_LOG = 10_000
+_alerts: Dict[str, AlertRec] = {}
+
+# Incrementally maintained indexes over _alerts so reads never rescan/sort the store.
+# Alerts are created with monotonic timestamps, so insertion order == time order.
+_alert_log: deque = deque(maxlen=MAX_ALERT_LOG)   # AlertRec records, oldest first
+_active_ids: set = set()                          # ids of non-suppressed alerts
+
+# Lifetime counters (not reduced by eviction)
+_triggered_count = 0
+_suppressed_count = 0
+
+# Alert ids only need to be unique within this process
+_next_id = itertools.count(1)
 
 # Track last risk score per patient for spike detection
 _last_risk_scores: Dict[str, float] = {}
@@ -33,6 +73,24 @@ THRESHOLDS = {
     "sbp_low": 85,     # mmHg - Hypotension alert
 }
 
+# Threshold checks as parallel vectors, in alert order. Low-limit checks are
+# negated so every check reduces to one "value > limit" comparison.
+_CHECK_SIGN = np.array([1, -1, -1, 1, 1, -1], dtype=float)
+_CHECK_LIMITS = _CHECK_SIGN * np.array([
+    THRESHOLDS["hr_high"], THRESHOLDS["hr_low"], THRESHOLDS["spo2_low"],
+    THRESHOLDS["rr_high"], THRESHOLDS["temp_high"], THRESHOLDS["sbp_low"],
+], dtype=float)
+# Message formatters with the (constant) limits already baked in; each takes
+# only the measured value
+_CHECK_MESSAGES = (
+    f"⚠️ Tachycardia: HR {{:.0f}} bpm > {THRESHOLDS['hr_high']} bpm".format,
+    f"⚠️ Bradycardia: HR {{:.0f}} bpm < {THRESHOLDS['hr_low']} bpm".format,
+    f"🔴 Hypoxemia: SpO₂ {{:.1f}}% < {THRESHOLDS['spo2_low']}%".format,
+    f"⚠️ Tachypnea: RR {{:.0f}} br/min > {THRESHOLDS['rr_high']}".format,
+    f"🌡️ Fever: Temp {{:.1f}}°C > {THRESHOLDS['temp_high']}°C".format,
+    f"⬇️ Hypotension: SBP {{:.0f}} mmHg < {THRESHOLDS['sbp_low']}".format,
+)
+
 # Spike threshold: alert if risk delta exceeds this percentage
 SPIKE_THRESHOLD = 20.0  # %
 
@@ -41,7 +99,7 @@ MIN_CONFIDENCE = 0.75
 
 
 def check_threshold_alerts(patient_id: str, patient_name: str, bed: str,
-                            vitals: dict, risk_score: float, confidence: float) -> List[Alert]:
+                            vitals: VitalsReading, risk_score: float, confidence: float) -> List[AlertRec]:
     """
     Check if any vitals reading crosses clinical safety thresholds.
     Only generates alert if model confidence >= MIN_CONFIDENCE.
@@ -52,68 +110,26 @@ def check_threshold_alerts(patient_id: str, patient_name: str, bed: str,
     if confidence < MIN_CONFIDENCE:
         return []  # Confidence filter: suppress low-certainty alerts
 
-    new_alerts = []
-    ts = datetime.now(timezone.utc).isoformat()
-
-    # Heart Rate High (Tachycardia)
-    if vitals.get("hr", 0) > THRESHOLDS["hr_high"]:
-        new_alerts.append(_make_alert(
-            patient_id, patient_name, bed,
-            AlertType.THRESHOLD,
-            f"⚠️ Tachycardia: HR {vitals['hr']:.0f} bpm > {THRESHOLDS['hr_high']} bpm",
-            risk_score, confidence, ts
-        ))
-
-    # Heart Rate Low (Bradycardia)
-    elif vitals.get("hr", 100) < THRESHOLDS["hr_low"]:
-        new_alerts.append(_make_alert(
-            patient_id, patient_name, bed,
-            AlertType.THRESHOLD,
-            f"⚠️ Bradycardia: HR {vitals['hr']:.0f} bpm < {THRESHOLDS['hr_low']} bpm",
-            risk_score, confidence, ts
-        ))
-
-    # SpO2 Low (Hypoxemia)
-    if vitals.get("spo2", 100) < THRESHOLDS["spo2_low"]:
-        new_alerts.append(_make_alert(
-            patient_id, patient_name, bed,
-            AlertType.THRESHOLD,
-            f"🔴 Hypoxemia: SpO₂ {vitals['spo2']:.1f}% < {THRESHOLDS['spo2_low']}%",
-            risk_score, confidence, ts
-        ))
-
-    # Respiration Rate High (Tachypnea)
-    if vitals.get("rr", 0) > THRESHOLDS["rr_high"]:
-        new_alerts.append(_make_alert(
-            patient_id, patient_name, bed,
-            AlertType.THRESHOLD,
-            f"⚠️ Tachypnea: RR {vitals['rr']:.0f} br/min > {THRESHOLDS['rr_high']}",
-            risk_score, confidence, ts
-        ))
-
-    # Temperature High (Fever)
-    if vitals.get("temp", 36) > THRESHOLDS["temp_high"]:
-        new_alerts.append(_make_alert(
-            patient_id, patient_name, bed,
-            AlertType.THRESHOLD,
-            f"🌡️ Fever: Temp {vitals['temp']:.1f}°C > {THRESHOLDS['temp_high']}°C",
-            risk_score, confidence, ts
-        ))
+    # Same order as _CHECK_LIMITS: hr, hr, spo2, rr, temp, sbp
+    values = np.array([vitals.hr, vitals.hr, vitals.spo2, vitals.rr, vitals.temp, vitals.sbp])
+    breached = np.flatnonzero(_CHECK_SIGN * values > _CHECK_LIMITS)
+    if not len(breached):
+        return []
 
-    # Systolic BP Low (Hypotension)
-    if vitals.get("sbp", 120) < THRESHOLDS["sbp_low"]:
-        new_alerts.append(_make_alert(
+    ts = _timestamp()
+    return [
+        _make_alert(
             patient_id, patient_name, bed,
             AlertType.THRESHOLD,
-            f"⬇️ Hypotension: SBP {vitals['sbp']:.0f} mmHg < {THRESHOLDS['sbp_low']}",
+            _CHECK_MESSAGES[i](value),
             risk_score, confidence, ts
-        ))
-
-    return new_alerts
+        )
+        for i, value in zip(breached.tolist(), values[breached].tolist())
+    ]
 
 
 def check_spike_alert(patient_id: str, patient_name: str, bed: str,
-                      risk_score: float, confidence: float) -> Optional[Alert]:
+                      risk_score: float, confidence: float) -> Optional[AlertRec]:
     """
     Detect sudden risk spike: risk increased >SPIKE_THRESHOLD% since last prediction.
     Confidence filter still applies.
@@ -131,7 +147,7 @@ def check_spike_alert(patient_id: str, patient_name: str, bed: str,
 
     delta = risk_score - last
     if delta >= SPIKE_THRESHOLD:
-        ts = datetime.now(timezone.utc).isoformat()
+        ts = _timestamp()
         return _make_alert(
             patient_id, patient_name, bed,
             AlertType.SPIKE,
@@ -141,12 +157,19 @@ def check_spike_alert(patient_id: str, patient_name: str, bed: str,
     return None
 
 
+def _timestamp() -> tuple[float, str]:
+    """Current time as (epoch seconds, ISO-8601 string), taken once per reading."""
+    epoch = time.time()
+    return epoch, datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
 def _make_alert(patient_id: str, patient_name: str, bed: str,
                 alert_type: AlertType, message: str,
-                risk_score: float, confidence: float, ts: str) -> Alert:
-    """Create and store a new Alert, then return it."""
-    alert = Alert(
-        id=str(uuid.uuid4()),
+                risk_score: float, confidence: float, ts: tuple[float, str]) -> AlertRec:
+    """Create and store a new Alert, evicting the oldest one if the log is full."""
+    global _triggered_count
+    alert = AlertRec(
+        id=f"a{next(_next_id)}",
         patient_id=patient_id,
         patient_name=patient_name,
         bed=bed,
@@ -154,14 +177,21 @@ def _make_alert(patient_id: str, patient_name: str, bed: str,
         message=message,
         risk_score=risk_score,
         confidence=confidence,
-        timestamp=ts,
-        suppressed=False,
+        timestamp=ts[1],
+        ts_epoch=ts[0],
     )
+    if len(_alert_log) == MAX_ALERT_LOG:
+        evicted = _alert_log[0]
+        del _alerts[evicted.id]
+        _active_ids.discard(evicted.id)
+    _alert_log.append(alert)
     _alerts[alert.id] = alert
+    _active_ids.add(alert.id)
+    _triggered_count += 1
     return alert
 
 
-def suppress_alert(alert_id: str, reason: str) -> Optional[Alert]:
+def suppress_alert(alert_id: str, reason: str) -> Optional[AlertRec]:
     """
     Suppress an active alert. Suppressed alerts stay in the log but
     are excluded from the active alerts list.
@@ -169,28 +199,29 @@ def suppress_alert(alert_id: str, reason: str) -> Optional[Alert]:
     Returns:
         Updated Alert if found, None if not found
     """
+    global _suppressed_count
     alert = _alerts.get(alert_id)
     if not alert:
         return None
+    if not alert.suppressed:
+        _active_ids.discard(alert_id)
+        _suppressed_count += 1
     alert.suppressed = True
     alert.suppressed_at = datetime.now(timezone.utc).isoformat()
     alert.suppressed_reason = reason
     return alert
 
 
-def get_active_alerts() -> List[Alert]:
+def get_active_alerts() -> List[AlertRec]:
     """Return all non-suppressed alerts sorted by timestamp descending."""
-    active = [a for a in _alerts.values() if not a.suppressed]
-    return sorted(active, key=lambda a: a.timestamp, reverse=True)
+    return [a for a in reversed(_alert_log) if a.id in _active_ids]
 
 
-def get_alert_log() -> List[Alert]:
+def get_alert_log() -> List[AlertRec]:
     """Return full alert log (active + suppressed) in chronological order."""
-    return sorted(_alerts.values(), key=lambda a: a.timestamp, reverse=True)
+    return list(reversed(_alert_log))
 
 
 def get_alert_counts() -> Dict[str, int]:
-    """Return counts of triggered and suppressed alerts."""
-    total = len(_alerts)
-    suppressed = sum(1 for a in _alerts.values() if a.suppressed)
-    return {"triggered": total, "suppressed": suppressed}
+    """Return lifetime counts of triggered and suppressed alerts."""
+    return {"triggered": _triggered_count, "suppressed": _suppressed_count}
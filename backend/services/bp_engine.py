@@ -6,9 +6,12 @@ ALL rule-based — no ML model needed.
 """
 
 import math
-import random
-import time
-from datetime import datetime, timezone, timedelta
+import numpy as np
+from collections import defaultdict, deque
+from datetime import date, datetime, timezone, timedelta
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
 from typing import Dict, List, Optional
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -39,86 +42,123 @@ def calc_sub_parameters(sbp: float, dbp: float, hr: float,
 #  2. BP RISK CALCULATION ENGINE
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Risk factors in bit order: (label, points). The systolic tiers are exclusive
+# (bit 1 is only set when bit 0 is not).
+_BP_RISK_FACTORS = (
+    ("Systolic ≥160 mmHg", 30),
+    ("Systolic ≥140 mmHg", 20),
+    ("Diastolic ≥90 mmHg", 15),
+    ("MAP ≥100 mmHg", 10),
+    ("Heart Rate >100 bpm", 10),
+    ("Sodium >145 mEq/L", 10),
+    ("Age >60 years", 10),
+    ("BMI >30 kg/m²", 10),
+)
+
+# Raw score for every possible factor bitmask
+_MASK_POINTS = tuple(
+    sum(points for bit, (_, points) in enumerate(_BP_RISK_FACTORS) if mask >> bit & 1)
+    for mask in range(1 << len(_BP_RISK_FACTORS))
+)
+
+# Max possible = 30+15+10+10+10+10+10 = 95 → normalize
+_BP_MAX_SCORE = 95
+
+# Percentage for every possible raw score (raw is an integer 0–95)
+_PCT_TABLE = tuple(min(100.0, round((raw / _BP_MAX_SCORE) * 100, 1))
+                   for raw in range(_BP_MAX_SCORE + 1))
+_PCT_ARRAY = np.array(_PCT_TABLE)
+
+# (category, color, interpretation template) indexed by min(pct // 25, 3)
+_BP_CATEGORIES = (
+    ("Low", "green",
+     "BP risk is LOW ({}%). Blood pressure within or near normal limits. "
+     "No immediate concern. Maintain routine monitoring."),
+    ("Moderate", "yellow",
+     "BP risk is MODERATE ({}%). Some risk factors present but manageable. "
+     "Continue current treatment plan and monitor trend."),
+    ("High", "orange",
+     "BP risk is HIGH ({}%). Several concerning factors identified. "
+     "Consider escalating treatment and increasing monitoring frequency."),
+    ("Critical", "red",
+     "BP risk is CRITICAL ({}%). Multiple cardiovascular risk factors "
+     "are active. Immediate clinical intervention required. "
+     "Risk of hypertensive emergency or end-organ damage."),
+)
+
+# _BP_CATEGORIES index for every possible raw score
+_PCT_CATEGORY = tuple(min(int(pct // 25), 3) for pct in _PCT_TABLE)
+
+
+def _bp_risk_mask(sys: float, dia: float, map_val: float, hr: float,
+                  sodium: float, age: int, bmi: float) -> int:
+    """Numeric core of calc_bp_risk: bitmask of active _BP_RISK_FACTORS."""
+    # Every check is evaluated (no short-circuit) and combined with bit ops
+    return (
+        (sys >= 160)
+        | ((sys >= 140) & (sys < 160)) << 1
+        | (dia >= 90) << 2
+        | (map_val >= 100) << 3
+        | (hr > 100) << 4
+        | (sodium > 145) << 5
+        | (age > 60) << 6
+        | (bmi > 30) << 7
+    )
+
+
+# Vectorized form of the same checks: columns sys, sys, dia, map use ≥,
+# columns hr, sodium, age, bmi use >
+_BP_GE_LIMITS = np.array([160, 140, 90, 100], dtype=float)
+_BP_GT_LIMITS = np.array([100, 145, 60, 30], dtype=float)
+_BP_POINTS = np.array([points for _, points in _BP_RISK_FACTORS])
+_BP_BITS = 1 << np.arange(len(_BP_RISK_FACTORS))
+
+
+def calc_bp_risk_batch(sys, dia, map_val, hr, sodium, age, bmi) -> tuple:
+    """
+    Score many patients at once (each argument an array of length N).
+    Returns: (raw_score, percentage, factor_bitmask) arrays, matching calc_bp_risk.
+    """
+    vals = np.column_stack([sys, sys, dia, map_val, hr, sodium, age, bmi]).astype(float)
+    hits = np.empty(vals.shape, dtype=bool)
+    np.greater_equal(vals[:, :4], _BP_GE_LIMITS, out=hits[:, :4])
+    np.greater(vals[:, 4:], _BP_GT_LIMITS, out=hits[:, 4:])
+    hits[:, 1] &= ~hits[:, 0]   # systolic tiers are exclusive
+
+    raw = hits @ _BP_POINTS
+    pct = _PCT_ARRAY[raw]
+    return raw, pct, hits @ _BP_BITS
+
+
 def calc_bp_risk(sub_params: dict) -> dict:
     """
     Weighted composite risk score from BP sub-parameters.
     Returns: dict with score, percentage, category, interpretation.
     """
-    raw = 0
-    breakdown = []
+    mask = _bp_risk_mask(
+        sub_params["systolic"], sub_params["diastolic"], sub_params["map"],
+        sub_params["heart_rate"], sub_params["sodium"], sub_params["age"], sub_params["bmi"],
+    )
+    return _bp_risk_dict(_MASK_POINTS[mask], mask)
 
-    sys = sub_params["systolic"]
-    dia = sub_params["diastolic"]
-    map_val = sub_params["map"]
-    hr = sub_params["heart_rate"]
-    sodium = sub_params["sodium"]
-    age = sub_params["age"]
-    bmi = sub_params["bmi"]
-
-    if sys >= 160:
-        raw += 30; breakdown.append({"factor": "Systolic ≥160 mmHg", "points": 30})
-    elif sys >= 140:
-        raw += 20; breakdown.append({"factor": "Systolic ≥140 mmHg", "points": 20})
-
-    if dia >= 90:
-        raw += 15; breakdown.append({"factor": "Diastolic ≥90 mmHg", "points": 15})
-
-    if map_val >= 100:
-        raw += 10; breakdown.append({"factor": "MAP ≥100 mmHg", "points": 10})
-
-    if hr > 100:
-        raw += 10; breakdown.append({"factor": "Heart Rate >100 bpm", "points": 10})
-
-    if sodium > 145:
-        raw += 10; breakdown.append({"factor": "Sodium >145 mEq/L", "points": 10})
-
-    if age > 60:
-        raw += 10; breakdown.append({"factor": "Age >60 years", "points": 10})
-
-    if bmi > 30:
-        raw += 10; breakdown.append({"factor": "BMI >30 kg/m²", "points": 10})
-
-    # Max possible = 30+15+10+10+10+10+10 = 95 → normalize
-    max_score = 95
-    pct = min(100.0, round((raw / max_score) * 100, 1))
-
-    if pct >= 75:
-        category = "Critical"
-        color = "red"
-        interpretation = (
-            f"BP risk is CRITICAL ({pct}%). Multiple cardiovascular risk factors "
-            f"are active. Immediate clinical intervention required. "
-            f"Risk of hypertensive emergency or end-organ damage."
-        )
-    elif pct >= 50:
-        category = "High"
-        color = "orange"
-        interpretation = (
-            f"BP risk is HIGH ({pct}%). Several concerning factors identified. "
-            f"Consider escalating treatment and increasing monitoring frequency."
-        )
-    elif pct >= 25:
-        category = "Moderate"
-        color = "yellow"
-        interpretation = (
-            f"BP risk is MODERATE ({pct}%). Some risk factors present but manageable. "
-            f"Continue current treatment plan and monitor trend."
-        )
-    else:
-        category = "Low"
-        color = "green"
-        interpretation = (
-            f"BP risk is LOW ({pct}%). Blood pressure within or near normal limits. "
-            f"No immediate concern. Maintain routine monitoring."
-        )
+
+def _bp_risk_dict(raw: int, mask: int) -> dict:
+    """Risk payload for a raw score and its factor bitmask."""
+    breakdown = [
+        {"factor": label, "points": points}
+        for bit, (label, points) in enumerate(_BP_RISK_FACTORS) if mask >> bit & 1
+    ]
+
+    pct = _PCT_TABLE[raw]
+    category, color, interpretation = _BP_CATEGORIES[_PCT_CATEGORY[raw]]
 
     return {
         "raw_score": raw,
-        "max_possible": max_score,
+        "max_possible": _BP_MAX_SCORE,
         "percentage": pct,
         "category": category,
         "color": color,
-        "interpretation": interpretation,
+        "interpretation": interpretation.format(pct),
         "breakdown": breakdown,
     }
 
@@ -127,80 +167,90 @@ def calc_bp_risk(sub_params: dict) -> dict:
 #  3. PRESCRIPTION GENERATION ENGINE
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def generate_prescription(sub_params: dict, risk: dict) -> dict:
+@lru_cache(maxsize=32)
+def _end_date(start: date, duration_days: int) -> str:
+    """Medication end date; only a handful of (day, duration) pairs occur."""
+    return (start + timedelta(days=duration_days)).strftime("%Y-%m-%d")
+
+
+def _med(medication: str, dosage: str, timing: str, meal_period: str, duration_days: int) -> MappingProxyType:
+    """Read-only once-daily medication template."""
+    return MappingProxyType({
+        "medication": medication, "dosage": dosage, "frequency": "Once daily",
+        "timing": timing, "meal_period": meal_period, "duration_days": duration_days,
+    })
+
+
+# Stage → (primary template, alternative template or None, clinical notes).
+# Built once; each prescription copies the entries and only adds dates.
+_BP_PLANS = {
+    # — SEVERE (≥160 systolic OR Risk >75%)
+    "SEVERE": (
+        (_med("Valsartan", "80–160 mg", "Before food", "Morning", 60),
+         _med("Amlodipine", "5–10 mg", "After food", "Evening", 60),
+         _med("Hydrochlorothiazide", "25 mg", "After food", "Morning", 60)),
+        None,
+        "Triple combination therapy. Monitor BP every 4 hours. Renal function check weekly.",
+    ),
+    # — STAGE 2 (≥140 / ≥90)
+    "STAGE 2": (
+        (_med("Lisinopril", "10–20 mg", "Before food", "Morning", 30),
+         _med("Amlodipine", "5 mg", "After food", "Evening", 30)),
+        (_med("Losartan", "50 mg", "Before food", "Morning", 30),
+         _med("Hydrochlorothiazide", "12.5 mg", "After food", "Morning (after breakfast)", 30)),
+        "Combination therapy required. Monitor BP twice daily. Reassess in 30 days.",
+    ),
+    # — STAGE 1 (130–139 / 80–89)
+    "STAGE 1": (
+        (_med("Lisinopril", "5–10 mg", "Before food", "Morning", 30),),
+        (_med("Amlodipine", "5 mg", "After food", "Evening", 30),),
+        "Monotherapy sufficient. Lifestyle modification recommended. Follow-up in 14–30 days.",
+    ),
+    # — NORMAL (<130 / <80)
+    "NORMAL": (
+        (),
+        None,
+        "BP within normal limits. No pharmacological intervention needed. Continue monitoring.",
+    ),
+}
+
+
+def generate_prescription(sub_params: dict, risk: dict, now: Optional[datetime] = None) -> dict:
     """
     Rule-based prescription engine.
     Returns: dict with stage, primary/alternative plans, and notes.
     """
+    now = now or datetime.now(timezone.utc)
     sys = sub_params["systolic"]
     dia = sub_params["diastolic"]
     risk_pct = risk["percentage"]
 
-    # — SEVERE (≥160 systolic OR Risk >75%)
     if sys >= 160 or risk_pct > 75:
         stage = "SEVERE"
-        primary = [
-            {"medication": "Valsartan", "dosage": "80–160 mg", "frequency": "Once daily",
-             "timing": "Before food", "meal_period": "Morning", "duration_days": 60},
-            {"medication": "Amlodipine", "dosage": "5–10 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Evening", "duration_days": 60},
-            {"medication": "Hydrochlorothiazide", "dosage": "25 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Morning", "duration_days": 60},
-        ]
-        alternative = None
-        notes = "Triple combination therapy. Monitor BP every 4 hours. Renal function check weekly."
-
-    # — STAGE 2 (≥140 / ≥90)
     elif sys >= 140 or dia >= 90:
         stage = "STAGE 2"
-        primary = [
-            {"medication": "Lisinopril", "dosage": "10–20 mg", "frequency": "Once daily",
-             "timing": "Before food", "meal_period": "Morning", "duration_days": 30},
-            {"medication": "Amlodipine", "dosage": "5 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Evening", "duration_days": 30},
-        ]
-        alternative = [
-            {"medication": "Losartan", "dosage": "50 mg", "frequency": "Once daily",
-             "timing": "Before food", "meal_period": "Morning", "duration_days": 30},
-            {"medication": "Hydrochlorothiazide", "dosage": "12.5 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Morning (after breakfast)", "duration_days": 30},
-        ]
-        notes = "Combination therapy required. Monitor BP twice daily. Reassess in 30 days."
-
-    # — STAGE 1 (130–139 / 80–89)
     elif sys >= 130 or dia >= 80:
         stage = "STAGE 1"
-        primary = [
-            {"medication": "Lisinopril", "dosage": "5–10 mg", "frequency": "Once daily",
-             "timing": "Before food", "meal_period": "Morning", "duration_days": 30},
-        ]
-        alternative = [
-            {"medication": "Amlodipine", "dosage": "5 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Evening", "duration_days": 30},
-        ]
-        notes = "Monotherapy sufficient. Lifestyle modification recommended. Follow-up in 14–30 days."
-
-    # — NORMAL (<130 / <80)
     else:
         stage = "NORMAL"
-        primary = []
-        alternative = None
-        notes = "BP within normal limits. No pharmacological intervention needed. Continue monitoring."
-
-    # Compute medication start/end dates
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    for plan in [primary, alternative or []]:
-        for med in plan:
-            med["start_date"] = today
-            end = datetime.now(timezone.utc) + timedelta(days=med["duration_days"])
-            med["end_date"] = end.strftime("%Y-%m-%d")
+    primary_tmpl, alternative_tmpl, notes = _BP_PLANS[stage]
+
+    # Copy templates, adding medication start/end dates
+    today = now.date()
+    dates = {"start_date": today.strftime("%Y-%m-%d")}
+    primary = [{**med, **dates, "end_date": _end_date(today, med["duration_days"])}
+               for med in primary_tmpl]
+    alternative = None
+    if alternative_tmpl is not None:
+        alternative = [{**med, **dates, "end_date": _end_date(today, med["duration_days"])}
+                       for med in alternative_tmpl]
 
     return {
         "stage": stage,
         "primary_plan": primary,
         "alternative_plan": alternative,
         "clinical_notes": notes,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "generated_at": now.isoformat(),
     }
 
 
@@ -208,36 +258,85 @@ def generate_prescription(sub_params: dict, risk: dict) -> dict:
 #  4. MEDICATION HISTORY (in-memory store per patient)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-_medication_history: Dict[str, List[dict]] = {}
+# Ring buffers: appending to a full deque evicts the oldest entry in O(1)
+_medication_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
+
+# Entries embedded in each run_bp_analysis response (the dashboard shows the
+# latest 3); the full history is served by GET /bp/{id}/medications
+ANALYSIS_HISTORY_LIMIT = 3
 
 def store_medication(patient_id: str, prescription: dict):
-    """Save a prescription to patient history."""
-    if patient_id not in _medication_history:
-        _medication_history[patient_id] = []
-    entry = {
+    """Save a prescription to patient history (keeps last 20 entries)."""
+    _medication_history[patient_id].append({
         "prescribed_at": prescription["generated_at"],
         "stage": prescription["stage"],
         "medications": prescription["primary_plan"],
-    }
-    _medication_history[patient_id].append(entry)
-    # Keep last 20 entries
-    _medication_history[patient_id] = _medication_history[patient_id][-20:]
+    })
 
-def get_medication_history(patient_id: str) -> List[dict]:
-    return _medication_history.get(patient_id, [])
+def get_medication_history(patient_id: str, limit: Optional[int] = None) -> List[dict]:
+    """Stored prescriptions, oldest first; only the newest `limit` if given."""
+    history = _medication_history.get(patient_id, ())
+    if limit is None or limit >= len(history):
+        return list(history)
+    return list(islice(reversed(history), limit))[::-1]
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  5. BP PREDICTION ENGINE (weighted logistic model)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _bp_base_logit(hr: float, sodium: float, age: float, bmi: float) -> float:
+    """Logit terms that medication does not change (shared by before/after z)."""
+    return (
+        0.015 * max(0, hr - 80)
+      + 0.010 * max(0, sodium - 135)
+      + 0.008 * max(0, age - 50)
+      + 0.010 * max(0, bmi - 25)
+    )
+
+
+def _bp_logit(sys_val: float, dia_val: float, map_val: float, base_z: float,
+              risk_pct: float, risk_weight: float) -> float:
+    """Numeric core of predict_bp_outcome: weighted excess over normal limits (logit z)."""
+    return (
+        0.030 * max(0, sys_val - 120)
+      + 0.025 * max(0, dia_val - 80)
+      + 0.020 * max(0, map_val - 90)
+      + base_z
+      + risk_weight * (risk_pct / 100)
+    )
+
+
+def _tick_jitter(tick: int) -> float:
+    """
+    Deterministic wobble for the final prediction: slow oscillation (±0.03)
+    plus hashed uniform noise (±0.02), both derived from the reading index.
+    """
+    osc = math.sin(tick * 0.1) * 0.03
+    noise = ((tick * 2654435761) & 0xFFFF) / 65535.0 * 0.04 - 0.02
+    return osc + noise
+
+
+# Expected reduction per drug: name → (systolic mmHg, diastolic mmHg, class)
+_DRUG_EFFECTS = {
+    "Lisinopril":          (12, 8, "ACE Inhibitor"),
+    "Losartan":            (10, 7, "ARB"),
+    "Valsartan":           (14, 9, "ARB"),
+    "Amlodipine":          (10, 6, "Calcium Channel Blocker"),
+    "Hydrochlorothiazide": (8,  5, "Diuretic"),
+}
+_NO_DRUG_EFFECT = (0, 0, "Unknown")
+
+
 def predict_bp_outcome(sub_params: dict, risk_pct: float,
-                       prescription: dict = None) -> dict:
+                       prescription: dict = None, tick: int = 0) -> dict:
     """
     24-hour outcome prediction using weighted logistic formula.
     Correlates sub-parameters + active medications together.
     Shows: before-medication risk, medication impact, after-medication risk,
            which meds are used as input, and final correlated prediction.
+    `tick` is the patient's reading index; it drives the display wobble so the
+    same inputs at the same tick always give the same prediction.
     """
     sys_val   = sub_params["systolic"]
     dia_val   = sub_params["diastolic"]
@@ -248,29 +347,12 @@ def predict_bp_outcome(sub_params: dict, risk_pct: float,
     bmi       = sub_params["bmi"]
 
     # ── A. BEFORE-MEDICATION RISK (raw vitals, no drug benefit) ──────────
-    z_before = (
-        0.030 * max(0, sys_val - 120)
-      + 0.025 * max(0, dia_val - 80)
-      + 0.020 * max(0, map_val - 90)
-      + 0.015 * max(0, hr - 80)
-      + 0.010 * max(0, sodium - 135)
-      + 0.008 * max(0, age - 50)
-      + 0.010 * max(0, bmi - 25)
-      + 0.012 * (risk_pct / 100)
-    )
+    base_z = _bp_base_logit(hr, sodium, age, bmi)
+    z_before = _bp_logit(sys_val, dia_val, map_val, base_z, risk_pct, 0.012)
     sig_before = 1 / (1 + math.exp(-z_before))
     risk_before_pct = min(95, max(3, round(sig_before * 100, 1)))
 
     # ── B. MEDICATION IMPACT (how drugs reduce BP) ──────────────────────
-    # Each drug has a known expected systolic/diastolic reduction
-    DRUG_EFFECTS = {
-        "Lisinopril":          {"sys_reduce": 12, "dia_reduce": 8,  "class": "ACE Inhibitor"},
-        "Losartan":            {"sys_reduce": 10, "dia_reduce": 7,  "class": "ARB"},
-        "Valsartan":           {"sys_reduce": 14, "dia_reduce": 9,  "class": "ARB"},
-        "Amlodipine":          {"sys_reduce": 10, "dia_reduce": 6,  "class": "Calcium Channel Blocker"},
-        "Hydrochlorothiazide": {"sys_reduce": 8,  "dia_reduce": 5,  "class": "Diuretic"},
-    }
-
     active_meds = []
     total_sys_reduce = 0
     total_dia_reduce = 0
@@ -278,15 +360,13 @@ def predict_bp_outcome(sub_params: dict, risk_pct: float,
     if prescription and prescription.get("primary_plan"):
         for med in prescription["primary_plan"]:
             drug_name = med["medication"]
-            effect = DRUG_EFFECTS.get(drug_name, {})
-            sys_r = effect.get("sys_reduce", 0)
-            dia_r = effect.get("dia_reduce", 0)
+            sys_r, dia_r, drug_class = _DRUG_EFFECTS.get(drug_name, _NO_DRUG_EFFECT)
             total_sys_reduce += sys_r
             total_dia_reduce += dia_r
             active_meds.append({
                 "medication": drug_name,
                 "dosage": med["dosage"],
-                "drug_class": effect.get("class", "Unknown"),
+                "drug_class": drug_class,
                 "timing": med["timing"],
                 "expected_sys_reduction": sys_r,
                 "expected_dia_reduction": dia_r,
@@ -296,26 +376,16 @@ def predict_bp_outcome(sub_params: dict, risk_pct: float,
     # ── C. AFTER-MEDICATION RISK (projected with drug effect) ───────────
     sys_after = max(90, sys_val - total_sys_reduce)
     dia_after = max(60, dia_val - total_dia_reduce)
-    map_after = round((2 * dia_after + sys_after) / 3, 1)
+    map_after = (2 * dia_after + sys_after) / 3
 
-    z_after = (
-        0.030 * max(0, sys_after - 120)
-      + 0.025 * max(0, dia_after - 80)
-      + 0.020 * max(0, map_after - 90)
-      + 0.015 * max(0, hr - 80)
-      + 0.010 * max(0, sodium - 135)
-      + 0.008 * max(0, age - 50)
-      + 0.010 * max(0, bmi - 25)
-      + 0.005 * (risk_pct / 100)   # lower weight since meds active
-    )
+    # Lower current-risk weight since meds active
+    z_after = _bp_logit(sys_after, dia_after, map_after, base_z, risk_pct, 0.005)
     sig_after = 1 / (1 + math.exp(-z_after))
     risk_after_pct = min(95, max(3, round(sig_after * 100, 1)))
 
     # ── D. FINAL CORRELATED PREDICTION ──────────────────────────────────
     # Use the AFTER-medication z for final outcome since meds are administered
-    osc = math.sin(time.time() * 0.1) * 0.03
-    noise = random.gauss(0, 0.02)
-    z_final = z_after + osc + noise
+    z_final = z_after + _tick_jitter(tick)
     sigmoid_final = 1 / (1 + math.exp(-z_final))
 
     prob_worsen  = min(95, max(3, round(sigmoid_final * 100, 1)))
@@ -343,7 +413,7 @@ def predict_bp_outcome(sub_params: dict, risk_pct: float,
         # Projected vitals after medication
         "projected_sys_after_med": round(sys_after, 1),
         "projected_dia_after_med": round(dia_after, 1),
-        "projected_map_after_med": map_after,
+        "projected_map_after_med": round(map_after, 1),
         # Medication inputs used for prediction
         "medication_inputs": active_meds,
         "total_sys_reduction": total_sys_reduce,
@@ -373,77 +443,89 @@ def predict_bp_outcome(sub_params: dict, risk_pct: float,
 #  6. HOURLY VARIANCE DATA (time-series BP logs)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-_bp_hourly_log: Dict[str, List[dict]] = {}
+_bp_hourly_log: Dict[str, deque] = defaultdict(lambda: deque(maxlen=60))
+
+# Readings analysed per patient (drives the deterministic prediction wobble)
+_bp_ticks: Dict[str, int] = {}
 
 def record_bp_reading(patient_id: str, sbp: float, dbp: float,
-                      map_val: float, risk_pct: float, before_food: bool = True):
-    """Store a BP reading for variance chart."""
-    if patient_id not in _bp_hourly_log:
-        _bp_hourly_log[patient_id] = []
+                      map_val: float, risk_pct: float, before_food: bool = True,
+                      timestamp: Optional[str] = None):
+    """Store a BP reading for variance chart (keeps last 60 entries, ~1 hour at polling rate)."""
     _bp_hourly_log[patient_id].append({
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
         "systolic": round(sbp, 1),
         "diastolic": round(dbp, 1),
         "map": round(map_val, 1),
         "risk_pct": round(risk_pct, 1),
         "before_food": before_food,
     })
-    # Keep last 60 entries (~1 hour at polling rate)
-    _bp_hourly_log[patient_id] = _bp_hourly_log[patient_id][-60:]
 
 def get_bp_hourly_log(patient_id: str) -> List[dict]:
-    return _bp_hourly_log.get(patient_id, [])
+    return list(_bp_hourly_log.get(patient_id, ()))
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  7. BP-SPECIFIC ALERT CONDITIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Alert rules in check order: (severity, message template). Conditions:
+# MAP < 65, sodium > 150, HR > 110, BP risk > 80%
+_BP_ALERT_RULES = (
+    ("critical", "MAP {} mmHg < 65 — Organ perfusion at risk"),
+    ("critical", "Sodium {} mEq/L > 150 — Electrolyte imbalance"),
+    ("warning", "Heart Rate {} bpm > 110 — Tachycardia"),
+    ("critical", "BP Risk {}% > 80% — Critical monitoring required"),
+)
+
+
+def _bp_alert(rule: int, value: float, patient_id: str, patient_name: str,
+              bed: str, ts: str) -> dict:
+    severity, message = _BP_ALERT_RULES[rule]
+    return {
+        "type": "BP_ALERT", "severity": severity,
+        "message": message.format(value),
+        "patient_id": patient_id, "patient_name": patient_name,
+        "bed": bed, "timestamp": ts,
+    }
+
+
 def check_bp_alerts(patient_id: str, patient_name: str, bed: str,
-                    sub_params: dict, risk_pct: float) -> List[dict]:
+                    sub_params: dict, risk_pct: float, timestamp: Optional[str] = None) -> List[dict]:
     """
     Check BP-specific alert conditions.
     Returns list of alert dicts.
     """
-    alerts = []
-    ts = datetime.now(timezone.utc).isoformat()
+    ts = timestamp or datetime.now(timezone.utc).isoformat()
 
     map_val = sub_params["map"]
     sodium  = sub_params["sodium"]
     hr      = sub_params["heart_rate"]
 
-    if map_val < 65:
-        alerts.append({
-            "type": "BP_ALERT", "severity": "critical",
-            "message": f"MAP {map_val} mmHg < 65 — Organ perfusion at risk",
-            "patient_id": patient_id, "patient_name": patient_name,
-            "bed": bed, "timestamp": ts,
-        })
-
-    if sodium > 150:
-        alerts.append({
-            "type": "BP_ALERT", "severity": "critical",
-            "message": f"Sodium {sodium} mEq/L > 150 — Electrolyte imbalance",
-            "patient_id": patient_id, "patient_name": patient_name,
-            "bed": bed, "timestamp": ts,
-        })
-
-    if hr > 110:
-        alerts.append({
-            "type": "BP_ALERT", "severity": "warning",
-            "message": f"Heart Rate {hr} bpm > 110 — Tachycardia",
-            "patient_id": patient_id, "patient_name": patient_name,
-            "bed": bed, "timestamp": ts,
-        })
-
-    if risk_pct > 80:
-        alerts.append({
-            "type": "BP_ALERT", "severity": "critical",
-            "message": f"BP Risk {risk_pct}% > 80% — Critical monitoring required",
-            "patient_id": patient_id, "patient_name": patient_name,
-            "bed": bed, "timestamp": ts,
-        })
+    values = (map_val, sodium, hr, risk_pct)
+    hits = (map_val < 65, sodium > 150, hr > 110, risk_pct > 80)
+    return [_bp_alert(rule, values[rule], patient_id, patient_name, bed, ts)
+            for rule in range(len(_BP_ALERT_RULES)) if hits[rule]]
+
 
+def check_bp_alerts_batch(patient_ids: List[str], patient_names: List[str], beds: List[str],
+                          map_vals, sodium, hr, risk_pct,
+                          timestamp: Optional[str] = None) -> List[List[dict]]:
+    """
+    check_bp_alerts for N patients at once (numeric arguments are length-N arrays).
+    All conditions are evaluated as one (N, 4) boolean mask; alert dicts are
+    built only for the set entries. Returns one alert list per patient.
+    """
+    ts = timestamp or datetime.now(timezone.utc).isoformat()
+    values = np.column_stack([map_vals, sodium, hr, risk_pct]).astype(float)
+    hits = np.column_stack([values[:, 0] < 65, values[:, 1] > 150,
+                            values[:, 2] > 110, values[:, 3] > 80])
+
+    alerts: List[List[dict]] = [[] for _ in patient_ids]
+    rows, rules = np.nonzero(hits)   # row-major, so rules stay in check order
+    for i, rule in zip(rows.tolist(), rules.tolist()):
+        alerts[i].append(_bp_alert(rule, values[i, rule].item(), patient_ids[i],
+                                   patient_names[i], beds[i], ts))
     return alerts
 
 
@@ -453,7 +535,8 @@ def check_bp_alerts(patient_id: str, patient_name: str, bed: str,
 
 def run_bp_analysis(patient_id: str, patient_name: str, bed: str,
                     sbp: float, dbp: float, hr: float,
-                    sodium: float, age: int, bmi: float) -> dict:
+                    sodium: float, age: int, bmi: float,
+                    history_limit: Optional[int] = ANALYSIS_HISTORY_LIMIT) -> dict:
     """
     Run the full BP analysis pipeline for a patient:
     1. Calculate sub-parameters
@@ -464,39 +547,80 @@ def run_bp_analysis(patient_id: str, patient_name: str, bed: str,
     6. Record hourly variance
     7. Check BP alerts
     Returns: complete BP analysis dict (the full data structure).
+    medication_history carries the newest `history_limit` entries (None = all).
     """
+    # One clock read shared by every timestamp in this analysis
+    now = datetime.now(timezone.utc)
+
     # 1. Sub-parameters
     sub_params = calc_sub_parameters(sbp, dbp, hr, sodium, age, bmi)
 
     # 2. Risk
     risk = calc_bp_risk(sub_params)
 
+    # 7. Alerts
+    bp_alerts = check_bp_alerts(patient_id, patient_name, bed, sub_params, risk["percentage"], now.isoformat())
+
+    return _bp_report(patient_id, patient_name, bed, sbp, dbp, sub_params, risk, bp_alerts, now, history_limit)
+
+
+def _bp_report(patient_id: str, patient_name: str, bed: str, sbp: float, dbp: float,
+               sub_params: dict, risk: dict, bp_alerts: List[dict], now: datetime,
+               history_limit: Optional[int]) -> dict:
+    """Steps 3–6 of the pipeline for a scored patient, assembled into the BP payload."""
+    ts = now.isoformat()
+
     # 3. Prescription
-    prescription = generate_prescription(sub_params, risk)
+    prescription = generate_prescription(sub_params, risk, now)
 
     # 4. Store medication
     if prescription["primary_plan"]:
         store_medication(patient_id, prescription)
 
     # 5. Prediction (correlates sub-params + medication together)
-    prediction = predict_bp_outcome(sub_params, risk["percentage"], prescription)
+    _bp_ticks[patient_id] = tick = _bp_ticks.get(patient_id, 0) + 1
+    prediction = predict_bp_outcome(sub_params, risk["percentage"], prescription, tick)
 
     # 6. Record variance data
-    record_bp_reading(patient_id, sbp, dbp, sub_params["map"], risk["percentage"])
-
-    # 7. Alerts
-    bp_alerts = check_bp_alerts(patient_id, patient_name, bed, sub_params, risk["percentage"])
+    record_bp_reading(patient_id, sbp, dbp, sub_params["map"], risk["percentage"], timestamp=ts)
 
     return {
         "patient_id": patient_id,
         "patient_name": patient_name,
         "bed": bed,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": ts,
         "bp_sub_parameters": sub_params,
         "risk_score": risk,
         "prescription_plan": prescription,
-        "medication_history": get_medication_history(patient_id),
+        "medication_history": get_medication_history(patient_id, history_limit),
         "prediction_output": prediction,
         "hourly_variance_data": get_bp_hourly_log(patient_id),
         "bp_alerts": bp_alerts,
     }
+
+
+def run_bp_analysis_batch(patients: List[dict],
+                          history_limit: Optional[int] = ANALYSIS_HISTORY_LIMIT) -> List[dict]:
+    """
+    run_bp_analysis for many patients (dicts with pid, name, bed, sbp, dbp, hr,
+    sodium, age, bmi). Risk is scored for all patients with calc_bp_risk_batch and
+    alerts with check_bp_alerts_batch; prescriptions, predictions and logs stay
+    per patient.
+    """
+    if not patients:
+        return []
+    now = datetime.now(timezone.utc)
+    ts = now.isoformat()
+    subs = [calc_sub_parameters(p["sbp"], p["dbp"], p["hr"], p["sodium"], p["age"], p["bmi"])
+            for p in patients]
+    cols = np.array([[s["systolic"], s["diastolic"], s["map"], s["heart_rate"],
+                      s["sodium"], s["age"], s["bmi"]] for s in subs], dtype=float)
+    raw, pct, mask = calc_bp_risk_batch(*cols.T)
+    risks = [_bp_risk_dict(r, m) for r, m in zip(raw.tolist(), mask.tolist())]
+    alerts = check_bp_alerts_batch([p["pid"] for p in patients], [p["name"] for p in patients],
+                                   [p["bed"] for p in patients],
+                                   cols[:, 2], cols[:, 4], cols[:, 3], pct, ts)
+
+    return [_bp_report(p["pid"], p["name"], p["bed"], p["sbp"], p["dbp"],
+                       sub, risk, bp_alerts, now, history_limit)
+            for p, sub, risk, bp_alerts in zip(patients, subs, risks, alerts)]
@@ -11,80 +11,193 @@ Features computed:
 
 import numpy as np
 from models.schemas import PatientBaseline
+from models.xgboost_model import FEATURE_NAMES
 
+# Number of most recent readings used per feature window
+FEATURE_WINDOW = 20
 
-def engineer_features(vitals_history: list[dict], baseline: PatientBaseline) -> dict:
+# History matrices are (readings, 5) arrays with columns in
+# vitals_simulator.VITAL_COLUMNS order: hr, spo2, rr, temp, sbp
+
+# Least-squares slope weights per window length, built on first use
+_SLOPE_WEIGHTS: dict[int, np.ndarray] = {}
+
+# Decimal places each feature is rounded to
+_FEATURE_DECIMALS = {name: 4 if name == "hr_trend" else 3 for name in FEATURE_NAMES}
+_COL = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+def engineer_features(vitals_history: np.ndarray, baseline: PatientBaseline) -> dict:
     """
     Compute 9 engineered features from the last N vitals readings.
     
     Args:
-        vitals_history: List of vitals dicts (from vitals_simulator)
+        vitals_history: (n, 5) history matrix (from vitals_simulator.get_vitals_matrix)
         baseline: Patient's healthy baseline vitals
     
     Returns:
         Feature dict with 9 named features for model input
     """
-    if not vitals_history:
-        # Return neutral (low-risk) features if no history yet
-        return {
-            "hr_mean": baseline.hr,
-            "hr_trend": 0.0,
-            "hr_variability": 0.0,
-            "spo2_mean": baseline.spo2,
-            "spo2_deviation": 0.0,
-            "rr_mean": baseline.rr,
-            "rr_rate_of_change": 0.0,
-            "temp_deviation": 0.0,
-            "sbp_mean": baseline.sbp,
-        }
+    if not len(vitals_history):
+        return _neutral_features(baseline)
 
     # Use most recent 20 readings for feature computation
-    recent = vitals_history[-20:] if len(vitals_history) >= 20 else vitals_history
+    return _window_features(vitals_history[-FEATURE_WINDOW:], baseline)
 
-    hr_vals = np.array([v["hr"] for v in recent])
-    spo2_vals = np.array([v["spo2"] for v in recent])
-    rr_vals = np.array([v["rr"] for v in recent])
-    temp_vals = np.array([v["temp"] for v in recent])
-    sbp_vals = np.array([v["sbp"] for v in recent])
 
-    # --- Heart Rate Features ---
-    hr_mean = float(np.mean(hr_vals))
+def engineer_features_two_windows(vitals_history: np.ndarray,
+                                  baseline: PatientBaseline) -> tuple[dict, dict]:
+    """
+    Compute features for the current window and for the window ending halfway
+    through history (used by the forecast trend estimate).
 
-    # Trend: slope of HR over time (positive = increasing = worse)
-    if len(hr_vals) >= 2:
-        x = np.arange(len(hr_vals))
-        hr_trend = float(np.polyfit(x, hr_vals, 1)[0])  # linear slope
+    Equivalent to engineer_features(history) and engineer_features(history[:n//2]);
+    both windows are zero-copy slices of the same history matrix.
+
+    Returns:
+        Tuple of (current_features, older_half_features)
+    """
+    mid = len(vitals_history) // 2
+    if not len(vitals_history):
+        current = _neutral_features(baseline)
+    else:
+        current = _window_features(vitals_history[-FEATURE_WINDOW:], baseline)
+    if mid:
+        older = _window_features(vitals_history[:mid][-FEATURE_WINDOW:], baseline)
     else:
-        hr_trend = 0.0
+        older = _neutral_features(baseline)
+    return current, older
 
-    # Variability: std deviation (high variability = concerning)
-    hr_variability = float(np.std(hr_vals))
 
-    # --- SpO2 Features ---
-    spo2_mean = float(np.mean(spo2_vals))
+def engineer_features_batch(histories: list[np.ndarray],
+                            baselines: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Compute engineered features for many patients into one model-ready matrix.
+
+    Args:
+        histories: (n, 5) history matrix per patient
+        baselines: Baseline columns keyed by vital ("hr", "spo2", "rr", "temp", "sbp"),
+                   each aligned with histories (see patient_store's SoA columns)
+
+    Returns:
+        (N, 9) float array, columns in FEATURE_NAMES order
+    """
+    n = len(histories)
+    out = np.zeros((n, len(FEATURE_NAMES)))
+    # Patients without history keep neutral features (baseline means, zero deltas)
+    out[:, _COL["hr_mean"]] = baselines["hr"]
+    out[:, _COL["spo2_mean"]] = baselines["spo2"]
+    out[:, _COL["rr_mean"]] = baselines["rr"]
+    out[:, _COL["sbp_mean"]] = baselines["sbp"]
+    temp_mean = np.array(baselines["temp"], dtype=float)
+
+    # Patients are grouped by window length (almost always one group of full
+    # 20-reading windows); each group is stacked into one (K, n, 5) array and
+    # reduced together
+    groups: dict[int, list[int]] = {}
+    for i, history in enumerate(histories):
+        n = min(len(history), FEATURE_WINDOW)
+        if n:
+            groups.setdefault(n, []).append(i)
+
+    for n, rows in groups.items():
+        windows = np.stack([histories[i][-n:] for i in rows])
+        stats = _window_stats_batch(windows)
+        temp_mean[rows] = stats.pop("temp_mean")
+        for name, values in stats.items():
+            out[rows, _COL[name]] = values
+
+    out[:, _COL["spo2_deviation"]] = out[:, _COL["spo2_mean"]] - baselines["spo2"]
+    out[:, _COL["temp_deviation"]] = temp_mean - baselines["temp"]
+    for name, decimals in _FEATURE_DECIMALS.items():
+        out[:, _COL[name]] = np.round(out[:, _COL[name]], decimals)
+    return out
+
+
+def _neutral_features(baseline: PatientBaseline) -> dict:
+    """Neutral (low-risk) features used when there is no history yet."""
+    return {
+        "hr_mean": baseline.hr,
+        "hr_trend": 0.0,
+        "hr_variability": 0.0,
+        "spo2_mean": baseline.spo2,
+        "spo2_deviation": 0.0,
+        "rr_mean": baseline.rr,
+        "rr_rate_of_change": 0.0,
+        "temp_deviation": 0.0,
+        "sbp_mean": baseline.sbp,
+    }
+
+
+def _window_features(window: np.ndarray, baseline: PatientBaseline) -> dict:
+    """Compute the 9 features from a non-empty (readings, 5) window."""
+    stats = _window_stats(window)
+
     # Deviation from healthy baseline (negative = dropped below baseline = worse)
-    spo2_deviation = float(spo2_mean - baseline.spo2)
+    spo2_deviation = stats["spo2_mean"] - baseline.spo2
+    temp_deviation = stats.pop("temp_mean") - baseline.temp
+
+    features = {**stats, "spo2_deviation": spo2_deviation, "temp_deviation": temp_deviation}
+    return {name: round(features[name], decimals) for name, decimals in _FEATURE_DECIMALS.items()}
+
+
+def _window_stats(window: np.ndarray) -> dict:
+    """Baseline-independent statistics of a non-empty (readings, 5) window."""
+    # One column-wise reduction gives every vital's mean
+    hr_mean, spo2_mean, rr_mean, temp_mean, sbp_mean = window.mean(axis=0).tolist()
+    hr_vals = window[:, 0]
+
+    # --- Heart Rate Features ---
+    # Trend: slope of HR over time (positive = increasing = worse)
+    hr_trend = float(hr_vals @ _slope_weights(len(hr_vals)))  # linear slope
+
+    # Variability: std deviation (high variability = concerning)
+    hr_variability = float(hr_vals.std())
 
     # --- Respiration Rate Features ---
-    rr_mean = float(np.mean(rr_vals))
     # Rate of change: difference between last reading and first in window
-    rr_rate_of_change = float(rr_vals[-1] - rr_vals[0]) if len(rr_vals) >= 2 else 0.0
+    rr_rate_of_change = float(window[-1, 2] - window[0, 2])
+
+    return {
+        "hr_mean": hr_mean,
+        "hr_trend": hr_trend,
+        "hr_variability": hr_variability,
+        "spo2_mean": spo2_mean,
+        "rr_mean": rr_mean,
+        "rr_rate_of_change": rr_rate_of_change,
+        "temp_mean": temp_mean,
+        "sbp_mean": sbp_mean,
+    }
 
-    # --- Temperature Features ---
-    temp_mean = float(np.mean(temp_vals))
-    temp_deviation = float(temp_mean - baseline.temp)
 
-    # --- Blood Pressure Features ---
-    sbp_mean = float(np.mean(sbp_vals))
+def _window_stats_batch(windows: np.ndarray) -> dict:
+    """_window_stats for a stack of equal-length (K, readings, 5) windows, as (K,) arrays."""
+    means = windows.mean(axis=1)
+    hr_vals = windows[:, :, 0]
+
+    # Least-squares slope of every row at once (closed form, see _slope_weights)
+    hr_trend = hr_vals @ _slope_weights(windows.shape[1])
 
     return {
-        "hr_mean": round(hr_mean, 3),
-        "hr_trend": round(hr_trend, 4),
-        "hr_variability": round(hr_variability, 3),
-        "spo2_mean": round(spo2_mean, 3),
-        "spo2_deviation": round(spo2_deviation, 3),
-        "rr_mean": round(rr_mean, 3),
-        "rr_rate_of_change": round(rr_rate_of_change, 3),
-        "temp_deviation": round(temp_deviation, 3),
-        "sbp_mean": round(sbp_mean, 3),
+        "hr_mean": means[:, 0],
+        "hr_trend": hr_trend,
+        "hr_variability": hr_vals.std(axis=1),
+        "spo2_mean": means[:, 1],
+        "rr_mean": means[:, 2],
+        "rr_rate_of_change": windows[:, -1, 2] - windows[:, 0, 2],
+        "temp_mean": means[:, 3],
+        "sbp_mean": means[:, 4],
     }
+
+
+def _slope_weights(n: int) -> np.ndarray:
+    """
+    Weights w such that y @ w is the least-squares slope of y against 0..n-1:
+    w_i = (i - mean) / sum((i - mean)²). All zeros for n < 2 (no trend).
+    """
+    weights = _SLOPE_WEIGHTS.get(n)
+    if weights is None:
+        centered = np.arange(n) - (n - 1) / 2
+        denom = float(centered @ centered)
+        weights = _SLOPE_WEIGHTS[n] = centered / denom if denom else np.zeros(n)
+    return weights
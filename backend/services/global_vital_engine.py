@@ -4,51 +4,100 @@ Combines all vital module outputs into an overall stability score,
 24-hour deterioration risk, ICU transfer probability, and
 medication escalation probability.
 """
-from typing import Dict
-from services.bp_engine import run_bp_analysis
-from services.hr_engine import run_hr_analysis
-from services.spo2_engine import run_spo2_analysis
-from services.rr_engine import run_rr_analysis
-from services.temp_engine import run_temp_analysis
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List
+from services.bp_engine import run_bp_analysis_batch
+from services.hr_engine import run_hr_analysis_batch
+from services.spo2_engine import run_spo2_analysis_batch, SPO2_NOISE_DRAWS
+from services.rr_engine import run_rr_analysis_batch
+from services.temp_engine import run_temp_analysis_batch, TEMP_NOISE_DRAWS
 
-def run_global_analysis(pid: str, name: str, bed: str,
-                        sbp: float, dbp: float, hr: float, spo2: float,
-                        rr: float, temp: float, sodium: float, age: int,
-                        bmi: float) -> dict:
-    """Run all 5 vital engines and produce a global correlated report."""
-    bp   = run_bp_analysis(pid, name, bed, sbp, dbp, hr, sodium, age, bmi)
-    hr_r = run_hr_analysis(pid, name, bed, hr, age)
-    spo2_r = run_spo2_analysis(pid, name, bed, spo2, rr)
-    rr_r = run_rr_analysis(pid, name, bed, rr, spo2)
-    temp_r = run_temp_analysis(pid, name, bed, temp, hr)
+# Weights of each vital's risk in the combined score (bp, hr, spo2, rr, temp)
+_VITAL_WEIGHTS = np.array([0.30, 0.25, 0.20, 0.15, 0.10])
 
-    # Weighted stability score (inverse of average risk)
-    bp_risk   = bp["risk_score"]["percentage"]
-    hr_risk   = hr_r["risk_score"]["percentage"]
-    spo2_risk = spo2_r["risk_score"]["percentage"]
-    rr_risk   = rr_r["risk_score"]["percentage"]
-    temp_risk = temp_r["risk_score"]["percentage"]
+_rng = np.random.default_rng()
 
-    weighted_risk = (bp_risk * 0.30 + hr_risk * 0.25 + spo2_risk * 0.20
-                     + rr_risk * 0.15 + temp_risk * 0.10)
-    stability = max(0, min(100, round(100 - weighted_risk, 1)))
+# (status, color) indexed by np.digitize(stability, _STABILITY_BINS)
+_STABILITY_BINS = np.array([25, 50, 75])
+_STABILITY_LEVELS = (
+    ("Critical", "red"),
+    ("High Alert", "orange"),
+    ("Monitor Closely", "yellow"),
+    ("Stable", "green"),
+)
 
-    if stability >= 75:  status, color = "Stable", "green"
-    elif stability >= 50: status, color = "Monitor Closely", "yellow"
-    elif stability >= 25: status, color = "High Alert", "orange"
-    else: status, color = "Critical", "red"
+
+def run_global_analysis_batch(patients: List[dict]) -> List[dict]:
+    """
+    Run all 5 vital engines for many patients and produce a global correlated
+    report per patient. Each patient dict carries pid, name, bed, sbp, dbp, hr,
+    spo2, rr, temp, sodium, age and bmi. The HR, RR, SpO₂ and Temp engines
+    score the whole batch as arrays; the BP engine scores risk as arrays and
+    builds plans and predictions per patient.
+    Risk weighting, stability status and predictions are computed for all
+    patients in one vectorized pass.
+    """
+    if not patients:
+        return []
+    bp_results = run_bp_analysis_batch(patients)
+    # The global report only reads risk percentages, so skip the factor breakdowns
+    hr_results = run_hr_analysis_batch(patients, with_breakdown=False)
+    rr_results = run_rr_analysis_batch(patients, with_breakdown=False)
+    # One noise draw and clock read per tick for the SpO₂ and Temp engines (own rows each)
+    noise = _rng.standard_normal((SPO2_NOISE_DRAWS + TEMP_NOISE_DRAWS, len(patients)))
+    now = datetime.now(timezone.utc)
+    spo2_results = run_spo2_analysis_batch(patients, with_breakdown=False,
+                                           noise=noise[:SPO2_NOISE_DRAWS], now=now)
+    temp_results = run_temp_analysis_batch(patients, with_breakdown=False,
+                                           noise=noise[SPO2_NOISE_DRAWS:], now=now)
+    engine_results = list(zip(bp_results, hr_results, spo2_results, rr_results, temp_results))
+
+    # (N, 5) per-vital risk percentages, columns in _VITAL_WEIGHTS order
+    risks = np.array([[r["risk_score"]["percentage"] for r in results]
+                      for results in engine_results], dtype=float)
+    weighted_risk = risks @ _VITAL_WEIGHTS
+    stability = np.clip(np.round(100 - weighted_risk, 1), 0, 100)
+    levels = np.digitize(stability, _STABILITY_BINS).tolist()
 
     # Predictions
-    deterioration_24h = min(95, max(3, round(weighted_risk * 0.9, 1)))
-    icu_transfer = min(95, max(2, round(weighted_risk * 0.65, 1)))
-    med_escalation = min(95, max(2, round(weighted_risk * 0.5, 1)))
+    deterioration_24h = np.clip(np.round(weighted_risk * 0.9, 1), 3, 95).tolist()
+    icu_transfer = np.clip(np.round(weighted_risk * 0.65, 1), 2, 95).tolist()
+    med_escalation = np.clip(np.round(weighted_risk * 0.5, 1), 2, 95).tolist()
+
+    reports = []
+    for i, (p, (bp, hr_r, spo2_r, rr_r, temp_r)) in enumerate(zip(patients, engine_results)):
+        bp_risk, hr_risk, spo2_risk, rr_risk, temp_risk = risks[i].tolist()
+        status, color = _STABILITY_LEVELS[levels[i]]
 
-    # Combine all alerts
-    all_alerts = (bp.get("bp_alerts", []) + hr_r.get("alerts", []) +
-                  spo2_r.get("alerts", []) + rr_r.get("alerts", []) +
-                  temp_r.get("alerts", []))
+        # Combine all alerts
+        all_alerts = (bp.get("bp_alerts", []) + hr_r.get("alerts", []) +
+                      spo2_r.get("alerts", []) + rr_r.get("alerts", []) +
+                      temp_r.get("alerts", []))
 
-    # Medication summary
+        reports.append({
+            "patient_id": p["pid"], "patient_name": p["name"], "bed": p["bed"],
+            "overall_stability_score": stability[i].item(),
+            "stability_status": status,
+            "stability_color": color,
+            "vital_risks": {
+                "bp": bp_risk, "hr": hr_risk, "spo2": spo2_risk,
+                "rr": rr_risk, "temp": temp_risk,
+            },
+            "predictions": {
+                "deterioration_24h": deterioration_24h[i],
+                "icu_transfer_probability": icu_transfer[i],
+                "medication_escalation_probability": med_escalation[i],
+            },
+            "active_medications": _active_medications(bp, hr_r, spo2_r, rr_r, temp_r),
+            "total_alerts": len(all_alerts),
+            "alerts": all_alerts,
+        })
+    return reports
+
+
+def _active_medications(bp: dict, hr_r: dict, spo2_r: dict, rr_r: dict, temp_r: dict) -> List[dict]:
+    """Medication summary across all vital modules."""
     active_meds = []
     for src, label in [(bp, "BP"), (hr_r, "HR"), (temp_r, "Temp")]:
         plan_key = "prescription_plan" if "prescription_plan" in src else "support_plan"
@@ -66,22 +115,4 @@ def run_global_analysis(pid: str, name: str, bed: str,
                 med_name = m.get("support", m.get("therapy", "Unknown"))
                 active_meds.append({"vital": label, "medication": med_name,
                                     "dosage": m.get("dosage", m.get("flow_rate", "")), "stage": plan.get("stage", "")})
-
-    return {
-        "patient_id": pid, "patient_name": name, "bed": bed,
-        "overall_stability_score": stability,
-        "stability_status": status,
-        "stability_color": color,
-        "vital_risks": {
-            "bp": bp_risk, "hr": hr_risk, "spo2": spo2_risk,
-            "rr": rr_risk, "temp": temp_risk,
-        },
-        "predictions": {
-            "deterioration_24h": deterioration_24h,
-            "icu_transfer_probability": icu_transfer,
-            "medication_escalation_probability": med_escalation,
-        },
-        "active_medications": active_meds,
-        "total_alerts": len(all_alerts),
-        "alerts": all_alerts,
-    }
+    return active_meds
@@ -4,18 +4,40 @@ Sub-parameters, risk scoring, medication engine, prescription,
 before/after tracking, prediction, variance, and alerts.
 ALL rule-based.
 """
-import math, random, time
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List
+import math
+import numpy as np
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional
+from services.noise_pool import gauss, oscillation
+from services.reading_ring import ReadingRing
+from services.rounding import clamp_round
 
 # ═════════════════════════════════════════════════════════════════════
 #  1. SUB-PARAMETER CALCULATION
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_hr_sub_parameters(hr: float, age: int, resting_hr: float = None) -> dict:
+@dataclass(slots=True)
+class HRSub:
+    """HR sub-parameters; serialized with asdict() only in the report payload."""
+    current_hr: float
+    resting_hr: float
+    hrv: float
+    tachycardia: bool
+    severe_tachycardia: bool
+    bradycardia: bool
+    severe_bradycardia: bool
+    age: int
+    normal_range: list
+
+def calc_hr_sub_parameters(hr: float, age: int, resting_hr: float = None) -> HRSub:
     if resting_hr is None:
         resting_hr = 72.0 if age < 60 else 68.0
-    hrv = round(abs(hr - resting_hr) * 1.2 + random.gauss(0, 3), 1)
+    hrv = round(abs(hr - resting_hr) * 1.2 + gauss(3), 1)
     hrv = max(5, min(80, hrv))
     # Age-adjusted normal range
     if age < 40:
@@ -24,59 +46,75 @@ def calc_hr_sub_parameters(hr: float, age: int, resting_hr: float = None) -> dic
         normal_lo, normal_hi = 58, 95
     else:
         normal_lo, normal_hi = 55, 90
-    return {
-        "current_hr": round(hr, 1),
-        "resting_hr": round(resting_hr, 1),
-        "hrv": hrv,
-        "tachycardia": hr > 100,
-        "severe_tachycardia": hr > 120,
-        "bradycardia": hr < 60,
-        "severe_bradycardia": hr < 50,
-        "age": age,
-        "normal_range": [normal_lo, normal_hi],
-    }
+    return _hr_sub(hr, resting_hr, hrv, age, [normal_lo, normal_hi])
+
+def _hr_sub(hr: float, resting_hr: float, hrv: float, age: int, normal_range: list) -> HRSub:
+    return HRSub(round(hr, 1), round(resting_hr, 1), hrv,
+                 hr > 100, hr > 120, hr < 60, hr < 50, age, normal_range)
 
 # ═════════════════════════════════════════════════════════════════════
 #  2. RISK CALCULATION
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_hr_risk(sub: dict) -> dict:
-    hr = sub["current_hr"]
-    hrv = sub["hrv"]
-    age = sub["age"]
-    raw = 0
-    breakdown = []
-
-    if hr > 120:
-        raw += 30; breakdown.append({"factor": "Severe Tachycardia >120 bpm", "points": 30})
-    elif hr > 100:
-        raw += 15; breakdown.append({"factor": "Tachycardia >100 bpm", "points": 15})
-    if hr < 50:
-        raw += 30; breakdown.append({"factor": "Severe Bradycardia <50 bpm", "points": 30})
-    elif hr < 60:
-        raw += 15; breakdown.append({"factor": "Bradycardia <60 bpm", "points": 15})
-    if hrv > 40:
-        raw += 10; breakdown.append({"factor": "High HRV >40ms", "points": 10})
-    if hrv < 10:
-        raw += 15; breakdown.append({"factor": "Very Low HRV <10ms (autonomic risk)", "points": 15})
-    if age > 65:
-        raw += 10; breakdown.append({"factor": "Age >65 years", "points": 10})
-
-    max_score = 75
-    pct = min(100, round((raw / max_score) * 100, 1))
+# (label, points) per risk factor; the tachycardia and bradycardia tiers are exclusive
+_HR_RISK_FACTORS = (
+    ("Severe Tachycardia >120 bpm", 30),
+    ("Tachycardia >100 bpm", 15),
+    ("Severe Bradycardia <50 bpm", 30),
+    ("Bradycardia <60 bpm", 15),
+    ("High HRV >40ms", 10),
+    ("Very Low HRV <10ms (autonomic risk)", 15),
+    ("Age >65 years", 10),
+)
+_HR_MAX_SCORE = 75
+
+# Factor bits per band, indexed by the value in tenths (hr and hrv are rounded
+# to 0.1, so this is exact): hr 0–300 bpm → bits 0–3, hrv 0–100 ms → bits 4–5
+_HR_LUT_TOP = 3000
+_HRV_LUT_TOP = 1000
+_HR_BAND_BITS = tuple(
+    (d > 1200) | (1000 < d <= 1200) << 1 | (d < 500) << 2 | (500 <= d < 600) << 3
+    for d in range(_HR_LUT_TOP + 1)
+)
+_HRV_BAND_BITS = tuple((d > 400) << 4 | (d < 100) << 5 for d in range(_HRV_LUT_TOP + 1))
+_HR_AGE_BIT = 1 << 6
+# Raw score for every possible factor bitmask
+_HR_MASK_POINTS = tuple(
+    sum(points for bit, (_, points) in enumerate(_HR_RISK_FACTORS) if mask >> bit & 1)
+    for mask in range(1 << len(_HR_RISK_FACTORS))
+)
+
+def _tenths(value: float, top: int) -> int:
+    return min(max(int(round(value * 10)), 0), top)
+
+def calc_hr_risk(sub: HRSub, with_breakdown: bool = True) -> dict:
+    hrv = sub.hrv
+    mask = (_HR_BAND_BITS[_tenths(sub.current_hr, _HR_LUT_TOP)]
+            | _HRV_BAND_BITS[_tenths(hrv, _HRV_LUT_TOP)]
+            | (_HR_AGE_BIT if sub.age > 65 else 0))
+    raw = _HR_MASK_POINTS[mask]
+    breakdown = _hr_breakdown(mask) if with_breakdown else None
+    pct = min(100, round((raw / _HR_MAX_SCORE) * 100, 1))
 
     # Derived metrics
-    cardiac_stress = min(100, round(pct * 1.1 + random.gauss(0, 2), 1))
-    arrhythmia_prob = min(95, max(2, round(pct * 0.6 + (hrv / 5) + random.gauss(0, 3), 1)))
-    deterioration_12h = min(95, max(3, round(pct * 0.8 + random.gauss(0, 4), 1)))
+    cardiac_stress = min(100, round(pct * 1.1 + gauss(2), 1))
+    arrhythmia_prob = clamp_round(pct * 0.6 + (hrv / 5) + gauss(3), 2, 95)
+    deterioration_12h = clamp_round(pct * 0.8 + gauss(4), 3, 95)
+    return _hr_risk_dict(raw, pct, cardiac_stress, arrhythmia_prob, deterioration_12h, breakdown)
+
+def _hr_breakdown(mask: int) -> List[dict]:
+    return [{"factor": label, "points": points}
+            for bit, (label, points) in enumerate(_HR_RISK_FACTORS) if mask >> bit & 1]
 
-    if pct >= 75:  cat, col = "Critical", "red"
-    elif pct >= 50: cat, col = "High", "orange"
-    elif pct >= 25: cat, col = "Moderate", "yellow"
-    else: cat, col = "Normal", "green"
+# (category, color) per 25-point band of the risk percentage; 100% shares the top band
+_HR_RISK_BANDS = (("Normal", "green"), ("Moderate", "yellow"), ("High", "orange"),
+                  ("Critical", "red"), ("Critical", "red"))
+
+def _hr_risk_dict(raw, pct, cardiac_stress, arrhythmia_prob, deterioration_12h, breakdown) -> dict:
+    cat, col = _HR_RISK_BANDS[int(pct) // 25]
 
     return {
-        "raw_score": raw, "max_possible": max_score, "percentage": pct,
+        "raw_score": raw, "max_possible": _HR_MAX_SCORE, "percentage": pct,
         "category": cat, "color": col,
         "cardiac_stress_pct": cardiac_stress,
         "arrhythmia_probability": arrhythmia_prob,
@@ -94,128 +132,164 @@ DRUG_EFFECTS_HR = {
     "Diltiazem":    {"hr_reduce": 10, "class": "Calcium Channel Blocker"},
     "Atropine":     {"hr_increase": 20, "class": "Anticholinergic"},
 }
-
-def generate_hr_prescription(sub: dict, risk: dict) -> dict:
-    hr = sub["current_hr"]
+# Flat view for the hot path: name → (hr_reduce, hr_increase, class)
+_HR_DRUG_FLAT = {name: (eff.get("hr_reduce", 0), eff.get("hr_increase", 0), eff["class"])
+                 for name, eff in DRUG_EFFECTS_HR.items()}
+_NO_HR_DRUG = (0, 0, "Unknown")
+
+class HRStage(IntEnum):
+    SEVERE_TACHYCARDIA = 0
+    TACHYCARDIA = 1
+    SEVERE_BRADYCARDIA = 2
+    BRADYCARDIA = 3
+    NORMAL = 4
+
+# Display name per HRStage
+_HR_STAGE_NAMES = tuple(stage.name.replace("_", " ") for stage in HRStage)
+
+# Per HRStage: (primary plan, alternative plan or None, clinical notes)
+_HR_PLANS = (
+    (  # SEVERE TACHYCARDIA
+        ({"medication": "Metoprolol", "dosage": "25–50 mg", "frequency": "Twice daily",
+          "timing": "After food", "meal_period": "Morning & Evening", "duration_days": 30,
+          "expected_hr_reduction": 15},
+         {"medication": "Diltiazem", "dosage": "30 mg", "frequency": "Three times daily",
+          "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 14,
+          "expected_hr_reduction": 10}),
+        None,
+        "Urgent HR control needed. Continuous cardiac monitoring. ECG review mandatory.",
+    ),
+    (  # TACHYCARDIA
+        ({"medication": "Metoprolol", "dosage": "12.5–25 mg", "frequency": "Once daily",
+          "timing": "After food", "meal_period": "Morning", "duration_days": 30,
+          "expected_hr_reduction": 15},),
+        ({"medication": "Atenolol", "dosage": "25 mg", "frequency": "Once daily",
+          "timing": "Before food", "meal_period": "Morning", "duration_days": 30,
+          "expected_hr_reduction": 12},),
+        "Beta-blocker therapy. Monitor for hypotension. Reassess in 2 weeks.",
+    ),
+    (  # SEVERE BRADYCARDIA
+        ({"medication": "Atropine", "dosage": "0.5–1 mg", "frequency": "As needed (IV)",
+          "timing": "Emergency", "meal_period": "N/A", "duration_days": 1,
+          "expected_hr_increase": 20},),
+        None,
+        "CRITICAL: Cardiology review STAT. Consider temporary pacing. Stop all HR-lowering medications.",
+    ),
+    (  # BRADYCARDIA
+        (), None,
+        "Monitor closely. Avoid HR-lowering BP meds (beta-blockers, diltiazem). Cardiology consult if symptomatic.",
+    ),
+    (  # NORMAL
+        (), None,
+        "Heart rate within normal limits. Continue routine monitoring.",
+    ),
+)
+
+@lru_cache(maxsize=32)
+def _dated_hr_plan(stage: HRStage, today: date) -> tuple:
+    """_HR_PLANS entry with start/end dates filled in — built once per stage per day."""
+    primary, alternative, notes = _HR_PLANS[stage]
+    def dated(plan):
+        return tuple(MappingProxyType({**med, "start_date": today.strftime("%Y-%m-%d"),
+                                       "end_date": (today + timedelta(days=med["duration_days"])).strftime("%Y-%m-%d")})
+                     for med in plan)
+    return dated(primary), None if alternative is None else dated(alternative), notes
+
+def _pick_hr_stage(hr: float, risk_pct: float) -> HRStage:
+    if hr > 120 or risk_pct > 75: return HRStage.SEVERE_TACHYCARDIA
+    if hr > 100: return HRStage.TACHYCARDIA
+    if hr < 50: return HRStage.SEVERE_BRADYCARDIA
+    if hr < 60: return HRStage.BRADYCARDIA
+    return HRStage.NORMAL
+
+def generate_hr_prescription(sub: HRSub, risk: dict, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    hr = sub.current_hr
     risk_pct = risk["percentage"]
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    if hr > 120 or risk_pct > 75:
-        stage = "SEVERE TACHYCARDIA"
-        primary = [
-            {"medication": "Metoprolol", "dosage": "25–50 mg", "frequency": "Twice daily",
-             "timing": "After food", "meal_period": "Morning & Evening", "duration_days": 30,
-             "expected_hr_reduction": 15},
-            {"medication": "Diltiazem", "dosage": "30 mg", "frequency": "Three times daily",
-             "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 14,
-             "expected_hr_reduction": 10},
-        ]
-        alternative = None
-        notes = "Urgent HR control needed. Continuous cardiac monitoring. ECG review mandatory."
-    elif hr > 100:
-        stage = "TACHYCARDIA"
-        primary = [
-            {"medication": "Metoprolol", "dosage": "12.5–25 mg", "frequency": "Once daily",
-             "timing": "After food", "meal_period": "Morning", "duration_days": 30,
-             "expected_hr_reduction": 15},
-        ]
-        alternative = [
-            {"medication": "Atenolol", "dosage": "25 mg", "frequency": "Once daily",
-             "timing": "Before food", "meal_period": "Morning", "duration_days": 30,
-             "expected_hr_reduction": 12},
-        ]
-        notes = "Beta-blocker therapy. Monitor for hypotension. Reassess in 2 weeks."
-    elif hr < 50:
-        stage = "SEVERE BRADYCARDIA"
-        primary = [
-            {"medication": "Atropine", "dosage": "0.5–1 mg", "frequency": "As needed (IV)",
-             "timing": "Emergency", "meal_period": "N/A", "duration_days": 1,
-             "expected_hr_increase": 20},
-        ]
-        alternative = None
-        notes = "CRITICAL: Cardiology review STAT. Consider temporary pacing. Stop all HR-lowering medications."
-    elif hr < 60:
-        stage = "BRADYCARDIA"
-        primary = []
-        alternative = None
-        notes = "Monitor closely. Avoid HR-lowering BP meds (beta-blockers, diltiazem). Cardiology consult if symptomatic."
-    else:
-        stage = "NORMAL"
-        primary = []
-        alternative = None
-        notes = "Heart rate within normal limits. Continue routine monitoring."
 
-    for plan in [primary, alternative or []]:
-        for med in plan:
-            med["start_date"] = today
-            med["end_date"] = (datetime.now(timezone.utc) + timedelta(days=med["duration_days"])).strftime("%Y-%m-%d")
+    stage = _pick_hr_stage(hr, risk_pct)
+    primary, alternative, notes = _dated_hr_plan(stage, now.date())
 
     return {
-        "stage": stage, "primary_plan": primary, "alternative_plan": alternative,
-        "clinical_notes": notes, "generated_at": datetime.now(timezone.utc).isoformat(),
+        "stage": _HR_STAGE_NAMES[stage], "primary_plan": [dict(med) for med in primary],
+        "alternative_plan": None if alternative is None else [dict(med) for med in alternative],
+        "clinical_notes": notes, "generated_at": now.isoformat(),
     }
 
 # ═════════════════════════════════════════════════════════════════════
 #  4. MEDICATION HISTORY
 # ═════════════════════════════════════════════════════════════════════
-_hr_med_history: Dict[str, List[dict]] = {}
+_hr_med_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
 
 def store_hr_medication(pid: str, rx: dict):
-    if pid not in _hr_med_history: _hr_med_history[pid] = []
     _hr_med_history[pid].append({"prescribed_at": rx["generated_at"], "stage": rx["stage"], "medications": rx["primary_plan"]})
-    _hr_med_history[pid] = _hr_med_history[pid][-20:]
 
 def get_hr_med_history(pid: str) -> List[dict]:
-    return _hr_med_history.get(pid, [])
+    return list(_hr_med_history.get(pid, ()))
 
 # ═════════════════════════════════════════════════════════════════════
 #  5. PREDICTION ENGINE (with medication correlation)
 # ═════════════════════════════════════════════════════════════════════
 
-def predict_hr_outcome(sub: dict, risk_pct: float, prescription: dict = None) -> dict:
-    hr = sub["current_hr"]
-    hrv = sub["hrv"]
-    age = sub["age"]
-
+def predict_hr_outcome(sub: HRSub, risk_pct: float, prescription: dict = None) -> dict:
+    # Medication impact
+    active_meds, total_hr_effect = _hr_medication_inputs(prescription)
+    osc = oscillation() + gauss(0.02)
+    risk_before, hr_after, risk_after, prob_stable, prob_improve = _predict_hr_core(
+        sub.current_hr, sub.hrv, sub.age, risk_pct, total_hr_effect, osc)
+    return _hr_outcome_dict(sub, risk_pct, risk_before, risk_after, prob_stable, prob_improve,
+                            hr_after, active_meds, total_hr_effect)
+
+def _predict_hr_core(hr: float, hrv: float, age: float, risk_pct: float,
+                     total_hr_effect: float, osc: float) -> tuple:
+    """
+    Numeric core of predict_hr_outcome (floats in, floats out; clock and noise
+    come in through `osc`). Returns (risk_before, hr_after, risk_after,
+    prob_stable, prob_improve).
+    """
     # Before-medication risk
     z_before = (0.025 * max(0, hr - 80) + 0.020 * max(0, 60 - hr) + 0.015 * max(0, 40 - hrv)
                 + 0.008 * max(0, age - 50) + 0.012 * (risk_pct / 100))
     sig_b = 1 / (1 + math.exp(-z_before))
-    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+    risk_before = clamp_round(sig_b * 100, 3, 95)
 
-    # Medication impact
+    # After-medication
+    hr_after = max(45, hr - total_hr_effect)
+    z_after = (0.025 * max(0, hr_after - 80) + 0.020 * max(0, 60 - hr_after) + 0.015 * max(0, 40 - hrv)
+               + 0.008 * max(0, age - 50) + 0.005 * (risk_pct / 100))
+    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
+    risk_after = clamp_round(sig_a * 100, 3, 95)
+
+    prob_stable = clamp_round((1 - sig_a) * 60, 3, 95)
+    prob_improve = round(max(2, 100 - risk_after - prob_stable), 1)
+    total = risk_after + prob_stable + prob_improve
+    if total != 100: prob_stable = round(prob_stable + (100 - total), 1)
+    return risk_before, hr_after, risk_after, prob_stable, prob_improve
+
+def _hr_medication_inputs(prescription: dict) -> tuple:
+    """Active medications and their net HR effect (bpm lowered) for a prescription."""
     active_meds = []
     total_hr_effect = 0
     if prescription and prescription.get("primary_plan"):
         for med in prescription["primary_plan"]:
-            eff = DRUG_EFFECTS_HR.get(med["medication"], {})
-            hr_r = eff.get("hr_reduce", 0)
-            hr_i = eff.get("hr_increase", 0)
+            hr_r, hr_i, drug_class = _HR_DRUG_FLAT.get(med["medication"], _NO_HR_DRUG)
             total_hr_effect += (hr_r - hr_i)
             active_meds.append({
                 "medication": med["medication"], "dosage": med["dosage"],
-                "drug_class": eff.get("class", "Unknown"), "timing": med["timing"],
+                "drug_class": drug_class, "timing": med["timing"],
                 "expected_hr_change": f"↓{hr_r} bpm" if hr_r else f"↑{hr_i} bpm",
                 "status": "Active",
             })
+    return active_meds, total_hr_effect
 
-    # After-medication
-    hr_after = max(45, hr - total_hr_effect)
-    z_after = (0.025 * max(0, hr_after - 80) + 0.020 * max(0, 60 - hr_after) + 0.015 * max(0, 40 - hrv)
-               + 0.008 * max(0, age - 50) + 0.005 * (risk_pct / 100))
-    osc = math.sin(time.time() * 0.1) * 0.03 + random.gauss(0, 0.02)
-    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
-    risk_after = min(95, max(3, round(sig_a * 100, 1)))
-
-    prob_worsen = min(95, max(3, round(sig_a * 100, 1)))
-    prob_stable = min(95, max(3, round((1 - sig_a) * 60, 1)))
-    prob_improve = round(max(2, 100 - prob_worsen - prob_stable), 1)
-    total = prob_worsen + prob_stable + prob_improve
-    if total != 100: prob_stable = round(prob_stable + (100 - total), 1)
+# (trend, color) indexed by how many of the 40% / 60% worsening thresholds are met
+_HR_TRENDS = (("Improving", "green"), ("Stable", "yellow"), ("Worsening", "red"))
 
-    if prob_worsen >= 60: trend, tc = "Worsening", "red"
-    elif prob_worsen >= 40: trend, tc = "Stable", "yellow"
-    else: trend, tc = "Improving", "green"
+def _hr_outcome_dict(sub, risk_pct, risk_before, risk_after, prob_stable, prob_improve,
+                     hr_after, active_meds, total_hr_effect) -> dict:
+    hr = sub.current_hr
+    prob_worsen = risk_after
+    trend, tc = _HR_TRENDS[(prob_worsen >= 40) + (prob_worsen >= 60)]
 
     return {
         "risk_before_medication": risk_before, "risk_after_medication": risk_after,
@@ -225,61 +299,155 @@ def predict_hr_outcome(sub: dict, risk_pct: float, prescription: dict = None) ->
         "prob_worsening": prob_worsen, "prob_stabilization": prob_stable,
         "prob_improvement": prob_improve, "trend": trend, "trend_color": tc,
         "horizon": "12 hours",
-        "input_parameters": {"current_hr": hr, "resting_hr": sub["resting_hr"], "hrv": hrv,
-                             "age": age, "current_risk": risk_pct},
+        "input_parameters": {"current_hr": hr, "resting_hr": sub.resting_hr, "hrv": sub.hrv,
+                             "age": sub.age, "current_risk": risk_pct},
     }
 
 # ═════════════════════════════════════════════════════════════════════
 #  6. HOURLY VARIANCE
 # ═════════════════════════════════════════════════════════════════════
-_hr_log: Dict[str, List[dict]] = {}
+_hr_log: Dict[str, ReadingRing] = defaultdict(lambda: ReadingRing(60))
 
-def record_hr_reading(pid: str, hr: float, risk_pct: float):
-    if pid not in _hr_log: _hr_log[pid] = []
-    _hr_log[pid].append({"timestamp": datetime.now(timezone.utc).isoformat(),
-                          "hr": round(hr, 1), "risk_pct": round(risk_pct, 1)})
-    _hr_log[pid] = _hr_log[pid][-60:]
+def record_hr_reading(pid: str, hr: float, risk_pct: float, timestamp: Optional[str] = None):
+    _hr_log[pid].append(timestamp or datetime.now(timezone.utc).isoformat(),
+                        round(hr, 1), round(risk_pct, 1))
 
 def get_hr_log(pid: str) -> List[dict]:
-    return _hr_log.get(pid, [])
+    ring = _hr_log.get(pid)
+    return ring.as_dicts("hr") if ring else []
 
 # ═════════════════════════════════════════════════════════════════════
 #  7. ALERTS
 # ═════════════════════════════════════════════════════════════════════
 
-def check_hr_alerts(pid: str, name: str, bed: str, sub: dict, risk_pct: float) -> List[dict]:
-    alerts = []
-    ts = datetime.now(timezone.utc).isoformat()
-    hr = sub["current_hr"]
-    if hr > 120:
-        alerts.append({"type": "HR_ALERT", "severity": "critical", "message": f"Severe Tachycardia: HR {hr} bpm >120", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    elif hr > 100:
-        alerts.append({"type": "HR_ALERT", "severity": "warning", "message": f"Tachycardia: HR {hr} bpm >100", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if hr < 50:
-        alerts.append({"type": "HR_ALERT", "severity": "critical", "message": f"Severe Bradycardia: HR {hr} bpm <50", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    elif hr < 60:
-        alerts.append({"type": "HR_ALERT", "severity": "warning", "message": f"Bradycardia: HR {hr} bpm <60", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if risk_pct > 80:
-        alerts.append({"type": "HR_ALERT", "severity": "critical", "message": f"HR Risk {risk_pct}% >80% — Critical monitoring", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    return alerts
+# (severity, message template) in check order: HR >120, 100<HR≤120, HR <50, 50≤HR<60, risk >80%
+_HR_ALERT_RULES = (
+    ("critical", "Severe Tachycardia: HR {} bpm >120"),
+    ("warning", "Tachycardia: HR {} bpm >100"),
+    ("critical", "Severe Bradycardia: HR {} bpm <50"),
+    ("warning", "Bradycardia: HR {} bpm <60"),
+    ("critical", "HR Risk {}% >80% — Critical monitoring"),
+)
+
+def check_hr_alerts(pid: str, name: str, bed: str, sub: HRSub, risk_pct: float,
+                    timestamp: Optional[str] = None) -> List[dict]:
+    ts = timestamp or datetime.now(timezone.utc).isoformat()
+    hr = sub.current_hr
+    hits = (hr > 120, 100 < hr <= 120, hr < 50, 50 <= hr < 60, risk_pct > 80)
+    values = (hr, hr, hr, hr, risk_pct)
+    return [_hr_alert(severity, message.format(value), pid, name, bed, ts)
+            for hit, value, (severity, message) in zip(hits, values, _HR_ALERT_RULES) if hit]
+
+def _hr_alert(severity: str, message: str, pid: str, name: str, bed: str, ts: str) -> dict:
+    return {"type": "HR_ALERT", "severity": severity, "message": message,
+            "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts}
 
 # ═════════════════════════════════════════════════════════════════════
 #  MASTER FUNCTION
 # ═════════════════════════════════════════════════════════════════════
 
 def run_hr_analysis(pid: str, name: str, bed: str, hr: float, age: int, resting_hr: float = None) -> dict:
+    now = datetime.now(timezone.utc)  # one clock read for every timestamp below
     sub = calc_hr_sub_parameters(hr, age, resting_hr)
     risk = calc_hr_risk(sub)
-    rx = generate_hr_prescription(sub, risk)
+    rx = generate_hr_prescription(sub, risk, now)
     if rx["primary_plan"]: store_hr_medication(pid, rx)
     prediction = predict_hr_outcome(sub, risk["percentage"], rx)
-    record_hr_reading(pid, hr, risk["percentage"])
-    alerts = check_hr_alerts(pid, name, bed, sub, risk["percentage"])
+    return _hr_report(pid, name, bed, hr, sub, risk, rx, prediction, now.isoformat())
+
+def _hr_report(pid: str, name: str, bed: str, hr: float, sub: HRSub, risk: dict,
+               rx: dict, prediction: dict, ts: str) -> dict:
+    """Record the reading, check alerts and assemble the HR analysis payload."""
+    record_hr_reading(pid, hr, risk["percentage"], ts)
+    alerts = check_hr_alerts(pid, name, bed, sub, risk["percentage"], ts)
     return {
         "patient_id": pid, "patient_name": name, "bed": bed,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "sub_parameters": sub, "risk_score": risk,
+        "timestamp": ts,
+        "sub_parameters": asdict(sub), "risk_score": risk,
         "prescription_plan": rx, "medication_history": get_hr_med_history(pid),
         "prediction_output": prediction,
         "hourly_variance_data": get_hr_log(pid), "alerts": alerts,
     }
+
+# ═════════════════════════════════════════════════════════════════════
+#  BATCH MASTER FUNCTION (whole ward in one pass)
+# ═════════════════════════════════════════════════════════════════════
+_rng = np.random.default_rng()
+
+# Age-adjusted normal range [lo, hi] indexed by np.digitize(age, _HR_AGE_BINS)
+_HR_AGE_BINS = np.array([40, 65])
+_HR_NORMAL_RANGES = np.array([[60, 100], [58, 95], [55, 90]])
+_HR_BAND_BITS_ARR = np.array(_HR_BAND_BITS)
+_HRV_BAND_BITS_ARR = np.array(_HRV_BAND_BITS)
+_HR_MASK_POINTS_ARR = np.array(_HR_MASK_POINTS)
+
+def run_hr_analysis_batch(patients: List[dict], with_breakdown: bool = True) -> List[dict]:
+    """
+    run_hr_analysis for many patients. Each patient dict carries pid, name, bed,
+    hr, age and optionally resting_hr. Sub-parameters, risk scores, noise and
+    outcome probabilities are computed as arrays; prescriptions, history,
+    variance logs and alerts stay per patient. Callers that only read
+    risk_score["percentage"] can pass with_breakdown=False.
+    """
+    n = len(patients)
+    if not n:
+        return []
+    hr_in = np.array([p["hr"] for p in patients], dtype=float)
+    age = np.array([p["age"] for p in patients], dtype=float)
+    resting = np.array([np.nan if p.get("resting_hr") is None else p["resting_hr"] for p in patients])
+    resting = np.where(np.isnan(resting), np.where(age < 60, 72.0, 68.0), resting)
+
+    # 1. Sub-parameters
+    hrv = np.clip(np.round(np.abs(hr_in - resting) * 1.2 + _rng.normal(0, 3, n), 1), 5, 80)
+    ranges = _HR_NORMAL_RANGES[np.digitize(age, _HR_AGE_BINS)].tolist()
+    subs = [_hr_sub(h, r, v, p["age"], nr)
+            for p, h, r, v, nr in zip(patients, hr_in.tolist(), resting.tolist(), hrv.tolist(), ranges)]
+
+    # 2. Risk
+    hr = np.round(hr_in, 1)
+    mask = (_HR_BAND_BITS_ARR[np.clip(np.rint(hr * 10), 0, _HR_LUT_TOP).astype(int)]
+            | _HRV_BAND_BITS_ARR[np.clip(np.rint(hrv * 10), 0, _HRV_LUT_TOP).astype(int)]
+            | np.where(age > 65, _HR_AGE_BIT, 0))
+    raw = _HR_MASK_POINTS_ARR[mask]
+    pct = np.minimum(100, np.round(raw / _HR_MAX_SCORE * 100, 1))
+    cardiac_stress = np.minimum(100, np.round(pct * 1.1 + _rng.normal(0, 2, n), 1))
+    arrhythmia = np.clip(np.round(pct * 0.6 + hrv / 5 + _rng.normal(0, 3, n), 1), 2, 95)
+    deterioration = np.clip(np.round(pct * 0.8 + _rng.normal(0, 4, n), 1), 3, 95)
+    risks = [_hr_risk_dict(r, pc, cs, ar, de, _hr_breakdown(m) if with_breakdown else None)
+             for r, pc, cs, ar, de, m in zip(raw.tolist(), pct.tolist(), cardiac_stress.tolist(),
+                                             arrhythmia.tolist(), deterioration.tolist(), mask.tolist())]
+
+    # 3–4. Prescriptions and medication history (per patient)
+    now = datetime.now(timezone.utc)
+    rxs = [generate_hr_prescription(sub, risk, now) for sub, risk in zip(subs, risks)]
+    for p, rx in zip(patients, rxs):
+        if rx["primary_plan"]: store_hr_medication(p["pid"], rx)
+    med_inputs = [_hr_medication_inputs(rx) for rx in rxs]
+
+    # 5. Prediction
+    effect = np.array([total for _, total in med_inputs], dtype=float)
+    hr_after = np.maximum(45, hr - effect)
+    shared_z = 0.015 * np.maximum(0, 40 - hrv) + 0.008 * np.maximum(0, age - 50)
+    z_before = (0.025 * np.maximum(0, hr - 80) + 0.020 * np.maximum(0, 60 - hr) + shared_z
+                + 0.012 * (pct / 100))
+    z_after = (0.025 * np.maximum(0, hr_after - 80) + 0.020 * np.maximum(0, 60 - hr_after) + shared_z
+               + 0.005 * (pct / 100))
+    osc = oscillation() + _rng.normal(0, 0.02, n)
+    sig_a = 1 / (1 + np.exp(-(z_after + osc)))
+    risk_before = np.clip(np.round(100 / (1 + np.exp(-z_before)), 1), 3, 95)
+    risk_after = np.clip(np.round(sig_a * 100, 1), 3, 95)
+    prob_stable = np.clip(np.round((1 - sig_a) * 60, 1), 3, 95)
+    prob_improve = np.round(np.maximum(2, 100 - risk_after - prob_stable), 1)
+    total = risk_after + prob_stable + prob_improve
+    prob_stable = np.where(total != 100, np.round(prob_stable + (100 - total), 1), prob_stable)
+
+    reports = []
+    ts = now.isoformat()
+    rows = zip(patients, hr_in.tolist(), subs, risks, rxs, med_inputs, pct.tolist(),
+               risk_before.tolist(), risk_after.tolist(), prob_stable.tolist(),
+               prob_improve.tolist(), hr_after.tolist())
+    for p, h, sub, risk, rx, (meds, eff), r_pct, r_before, r_after, p_stable, p_improve, h_after in rows:
+        prediction = _hr_outcome_dict(sub, r_pct, r_before, r_after, p_stable, p_improve,
+                                      h_after, meds, eff)
+        reports.append(_hr_report(p["pid"], p["name"], p["bed"], h, sub, risk, rx, prediction, ts))
+    return reports
@@ -0,0 +1,47 @@
+"""
+Gaussian Noise Pool for VITALGUARD 2.0
+Scalar engine paths draw their display noise from a pre-generated block of
+standard normals instead of calling random.gauss per value. The block is
+regenerated with a single NumPy call when it runs out.
+
+Also holds the slow shared oscillation the outcome predictions wobble by.
+"""
+
+import math
+import time
+import numpy as np
+
+# Standard normals generated per refill
+NOISE_POOL_SIZE = 1 << 16
+
+_rng = np.random.default_rng()
+_pool: list[float] = []
+_idx = 0
+
+
+def gauss(sigma: float) -> float:
+    """Zero-mean normal draw with standard deviation `sigma`."""
+    global _pool, _idx
+    # Work on local copies so a concurrent refill can never index past the end
+    pool, i = _pool, _idx
+    if i >= len(pool):
+        pool = _pool = _rng.standard_normal(NOISE_POOL_SIZE).tolist()
+        i = 0
+    _idx = i + 1
+    return pool[i] * sigma
+
+
+# Outcome oscillation: sin(t * 0.1) * 0.03, recomputed at most every OSC_TTL_S
+OSC_TTL_S = 0.1
+_osc_cache = (0.0, 0.0)  # (expiry, value)
+
+
+def oscillation() -> float:
+    """Slow ±0.03 oscillation shared by every patient within the same OSC_TTL_S."""
+    global _osc_cache
+    now = time.time()
+    expiry, value = _osc_cache
+    if now >= expiry:
+        value = math.sin(now * 0.1) * 0.03
+        _osc_cache = (now + OSC_TTL_S, value)
+    return value
@@ -1,5 +1,6 @@
 # In-memory patient store (simulates Firestore in demo mode)
 # Each patient has: id, name, age, bed, admit_date, baseline vitals, severity
+import numpy as np
 from models.schemas import Patient, PatientBaseline
 
 PATIENTS: dict[str, dict] = {
@@ -52,3 +53,21 @@ PATIENTS: dict[str, dict] = {
         "baseline": {"hr": 75, "spo2": 99, "sbp": 123, "dbp": 82, "rr": 17, "temp": 36.9}
     },
 }
+
+
+# Validated baseline models, built once at load instead of on every request.
+# Baselines are static in demo mode; rebuild the entry if one is ever edited.
+BASELINES: dict[str, PatientBaseline] = {
+    pid: PatientBaseline(**p["baseline"]) for pid, p in PATIENTS.items()
+}
+
+# ─── Structure-of-Arrays view for batch scoring ───────────────────────────────
+# Row i of every column belongs to PATIENT_IDS[i]; look rows up via PID_INDEX.
+PATIENT_IDS: tuple[str, ...] = tuple(PATIENTS)
+PID_INDEX: dict[str, int] = {pid: i for i, pid in enumerate(PATIENT_IDS)}
+
+BASELINE_COLUMNS: dict[str, np.ndarray] = {
+    vital: np.array([PATIENTS[pid]["baseline"][vital] for pid in PATIENT_IDS], dtype=float)
+    for vital in ("hr", "spo2", "sbp", "dbp", "rr", "temp")
+}
+
@@ -0,0 +1,44 @@
+"""
+Reading Ring Buffer for VITALGUARD 2.0
+Fixed-size per-patient log of (timestamp, value, risk %) readings backing the
+vital modules' hourly variance data. Numbers live in one float array instead
+of a dict per reading; dicts are only built when the log is returned.
+"""
+
+import numpy as np
+from collections import deque
+
+
+class ReadingRing:
+    """
+    Ring buffer of the last `size` readings: a (value, risk_pct) row per
+    reading plus the matching timestamp strings.
+
+    Every row is written twice, at i and i + size, so the stored readings are
+    always one contiguous oldest-to-newest slice — view() is zero-copy.
+    """
+
+    __slots__ = ("data", "stamps", "size", "head", "count")
+
+    def __init__(self, size: int):
+        self.data = np.empty((2 * size, 2))
+        self.stamps: deque = deque(maxlen=size)
+        self.size = size
+        self.head = 0   # next write position
+        self.count = 0  # readings stored (≤ size)
+
+    def append(self, timestamp: str, value: float, risk_pct: float):
+        self.stamps.append(timestamp)
+        self.data[self.head] = self.data[self.head + self.size] = (value, risk_pct)
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def view(self) -> np.ndarray:
+        """Oldest-to-newest (count, 2) view of [value, risk_pct] rows."""
+        end = self.head + self.size
+        return self.data[end - self.count:end]
+
+    def as_dicts(self, value_key: str) -> list[dict]:
+        """The log as [{"timestamp", value_key, "risk_pct"}] dicts, oldest first."""
+        return [{"timestamp": ts, value_key: value, "risk_pct": risk_pct}
+                for ts, (value, risk_pct) in zip(self.stamps, self.view().tolist())]
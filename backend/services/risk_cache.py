@@ -0,0 +1,10 @@
+"""
+Risk Snapshot Cache for VITALGUARD 2.0
+Holds the most recent XGBoost risk score per patient so aggregate views
+(reports) can reuse scores already computed by the prediction/patient routes.
+"""
+
+from typing import Dict
+
+# patient_id → last computed risk score (0-100)
+LAST_RISK: Dict[str, float] = {}
@@ -3,8 +3,21 @@ Risk Classifier for VITALGUARD 2.0
 Converts a raw 0-100 risk score into a color-coded classification.
 """
 
+import heapq
+import numpy as np
 from models.schemas import RiskLevel
 
+# Bucket edges and the level for each np.digitize bucket index
+_RISK_BINS = np.array([40.0, 70.0])
+_RISK_LEVELS = np.array([RiskLevel.GREEN, RiskLevel.YELLOW, RiskLevel.RED], dtype=object)
+
+# UI color per risk level
+_COLOR_BY_LEVEL = {
+    RiskLevel.GREEN:  "#22c55e",
+    RiskLevel.YELLOW: "#f59e0b",
+    RiskLevel.RED:    "#ef4444",
+}
+
 
 def classify_risk(risk_score: float) -> RiskLevel:
     """
@@ -24,15 +37,26 @@ def classify_risk(risk_score: float) -> RiskLevel:
         return RiskLevel.RED      # Critical: 70-100%
 
 
+def classify_risk_batch(risk_scores) -> np.ndarray:
+    """
+    Vectorized classify_risk: one np.digitize call for a whole ward.
+
+    Returns:
+        Object array of RiskLevel values, one per score
+    """
+    return _RISK_LEVELS[np.digitize(risk_scores, _RISK_BINS)]
+
+
 def get_risk_color_hex(risk_level: RiskLevel) -> str:
     """Return hex color for a risk level (for UI rendering)."""
-    return {
-        RiskLevel.GREEN: "#22c55e",
-        RiskLevel.YELLOW: "#f59e0b",
-        RiskLevel.RED: "#ef4444",
-    }[risk_level]
+    return _COLOR_BY_LEVEL[risk_level]
 
 
 def sort_patients_by_risk(patients: list) -> list:
     """Sort patient list by descending risk score (highest risk first)."""
     return sorted(patients, key=lambda p: p.get("risk_score", 0), reverse=True)
+
+
+def top_k_by_risk(patients: list, k: int = 10) -> list:
+    """The k highest-risk patients, highest first (heap select, no full sort)."""
+    return heapq.nlargest(k, patients, key=lambda p: p.get("risk_score", 0))
@@ -0,0 +1,10 @@
+"""
+Rounding Helpers for VITALGUARD 2.0
+Small numeric helpers shared by the scalar engine paths.
+"""
+
+
+def clamp_round(value: float, lo: float, hi: float) -> float:
+    """min(hi, max(lo, round(value, 1))) without the builtin min/max calls."""
+    value = round(value, 1)
+    return lo if value <= lo else hi if value >= hi else value
@@ -3,59 +3,93 @@ Respiratory Rate Engine — VITALGUARD 2.0
 RR module: sub-parameters, risk, therapy/escalation engine,
 before/after tracking, prediction, variance, alerts.
 """
-import math, random, time
-from datetime import datetime, timezone, timedelta
+import math
+import numpy as np
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List
+from services.noise_pool import gauss, oscillation
+from services.reading_ring import ReadingRing
+from services.rounding import clamp_round
 
 # ═════════════════════════════════════════════════════════════════════
 #  1. SUB-PARAMETERS
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_rr_sub_parameters(rr: float, spo2: float) -> dict:
-    avg_24h = round(rr + random.gauss(0, 1.5), 1)
+@dataclass(slots=True)
+class RRSub:
+    """RR sub-parameters; serialized with asdict() only in the report payload."""
+    current_rr: float
+    avg_24h: float
+    tachypnea: bool
+    severe_tachypnea: bool
+    bradypnea: bool
+    severe_bradypnea: bool
+    spo2: float
+
+def calc_rr_sub_parameters(rr: float, spo2: float) -> RRSub:
+    avg_24h = round(rr + gauss(1.5), 1)
     avg_24h = max(6, min(45, avg_24h))
-    return {
-        "current_rr": round(rr, 1),
-        "avg_24h": avg_24h,
-        "tachypnea": rr > 20,
-        "severe_tachypnea": rr > 30,
-        "bradypnea": rr < 10,
-        "severe_bradypnea": rr < 8,
-        "spo2": round(spo2, 1),
-    }
+    return _rr_sub(rr, avg_24h, spo2)
+
+def _rr_sub(rr: float, avg_24h: float, spo2: float) -> RRSub:
+    return RRSub(round(rr, 1), avg_24h, rr > 20, rr > 30, rr < 10, rr < 8, round(spo2, 1))
 
 # ═════════════════════════════════════════════════════════════════════
 #  2. RISK
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_rr_risk(sub: dict) -> dict:
-    rr = sub["current_rr"]
-    raw = 0; breakdown = []
-    if rr > 30:
-        raw += 30; breakdown.append({"factor": "Severe Tachypnea RR >30", "points": 30})
-    elif rr > 25:
-        raw += 20; breakdown.append({"factor": "Tachypnea RR >25", "points": 20})
-    elif rr > 20:
-        raw += 10; breakdown.append({"factor": "Elevated RR >20", "points": 10})
-    if rr < 8:
-        raw += 30; breakdown.append({"factor": "Critical Bradypnea RR <8", "points": 30})
-    elif rr < 10:
-        raw += 15; breakdown.append({"factor": "Bradypnea RR <10", "points": 15})
-    if sub["spo2"] < 92:
-        raw += 15; breakdown.append({"factor": "Associated Hypoxia SpO₂ <92%", "points": 15})
-
-    max_score = 75
-    pct = min(100, round((raw / max_score) * 100, 1))
-    resp_failure = min(95, max(2, round(pct * 0.85 + random.gauss(0, 3), 1)))
-    icu_escalation = min(95, max(2, round(pct * 0.7 + random.gauss(0, 3), 1)))
-
-    if pct >= 75: cat, col = "Critical", "red"
-    elif pct >= 50: cat, col = "High", "orange"
-    elif pct >= 25: cat, col = "Moderate", "yellow"
-    else: cat, col = "Normal", "green"
+# (label, points) per risk factor; the tachypnea and bradypnea tiers are exclusive
+_RR_RISK_FACTORS = (
+    ("Severe Tachypnea RR >30", 30),
+    ("Tachypnea RR >25", 20),
+    ("Elevated RR >20", 10),
+    ("Critical Bradypnea RR <8", 30),
+    ("Bradypnea RR <10", 15),
+    ("Associated Hypoxia SpO₂ <92%", 15),
+)
+_RR_MAX_SCORE = 75
+
+# RR factor bits 0–4 indexed by rr in tenths (rr is rounded to 0.1, so this is exact), 0–100
+_RR_LUT_TOP = 1000
+_RR_BAND_BITS = tuple(
+    (d > 300) | (250 < d <= 300) << 1 | (200 < d <= 250) << 2 | (d < 80) << 3 | (80 <= d < 100) << 4
+    for d in range(_RR_LUT_TOP + 1)
+)
+_RR_HYPOXIA_BIT = 1 << 5
+# Raw score for every possible factor bitmask
+_RR_MASK_POINTS = tuple(
+    sum(points for bit, (_, points) in enumerate(_RR_RISK_FACTORS) if mask >> bit & 1)
+    for mask in range(1 << len(_RR_RISK_FACTORS))
+)
+
+def calc_rr_risk(sub: RRSub, with_breakdown: bool = True) -> dict:
+    d = min(max(int(round(sub.current_rr * 10)), 0), _RR_LUT_TOP)
+    mask = _RR_BAND_BITS[d] | (_RR_HYPOXIA_BIT if sub.spo2 < 92 else 0)
+    raw = _RR_MASK_POINTS[mask]
+    breakdown = _rr_breakdown(mask) if with_breakdown else None
+    pct = min(100, round((raw / _RR_MAX_SCORE) * 100, 1))
+    resp_failure = clamp_round(pct * 0.85 + gauss(3), 2, 95)
+    icu_escalation = clamp_round(pct * 0.7 + gauss(3), 2, 95)
+    return _rr_risk_dict(raw, pct, resp_failure, icu_escalation, breakdown)
+
+def _rr_breakdown(mask: int) -> List[dict]:
+    return [{"factor": label, "points": points}
+            for bit, (label, points) in enumerate(_RR_RISK_FACTORS) if mask >> bit & 1]
+
+# (category, color) per 25-point band of the risk percentage; 100% shares the top band
+_RR_RISK_BANDS = (("Normal", "green"), ("Moderate", "yellow"), ("High", "orange"),
+                  ("Critical", "red"), ("Critical", "red"))
+
+def _rr_risk_dict(raw, pct, resp_failure, icu_escalation, breakdown) -> dict:
+    cat, col = _RR_RISK_BANDS[int(pct) // 25]
 
     return {
-        "raw_score": raw, "max_possible": max_score, "percentage": pct,
+        "raw_score": raw, "max_possible": _RR_MAX_SCORE, "percentage": pct,
         "category": cat, "color": col,
         "respiratory_failure_prob": resp_failure,
         "icu_escalation_pct": icu_escalation,
@@ -72,94 +106,124 @@ THERAPY_EFFECTS = {
     "Oxygen Reassessment":      {"rr_reduce": 3, "type": "Oxygen Support"},
     "BiPAP Support":            {"rr_reduce": 8, "type": "Non-Invasive Ventilation"},
 }
+# Flat view for the hot path: name → (rr_reduce, type)
+_RR_THERAPY_FLAT = {name: (eff.get("rr_reduce", 0), eff["type"]) for name, eff in THERAPY_EFFECTS.items()}
+_NO_RR_THERAPY = (0, "Therapy")
+
+class RRStage(IntEnum):
+    SEVERE_TACHYPNEA = 0
+    TACHYPNEA = 1
+    ELEVATED = 2
+    NORMAL = 3
 
-def generate_rr_therapy(sub: dict, risk: dict) -> dict:
-    rr = sub["current_rr"]
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    if rr > 30 or risk["percentage"] > 75:
-        stage = "SEVERE TACHYPNEA"
-        primary = [
-            {"therapy": "Salbutamol Nebulization", "dosage": "2.5–5 mg", "frequency": "Every 4 hours",
-             "duration_days": 7, "monitoring": "Every 30 min", "expected_rr_reduction": 5},
-            {"therapy": "BiPAP Support", "dosage": "IPAP 12/EPAP 5", "frequency": "Continuous",
-             "duration_days": 3, "monitoring": "Continuous", "expected_rr_reduction": 8},
-        ]
-        alternative = None
-        notes = "ICU escalation alert. Prepare for intubation if RR remains >30. ABG and chest X-ray STAT."
-    elif rr > 25:
-        stage = "TACHYPNEA"
-        primary = [
-            {"therapy": "Salbutamol Nebulization", "dosage": "2.5 mg", "frequency": "Every 6 hours",
-             "duration_days": 5, "monitoring": "Every 1 hour", "expected_rr_reduction": 5},
-        ]
-        alternative = [
-            {"therapy": "Ipratropium Nebulization", "dosage": "0.5 mg", "frequency": "Every 6 hours",
-             "duration_days": 5, "monitoring": "Every 1 hour", "expected_rr_reduction": 4},
-        ]
-        notes = "Nebulization therapy initiated. Reassess oxygen if SpO₂ drops. Pulmonology consult if no improvement."
-    elif rr > 20:
-        stage = "ELEVATED"
-        primary = [
-            {"therapy": "Oxygen Reassessment", "dosage": "Titrate to SpO₂ >94%", "frequency": "Every 2 hours",
-             "duration_days": 3, "monitoring": "Every 2 hours", "expected_rr_reduction": 3},
-        ]
-        alternative = None
-        notes = "Mild RR elevation. Monitor trend. Deep breathing exercises. Ensure pain management adequate."
-    else:
-        stage = "NORMAL"
-        primary = []; alternative = None
-        notes = "Respiratory rate within normal limits. Continue routine monitoring."
-
-    for plan in [primary, alternative or []]:
-        for item in plan:
-            item["start_date"] = today
-            item["end_date"] = (datetime.now(timezone.utc) + timedelta(days=item["duration_days"])).strftime("%Y-%m-%d")
-
-    return {"stage": stage, "primary_plan": primary, "alternative_plan": alternative,
-            "clinical_notes": notes, "generated_at": datetime.now(timezone.utc).isoformat()}
+# Display name per RRStage
+_RR_STAGE_NAMES = tuple(stage.name.replace("_", " ") for stage in RRStage)
+
+# Per RRStage: (primary plan, alternative plan or None, clinical notes)
+_RR_PLANS = (
+    (  # SEVERE TACHYPNEA
+        ({"therapy": "Salbutamol Nebulization", "dosage": "2.5–5 mg", "frequency": "Every 4 hours",
+          "duration_days": 7, "monitoring": "Every 30 min", "expected_rr_reduction": 5},
+         {"therapy": "BiPAP Support", "dosage": "IPAP 12/EPAP 5", "frequency": "Continuous",
+          "duration_days": 3, "monitoring": "Continuous", "expected_rr_reduction": 8}),
+        None,
+        "ICU escalation alert. Prepare for intubation if RR remains >30. ABG and chest X-ray STAT.",
+    ),
+    (  # TACHYPNEA
+        ({"therapy": "Salbutamol Nebulization", "dosage": "2.5 mg", "frequency": "Every 6 hours",
+          "duration_days": 5, "monitoring": "Every 1 hour", "expected_rr_reduction": 5},),
+        ({"therapy": "Ipratropium Nebulization", "dosage": "0.5 mg", "frequency": "Every 6 hours",
+          "duration_days": 5, "monitoring": "Every 1 hour", "expected_rr_reduction": 4},),
+        "Nebulization therapy initiated. Reassess oxygen if SpO₂ drops. Pulmonology consult if no improvement.",
+    ),
+    (  # ELEVATED
+        ({"therapy": "Oxygen Reassessment", "dosage": "Titrate to SpO₂ >94%", "frequency": "Every 2 hours",
+          "duration_days": 3, "monitoring": "Every 2 hours", "expected_rr_reduction": 3},),
+        None,
+        "Mild RR elevation. Monitor trend. Deep breathing exercises. Ensure pain management adequate.",
+    ),
+    (  # NORMAL
+        (), None,
+        "Respiratory rate within normal limits. Continue routine monitoring.",
+    ),
+)
+
+@lru_cache(maxsize=32)
+def _dated_rr_plan(stage: RRStage, today: date) -> tuple:
+    """_RR_PLANS entry with start/end dates filled in — built once per stage per day."""
+    primary, alternative, notes = _RR_PLANS[stage]
+    def dated(plan):
+        return tuple(MappingProxyType({**item, "start_date": today.strftime("%Y-%m-%d"),
+                                       "end_date": (today + timedelta(days=item["duration_days"])).strftime("%Y-%m-%d")})
+                     for item in plan)
+    return dated(primary), None if alternative is None else dated(alternative), notes
+
+def _pick_rr_stage(rr: float, risk_pct: float) -> RRStage:
+    if rr > 30 or risk_pct > 75: return RRStage.SEVERE_TACHYPNEA
+    if rr > 25: return RRStage.TACHYPNEA
+    if rr > 20: return RRStage.ELEVATED
+    return RRStage.NORMAL
+
+def generate_rr_therapy(sub: RRSub, risk: dict, now: datetime = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    rr = sub.current_rr
+    stage = _pick_rr_stage(rr, risk["percentage"])
+    primary, alternative, notes = _dated_rr_plan(stage, now.date())
+
+    return {"stage": _RR_STAGE_NAMES[stage], "primary_plan": [dict(item) for item in primary],
+            "alternative_plan": None if alternative is None else [dict(item) for item in alternative],
+            "clinical_notes": notes, "generated_at": now.isoformat()}
 
 # ═════════════════════════════════════════════════════════════════════
 #  4–7. HISTORY, PREDICTION, VARIANCE, ALERTS
 # ═════════════════════════════════════════════════════════════════════
-_rr_history: Dict[str, List[dict]] = {}
-_rr_log: Dict[str, List[dict]] = {}
+_rr_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
+_rr_log: Dict[str, ReadingRing] = defaultdict(lambda: ReadingRing(60))
 
 def store_rr_therapy(pid, rx):
-    if pid not in _rr_history: _rr_history[pid] = []
     _rr_history[pid].append({"prescribed_at": rx["generated_at"], "stage": rx["stage"], "therapies": rx["primary_plan"]})
-    _rr_history[pid] = _rr_history[pid][-20:]
-def get_rr_therapy_history(pid): return _rr_history.get(pid, [])
+def get_rr_therapy_history(pid): return list(_rr_history.get(pid, ()))
 
 def predict_rr_outcome(sub, risk_pct, therapy=None):
-    rr = sub["current_rr"]
+    active_therapies, total_effect = _rr_therapy_inputs(therapy)
+    osc = oscillation() + gauss(0.02)
+    risk_before, rr_after, risk_after, ps, pi = _predict_rr_core(sub.current_rr, risk_pct, total_effect, osc)
+    return _rr_outcome_dict(sub, risk_pct, risk_before, risk_after, ps, pi, rr_after, active_therapies, total_effect)
+
+def _predict_rr_core(rr, risk_pct, total_effect, osc):
+    """Numeric core of predict_rr_outcome: (risk_before, rr_after, risk_after, ps, pi); floats only."""
     z_before = 0.030 * max(0, rr - 18) + 0.025 * max(0, 10 - rr) + 0.012 * (risk_pct / 100)
     sig_b = 1 / (1 + math.exp(-z_before))
-    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+    risk_before = clamp_round(sig_b * 100, 3, 95)
+
+    rr_after = max(8, rr - total_effect)
+    z_after = 0.030 * max(0, rr_after - 18) + 0.025 * max(0, 10 - rr_after) + 0.005 * (risk_pct / 100)
+    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
+    risk_after = clamp_round(sig_a * 100, 3, 95)
+
+    ps = clamp_round((1 - sig_a) * 60, 3, 95)
+    pi = round(max(2, 100 - risk_after - ps), 1)
+    t = risk_after + ps + pi
+    if t != 100: ps = round(ps + (100 - t), 1)
+    return risk_before, rr_after, risk_after, ps, pi
 
+def _rr_therapy_inputs(therapy):
+    """Active therapies and their combined RR reduction for a therapy plan."""
     active_therapies = []; total_effect = 0
     if therapy and therapy.get("primary_plan"):
         for t in therapy["primary_plan"]:
-            eff = THERAPY_EFFECTS.get(t["therapy"], {})
-            red = eff.get("rr_reduce", 0)
+            red, kind = _RR_THERAPY_FLAT.get(t["therapy"], _NO_RR_THERAPY)
             total_effect += red
             active_therapies.append({"therapy": t["therapy"], "dosage": t["dosage"],
-                                     "type": eff.get("type", "Therapy"), "expected_rr_reduction": red, "status": "Active"})
+                                     "type": kind, "expected_rr_reduction": red, "status": "Active"})
+    return active_therapies, total_effect
 
-    rr_after = max(8, rr - total_effect)
-    z_after = 0.030 * max(0, rr_after - 18) + 0.025 * max(0, 10 - rr_after) + 0.005 * (risk_pct / 100)
-    osc = math.sin(time.time() * 0.1) * 0.03 + random.gauss(0, 0.02)
-    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
-    risk_after = min(95, max(3, round(sig_a * 100, 1)))
+# (trend, color) indexed by how many of the 40% / 60% worsening thresholds are met
+_RR_TRENDS = (("Improving", "green"), ("Stable", "yellow"), ("Worsening", "red"))
 
-    pw = min(95, max(3, round(sig_a * 100, 1)))
-    ps = min(95, max(3, round((1 - sig_a) * 60, 1)))
-    pi = round(max(2, 100 - pw - ps), 1)
-    t = pw + ps + pi
-    if t != 100: ps = round(ps + (100 - t), 1)
-    if pw >= 60: trend, tc = "Worsening", "red"
-    elif pw >= 40: trend, tc = "Stable", "yellow"
-    else: trend, tc = "Improving", "green"
+def _rr_outcome_dict(sub, risk_pct, risk_before, risk_after, ps, pi, rr_after, active_therapies, total_effect):
+    rr = sub.current_rr; pw = risk_after
+    trend, tc = _RR_TRENDS[(pw >= 40) + (pw >= 60)]
 
     return {
         "risk_before_therapy": risk_before, "risk_after_therapy": risk_after,
@@ -168,36 +232,118 @@ def predict_rr_outcome(sub, risk_pct, therapy=None):
         "therapy_inputs": active_therapies, "total_rr_reduction": total_effect,
         "prob_worsening": pw, "prob_stabilization": ps, "prob_improvement": pi,
         "trend": trend, "trend_color": tc, "horizon": "24 hours",
-        "input_parameters": {"current_rr": rr, "avg_24h": sub["avg_24h"], "spo2": sub["spo2"], "current_risk": risk_pct},
+        "input_parameters": {"current_rr": rr, "avg_24h": sub.avg_24h, "spo2": sub.spo2, "current_risk": risk_pct},
     }
 
-def record_rr_reading(pid, rr, risk_pct):
-    if pid not in _rr_log: _rr_log[pid] = []
-    _rr_log[pid].append({"timestamp": datetime.now(timezone.utc).isoformat(), "rr": round(rr, 1), "risk_pct": round(risk_pct, 1)})
-    _rr_log[pid] = _rr_log[pid][-60:]
-def get_rr_log(pid): return _rr_log.get(pid, [])
+def record_rr_reading(pid, rr, risk_pct, timestamp=None):
+    _rr_log[pid].append(timestamp or datetime.now(timezone.utc).isoformat(), round(rr, 1), round(risk_pct, 1))
+def get_rr_log(pid):
+    ring = _rr_log.get(pid)
+    return ring.as_dicts("rr") if ring else []
+
+# (severity, message template) in check order: RR >30, 25<RR≤30, RR <8, risk >80%
+_RR_ALERT_RULES = (
+    ("critical", "Severe Tachypnea: RR {} >30"),
+    ("warning", "Tachypnea: RR {} >25"),
+    ("critical", "Critical Bradypnea: RR {} <8"),
+    ("critical", "RR Risk {}% >80%"),
+)
 
-def check_rr_alerts(pid, name, bed, sub, risk_pct):
-    alerts = []; ts = datetime.now(timezone.utc).isoformat(); rr = sub["current_rr"]
-    if rr > 30: alerts.append({"type": "RR_ALERT", "severity": "critical", "message": f"Severe Tachypnea: RR {rr} >30", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    elif rr > 25: alerts.append({"type": "RR_ALERT", "severity": "warning", "message": f"Tachypnea: RR {rr} >25", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if rr < 8: alerts.append({"type": "RR_ALERT", "severity": "critical", "message": f"Critical Bradypnea: RR {rr} <8", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if risk_pct > 80: alerts.append({"type": "RR_ALERT", "severity": "critical", "message": f"RR Risk {risk_pct}% >80%", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    return alerts
+def check_rr_alerts(pid, name, bed, sub, risk_pct, timestamp=None):
+    ts = timestamp or datetime.now(timezone.utc).isoformat(); rr = sub.current_rr
+    hits = (rr > 30, 25 < rr <= 30, rr < 8, risk_pct > 80)
+    values = (rr, rr, rr, risk_pct)
+    return [_rr_alert(severity, message.format(value), pid, name, bed, ts)
+            for hit, value, (severity, message) in zip(hits, values, _RR_ALERT_RULES) if hit]
+
+def _rr_alert(severity, message, pid, name, bed, ts):
+    return {"type": "RR_ALERT", "severity": severity, "message": message,
+            "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts}
 
 def run_rr_analysis(pid, name, bed, rr, spo2):
+    now = datetime.now(timezone.utc)  # one clock read for every timestamp below
     sub = calc_rr_sub_parameters(rr, spo2)
     risk = calc_rr_risk(sub)
-    therapy = generate_rr_therapy(sub, risk)
+    therapy = generate_rr_therapy(sub, risk, now)
     if therapy["primary_plan"]: store_rr_therapy(pid, therapy)
     prediction = predict_rr_outcome(sub, risk["percentage"], therapy)
-    record_rr_reading(pid, rr, risk["percentage"])
-    alerts = check_rr_alerts(pid, name, bed, sub, risk["percentage"])
+    return _rr_report(pid, name, bed, rr, sub, risk, therapy, prediction, now.isoformat())
+
+def _rr_report(pid, name, bed, rr, sub, risk, therapy, prediction, ts):
+    """Record the reading, check alerts and assemble the RR analysis payload."""
+    record_rr_reading(pid, rr, risk["percentage"], ts)
+    alerts = check_rr_alerts(pid, name, bed, sub, risk["percentage"], ts)
     return {
         "patient_id": pid, "patient_name": name, "bed": bed,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "sub_parameters": sub, "risk_score": risk,
+        "timestamp": ts,
+        "sub_parameters": asdict(sub), "risk_score": risk,
         "therapy_plan": therapy, "therapy_history": get_rr_therapy_history(pid),
         "prediction_output": prediction,
         "hourly_variance_data": get_rr_log(pid), "alerts": alerts,
     }
+
+# ═════════════════════════════════════════════════════════════════════
+#  BATCH MASTER FUNCTION (whole ward in one pass)
+# ═════════════════════════════════════════════════════════════════════
+_rng = np.random.default_rng()
+_RR_BAND_BITS_ARR = np.array(_RR_BAND_BITS)
+_RR_MASK_POINTS_ARR = np.array(_RR_MASK_POINTS)
+
+def run_rr_analysis_batch(patients, with_breakdown=True):
+    """
+    run_rr_analysis for many patients. Each patient dict carries pid, name, bed,
+    rr and spo2. Sub-parameters, risk scores, noise and outcome probabilities
+    are computed as arrays; therapy plans, history, variance logs and alerts
+    stay per patient. with_breakdown=False skips the per-factor breakdown.
+    """
+    n = len(patients)
+    if not n:
+        return []
+    rr_in = np.array([p["rr"] for p in patients], dtype=float)
+    spo2_in = np.array([p["spo2"] for p in patients], dtype=float)
+
+    # 1. Sub-parameters
+    avg_24h = np.clip(np.round(rr_in + _rng.normal(0, 1.5, n), 1), 6, 45)
+    subs = [_rr_sub(r, a, s) for r, a, s in zip(rr_in.tolist(), avg_24h.tolist(), spo2_in.tolist())]
+
+    # 2. Risk
+    rr = np.round(rr_in, 1)
+    mask = (_RR_BAND_BITS_ARR[np.clip(np.rint(rr * 10), 0, _RR_LUT_TOP).astype(int)]
+            | np.where(np.round(spo2_in, 1) < 92, _RR_HYPOXIA_BIT, 0))
+    raw = _RR_MASK_POINTS_ARR[mask]
+    pct = np.minimum(100, np.round(raw / _RR_MAX_SCORE * 100, 1))
+    resp_failure = np.clip(np.round(pct * 0.85 + _rng.normal(0, 3, n), 1), 2, 95)
+    icu_escalation = np.clip(np.round(pct * 0.7 + _rng.normal(0, 3, n), 1), 2, 95)
+    risks = [_rr_risk_dict(r, pc, rf, icu, _rr_breakdown(m) if with_breakdown else None)
+             for r, pc, rf, icu, m in zip(raw.tolist(), pct.tolist(), resp_failure.tolist(),
+                                          icu_escalation.tolist(), mask.tolist())]
+
+    # 3–4. Therapy plans and history (per patient)
+    now = datetime.now(timezone.utc)
+    therapies = [generate_rr_therapy(sub, risk, now) for sub, risk in zip(subs, risks)]
+    for p, therapy in zip(patients, therapies):
+        if therapy["primary_plan"]: store_rr_therapy(p["pid"], therapy)
+    therapy_inputs = [_rr_therapy_inputs(therapy) for therapy in therapies]
+
+    # 5. Prediction
+    effect = np.array([total for _, total in therapy_inputs], dtype=float)
+    rr_after = np.maximum(8, rr - effect)
+    z_before = 0.030 * np.maximum(0, rr - 18) + 0.025 * np.maximum(0, 10 - rr) + 0.012 * (pct / 100)
+    z_after = 0.030 * np.maximum(0, rr_after - 18) + 0.025 * np.maximum(0, 10 - rr_after) + 0.005 * (pct / 100)
+    osc = oscillation() + _rng.normal(0, 0.02, n)
+    sig_a = 1 / (1 + np.exp(-(z_after + osc)))
+    risk_before = np.clip(np.round(100 / (1 + np.exp(-z_before)), 1), 3, 95)
+    risk_after = np.clip(np.round(sig_a * 100, 1), 3, 95)
+    ps = np.clip(np.round((1 - sig_a) * 60, 1), 3, 95)
+    pi = np.round(np.maximum(2, 100 - risk_after - ps), 1)
+    t = risk_after + ps + pi
+    ps = np.where(t != 100, np.round(ps + (100 - t), 1), ps)
+
+    reports = []
+    ts = now.isoformat()
+    rows = zip(patients, rr_in.tolist(), subs, risks, therapies, therapy_inputs, pct.tolist(),
+               risk_before.tolist(), risk_after.tolist(), ps.tolist(), pi.tolist(), rr_after.tolist())
+    for p, r, sub, risk, therapy, (active, eff), r_pct, r_before, r_after, p_s, p_i, r_after_val in rows:
+        prediction = _rr_outcome_dict(sub, r_pct, r_before, r_after, p_s, p_i, r_after_val, active, eff)
+        reports.append(_rr_report(p["pid"], p["name"], p["bed"], r, sub, risk, therapy, prediction, ts))
+    return reports
@@ -3,18 +3,29 @@ SpO2 Engine — VITALGUARD 2.0
 Oxygen saturation module: sub-parameters, risk, oxygen support engine,
 before/after tracking, prediction, variance, alerts.
 """
-import math, random, time
-from datetime import datetime, timezone, timedelta
+import math
+import numpy as np
+from collections import defaultdict, deque
+from datetime import date, datetime, timezone, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List
+from services.noise_pool import gauss, oscillation
+from services.reading_ring import ReadingRing
 
 # ═════════════════════════════════════════════════════════════════════
 #  1. SUB-PARAMETERS
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_spo2_sub_parameters(spo2: float, rr: float) -> dict:
-    avg_24h = round(spo2 + random.gauss(0.5, 0.8), 1)
+def calc_spo2_sub_parameters(spo2: float, rr: float, noise=None) -> dict:
+    z1, z2 = noise if noise is not None else (gauss(1), gauss(1))
+    avg_24h = round(spo2 + 0.5 + 0.8 * z1, 1)
     avg_24h = max(80, min(100, avg_24h))
-    fluctuation = round(abs(spo2 - avg_24h) + random.gauss(0, 0.5), 1)
+    fluctuation = round(abs(spo2 - avg_24h) + 0.5 * z2, 1)
+    return _spo2_sub(spo2, rr, avg_24h, fluctuation)
+
+def _spo2_sub(spo2, rr, avg_24h, fluctuation) -> dict:
     return {
         "current_spo2": round(spo2, 1),
         "avg_24h": avg_24h,
@@ -28,33 +39,46 @@ def calc_spo2_sub_parameters(spo2: float, rr: float) -> dict:
 #  2. RISK CALCULATION
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_spo2_risk(sub: dict) -> dict:
+# (label, points) per risk factor; the three hypoxia tiers are exclusive
+_SPO2_RISK_FACTORS = (
+    ("Severe Hypoxia SpO₂ <88%", 35),
+    ("Moderate Hypoxia SpO₂ <92%", 25),
+    ("Mild Hypoxia SpO₂ <94%", 15),
+    ("SpO₂ Fluctuation >3%", 10),
+    ("Tachypnea RR >25", 10),
+)
+_SPO2_MAX_SCORE = 55
+# Raw score for every possible factor bitmask
+_SPO2_MASK_POINTS = tuple(
+    sum(points for bit, (_, points) in enumerate(_SPO2_RISK_FACTORS) if mask >> bit & 1)
+    for mask in range(1 << len(_SPO2_RISK_FACTORS))
+)
+
+def calc_spo2_risk(sub: dict, noise=None, with_breakdown: bool = True) -> dict:
     spo2 = sub["current_spo2"]
-    raw = 0
-    breakdown = []
-    if spo2 < 88:
-        raw += 35; breakdown.append({"factor": "Severe Hypoxia SpO₂ <88%", "points": 35})
-    elif spo2 < 92:
-        raw += 25; breakdown.append({"factor": "Moderate Hypoxia SpO₂ <92%", "points": 25})
-    elif spo2 < 94:
-        raw += 15; breakdown.append({"factor": "Mild Hypoxia SpO₂ <94%", "points": 15})
-    if sub["fluctuation"] > 3:
-        raw += 10; breakdown.append({"factor": "SpO₂ Fluctuation >3%", "points": 10})
-    if sub["resp_rate"] > 25:
-        raw += 10; breakdown.append({"factor": "Tachypnea RR >25", "points": 10})
-
-    max_score = 55
-    pct = min(100, round((raw / max_score) * 100, 1))
-    resp_deterioration = min(95, max(2, round(pct * 0.9 + random.gauss(0, 3), 1)))
-    o2_dependency = min(95, max(2, round(pct * 0.7 + random.gauss(0, 3), 1)))
-
-    if pct >= 75: cat, col = "Critical", "red"
-    elif pct >= 50: cat, col = "High", "orange"
-    elif pct >= 25: cat, col = "Moderate", "yellow"
-    else: cat, col = "Stable", "green"
+    mask = ((spo2 < 88) | (88 <= spo2 < 92) << 1 | (92 <= spo2 < 94) << 2
+            | (sub["fluctuation"] > 3) << 3 | (sub["resp_rate"] > 25) << 4)
+    raw = _SPO2_MASK_POINTS[mask]
+    pct = min(100, round((raw / _SPO2_MAX_SCORE) * 100, 1))
+    z1, z2 = noise if noise is not None else (gauss(1), gauss(1))
+    resp_deterioration = min(95, max(2, round(pct * 0.9 + 3 * z1, 1)))
+    o2_dependency = min(95, max(2, round(pct * 0.7 + 3 * z2, 1)))
+    return _spo2_risk_dict(raw, pct, resp_deterioration, o2_dependency,
+                           _spo2_breakdown(mask) if with_breakdown else None)
+
+def _spo2_breakdown(mask: int) -> List[dict]:
+    return [{"factor": label, "points": points}
+            for bit, (label, points) in enumerate(_SPO2_RISK_FACTORS) if mask >> bit & 1]
+
+# (category, color) per 25-point band of the risk percentage; 100% shares the top band
+_SPO2_RISK_BANDS = (("Stable", "green"), ("Moderate", "yellow"), ("High", "orange"),
+                    ("Critical", "red"), ("Critical", "red"))
+
+def _spo2_risk_dict(raw, pct, resp_deterioration, o2_dependency, breakdown) -> dict:
+    cat, col = _SPO2_RISK_BANDS[int(pct) // 25]
 
     return {
-        "raw_score": raw, "max_possible": max_score, "percentage": pct,
+        "raw_score": raw, "max_possible": _SPO2_MAX_SCORE, "percentage": pct,
         "category": cat, "color": col,
         "respiratory_deterioration_prob": resp_deterioration,
         "oxygen_dependency_risk": o2_dependency,
@@ -72,107 +96,113 @@ SUPPORT_EFFECTS = {
     "High-Flow Nasal 15–60L": {"spo2_improve": 12, "type": "High-flow Oxygen"},
     "Non-Rebreather Mask":  {"spo2_improve": 15, "type": "High-flow Oxygen"},
 }
+# Flat view for the hot path: name → (spo2_improve, type)
+_SPO2_SUPPORT_FLAT = {name: (eff.get("spo2_improve", 0), eff.get("type", "Oxygen"))
+                      for name, eff in SUPPORT_EFFECTS.items()}
+_NO_SPO2_SUPPORT = (0, "Oxygen")
 
-def generate_spo2_support(sub: dict, risk: dict) -> dict:
-    spo2 = sub["current_spo2"]
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    if spo2 < 88:
-        stage = "SEVERE HYPOXIA"
-        primary = [
-            {"support": "High-Flow Nasal 15–60L", "flow_rate": "15–60 L/min",
-             "frequency": "Continuous", "duration_days": 7, "monitoring": "Every 30 min",
-             "expected_spo2_improvement": 12},
-        ]
-        alternative = [
-            {"support": "Non-Rebreather Mask", "flow_rate": "10–15 L/min",
-             "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 30 min",
-             "expected_spo2_improvement": 15},
-        ]
-        notes = "CRITICAL: ICU review STAT. Prepare for intubation if no improvement in 1 hour. ABG mandatory."
-    elif spo2 < 92:
-        stage = "MODERATE HYPOXIA"
-        primary = [
-            {"support": "Face Mask 6–10L", "flow_rate": "6–10 L/min",
-             "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 1 hour",
-             "expected_spo2_improvement": 8},
-        ]
-        alternative = [
-            {"support": "Nasal Cannula 4L", "flow_rate": "4 L/min",
-             "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 1 hour",
-             "expected_spo2_improvement": 5},
-        ]
-        notes = "Oxygen support initiated. Monitor SpO₂ trending. Chest X-ray recommended."
-    elif spo2 < 94:
-        stage = "MILD HYPOXIA"
-        primary = [
-            {"support": "Nasal Cannula 2L", "flow_rate": "2 L/min",
-             "frequency": "As needed", "duration_days": 3, "monitoring": "Every 2 hours",
-             "expected_spo2_improvement": 3},
-        ]
-        alternative = None
-        notes = "Low-flow supplemental oxygen. Monitor for worsening. Deep breathing exercises recommended."
-    else:
-        stage = "NORMAL"
-        primary = []
-        alternative = None
-        notes = "SpO₂ within normal limits. No oxygen support needed. Continue monitoring."
-
-    for plan in [primary, alternative or []]:
-        for item in plan:
-            item["start_date"] = today
-            item["end_date"] = (datetime.now(timezone.utc) + timedelta(days=item["duration_days"])).strftime("%Y-%m-%d")
+class SpO2Stage(IntEnum):
+    SEVERE_HYPOXIA = 0
+    MODERATE_HYPOXIA = 1
+    MILD_HYPOXIA = 2
+    NORMAL = 3
+
+# Display name per SpO2Stage
+_SPO2_STAGE_NAMES = tuple(stage.name.replace("_", " ") for stage in SpO2Stage)
+
+# Per SpO2Stage: (primary plan, alternative plan or None, clinical notes)
+_SPO2_PLANS = (
+    (  # SEVERE HYPOXIA
+        ({"support": "High-Flow Nasal 15–60L", "flow_rate": "15–60 L/min",
+          "frequency": "Continuous", "duration_days": 7, "monitoring": "Every 30 min",
+          "expected_spo2_improvement": 12},),
+        ({"support": "Non-Rebreather Mask", "flow_rate": "10–15 L/min",
+          "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 30 min",
+          "expected_spo2_improvement": 15},),
+        "CRITICAL: ICU review STAT. Prepare for intubation if no improvement in 1 hour. ABG mandatory.",
+    ),
+    (  # MODERATE HYPOXIA
+        ({"support": "Face Mask 6–10L", "flow_rate": "6–10 L/min",
+          "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 1 hour",
+          "expected_spo2_improvement": 8},),
+        ({"support": "Nasal Cannula 4L", "flow_rate": "4 L/min",
+          "frequency": "Continuous", "duration_days": 5, "monitoring": "Every 1 hour",
+          "expected_spo2_improvement": 5},),
+        "Oxygen support initiated. Monitor SpO₂ trending. Chest X-ray recommended.",
+    ),
+    (  # MILD HYPOXIA
+        ({"support": "Nasal Cannula 2L", "flow_rate": "2 L/min",
+          "frequency": "As needed", "duration_days": 3, "monitoring": "Every 2 hours",
+          "expected_spo2_improvement": 3},),
+        None,
+        "Low-flow supplemental oxygen. Monitor for worsening. Deep breathing exercises recommended.",
+    ),
+    (  # NORMAL
+        (), None,
+        "SpO₂ within normal limits. No oxygen support needed. Continue monitoring.",
+    ),
+)
+
+@lru_cache(maxsize=32)
+def _dated_spo2_plan(stage: SpO2Stage, today: date) -> tuple:
+    """_SPO2_PLANS entry with start/end dates filled in — built once per stage per day."""
+    primary, alternative, notes = _SPO2_PLANS[stage]
+    def dated(plan):
+        return tuple(MappingProxyType({**item, "start_date": today.strftime("%Y-%m-%d"),
+                                       "end_date": (today + timedelta(days=item["duration_days"])).strftime("%Y-%m-%d")})
+                     for item in plan)
+    return dated(primary), None if alternative is None else dated(alternative), notes
+
+def _pick_spo2_stage(spo2: float) -> SpO2Stage:
+    if spo2 < 88: return SpO2Stage.SEVERE_HYPOXIA
+    if spo2 < 92: return SpO2Stage.MODERATE_HYPOXIA
+    if spo2 < 94: return SpO2Stage.MILD_HYPOXIA
+    return SpO2Stage.NORMAL
+
+def generate_spo2_support(sub: dict, risk: dict, now: datetime = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    stage = _pick_spo2_stage(sub["current_spo2"])
+    primary, alternative, notes = _dated_spo2_plan(stage, now.date())
 
     return {
-        "stage": stage, "primary_plan": primary, "alternative_plan": alternative,
-        "clinical_notes": notes, "generated_at": datetime.now(timezone.utc).isoformat(),
+        "stage": _SPO2_STAGE_NAMES[stage], "primary_plan": [dict(item) for item in primary],
+        "alternative_plan": None if alternative is None else [dict(item) for item in alternative],
+        "clinical_notes": notes, "generated_at": now.isoformat(),
     }
 
 # ═════════════════════════════════════════════════════════════════════
 #  4–7. HISTORY, PREDICTION, VARIANCE, ALERTS
 # ═════════════════════════════════════════════════════════════════════
-_spo2_history: Dict[str, List[dict]] = {}
-_spo2_log: Dict[str, List[dict]] = {}
+_spo2_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
+_spo2_log: Dict[str, ReadingRing] = defaultdict(lambda: ReadingRing(60))
 
 def store_spo2_support(pid, rx):
-    if pid not in _spo2_history: _spo2_history[pid] = []
     _spo2_history[pid].append({"prescribed_at": rx["generated_at"], "stage": rx["stage"], "supports": rx["primary_plan"]})
-    _spo2_history[pid] = _spo2_history[pid][-20:]
 
-def get_spo2_support_history(pid): return _spo2_history.get(pid, [])
+def get_spo2_support_history(pid): return list(_spo2_history.get(pid, ()))
 
-def predict_spo2_outcome(sub, risk_pct, support=None):
-    spo2 = sub["current_spo2"]
-    z_before = 0.035 * max(0, 95 - spo2) + 0.012 * (risk_pct / 100)
-    sig_b = 1 / (1 + math.exp(-z_before))
-    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+# (trend, color) indexed by how many of the 40% / 60% worsening thresholds are met
+_SPO2_TRENDS = (("Improving", "green"), ("Stable", "yellow"), ("Worsening", "red"))
 
+def predict_spo2_outcome(sub, risk_pct, support=None, noise=None):
+    spo2 = sub["current_spo2"]
     active_supports = []
     total_improve = 0
     if support and support.get("primary_plan"):
         for s in support["primary_plan"]:
-            eff = SUPPORT_EFFECTS.get(s["support"], {})
-            imp = eff.get("spo2_improve", 0)
+            imp, kind = _SPO2_SUPPORT_FLAT.get(s["support"], _NO_SPO2_SUPPORT)
             total_improve += imp
             active_supports.append({
                 "support": s["support"], "flow_rate": s["flow_rate"],
-                "type": eff.get("type", "Oxygen"), "expected_improvement": f"+{imp}%", "status": "Active",
+                "type": kind, "expected_improvement": f"+{imp}%", "status": "Active",
             })
 
-    spo2_after = min(100, spo2 + total_improve)
-    z_after = 0.035 * max(0, 95 - spo2_after) + 0.005 * (risk_pct / 100)
-    osc = math.sin(time.time() * 0.1) * 0.03 + random.gauss(0, 0.02)
-    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
-    risk_after = min(95, max(3, round(sig_a * 100, 1)))
+    osc = oscillation() + 0.02 * (noise if noise is not None else gauss(1))
+    risk_before, spo2_after, risk_after, prob_stable, prob_improve = _predict_spo2_core(
+        spo2, risk_pct, total_improve, osc)
 
-    prob_worsen = min(95, max(3, round(sig_a * 100, 1)))
-    prob_stable = min(95, max(3, round((1 - sig_a) * 60, 1)))
-    prob_improve = round(max(2, 100 - prob_worsen - prob_stable), 1)
-    t = prob_worsen + prob_stable + prob_improve
-    if t != 100: prob_stable = round(prob_stable + (100 - t), 1)
-    if prob_worsen >= 60: trend, tc = "Worsening", "red"
-    elif prob_worsen >= 40: trend, tc = "Stable", "yellow"
-    else: trend, tc = "Improving", "green"
+    prob_worsen = risk_after
+    trend, tc = _SPO2_TRENDS[(prob_worsen >= 40) + (prob_worsen >= 60)]
 
     return {
         "risk_before_support": risk_before, "risk_after_support": risk_after,
@@ -186,38 +216,119 @@ def predict_spo2_outcome(sub, risk_pct, support=None):
                              "fluctuation": sub["fluctuation"], "resp_rate": sub["resp_rate"], "current_risk": risk_pct},
     }
 
-def record_spo2_reading(pid, spo2, risk_pct):
-    if pid not in _spo2_log: _spo2_log[pid] = []
-    _spo2_log[pid].append({"timestamp": datetime.now(timezone.utc).isoformat(), "spo2": round(spo2, 1), "risk_pct": round(risk_pct, 1)})
-    _spo2_log[pid] = _spo2_log[pid][-60:]
+def _predict_spo2_core(spo2, risk_pct, total_improve, osc):
+    """
+    Numeric core of predict_spo2_outcome (floats only; clock and noise come in
+    through `osc`): (risk_before, spo2_after, risk_after, prob_stable, prob_improve).
+    """
+    z_before = 0.035 * max(0, 95 - spo2) + 0.012 * (risk_pct / 100)
+    sig_b = 1 / (1 + math.exp(-z_before))
+    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+
+    spo2_after = min(100, spo2 + total_improve)
+    z_after = 0.035 * max(0, 95 - spo2_after) + 0.005 * (risk_pct / 100)
+    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
+    risk_after = min(95, max(3, round(sig_a * 100, 1)))
+
+    prob_stable = min(95, max(3, round((1 - sig_a) * 60, 1)))
+    prob_improve = round(max(2, 100 - risk_after - prob_stable), 1)
+    t = risk_after + prob_stable + prob_improve
+    if t != 100: prob_stable = round(prob_stable + (100 - t), 1)
+    return risk_before, spo2_after, risk_after, prob_stable, prob_improve
+
+def record_spo2_reading(pid, spo2, risk_pct, timestamp=None):
+    _spo2_log[pid].append(timestamp or datetime.now(timezone.utc).isoformat(), round(spo2, 1), round(risk_pct, 1))
 
-def get_spo2_log(pid): return _spo2_log.get(pid, [])
+def get_spo2_log(pid):
+    ring = _spo2_log.get(pid)
+    return ring.as_dicts("spo2") if ring else []
 
-def check_spo2_alerts(pid, name, bed, sub, risk_pct):
-    alerts = []
-    ts = datetime.now(timezone.utc).isoformat()
+# (severity, message template) in check order: SpO₂ <88, 88≤SpO₂<92, risk >80%
+_SPO2_ALERT_RULES = (
+    ("critical", "Severe Hypoxia: SpO₂ {}% <88%"),
+    ("warning", "Moderate Hypoxia: SpO₂ {}% <92%"),
+    ("critical", "SpO₂ Risk {}% >80%"),
+)
+
+def check_spo2_alerts(pid, name, bed, sub, risk_pct, timestamp=None):
+    ts = timestamp or datetime.now(timezone.utc).isoformat()
     spo2 = sub["current_spo2"]
-    if spo2 < 88:
-        alerts.append({"type": "SPO2_ALERT", "severity": "critical", "message": f"Severe Hypoxia: SpO₂ {spo2}% <88%", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    elif spo2 < 92:
-        alerts.append({"type": "SPO2_ALERT", "severity": "warning", "message": f"Moderate Hypoxia: SpO₂ {spo2}% <92%", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if risk_pct > 80:
-        alerts.append({"type": "SPO2_ALERT", "severity": "critical", "message": f"SpO₂ Risk {risk_pct}% >80%", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    return alerts
-
-def run_spo2_analysis(pid, name, bed, spo2, rr):
-    sub = calc_spo2_sub_parameters(spo2, rr)
-    risk = calc_spo2_risk(sub)
-    support = generate_spo2_support(sub, risk)
+    hits = (spo2 < 88, 88 <= spo2 < 92, risk_pct > 80)
+    values = (spo2, spo2, risk_pct)
+    return [_spo2_alert(severity, message.format(value), pid, name, bed, ts)
+            for hit, value, (severity, message) in zip(hits, values, _SPO2_ALERT_RULES) if hit]
+
+def _spo2_alert(severity, message, pid, name, bed, ts):
+    return {"type": "SPO2_ALERT", "severity": severity, "message": message,
+            "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts}
+
+def run_spo2_analysis(pid, name, bed, spo2, rr, noise=None, now=None):
+    """`noise`: the SPO2_NOISE_DRAWS standard normals to use (drawn here if omitted)."""
+    now = now or datetime.now(timezone.utc)  # one clock read for every timestamp below
+    z = noise if noise is not None else _rng.standard_normal(SPO2_NOISE_DRAWS).tolist()
+    sub = calc_spo2_sub_parameters(spo2, rr, z[0:2])
+    risk = calc_spo2_risk(sub, z[2:4])
+    return _spo2_report(pid, name, bed, spo2, sub, risk, z[4], now)
+
+def _spo2_report(pid, name, bed, spo2, sub, risk, osc_noise, now) -> dict:
+    """Support plan, prediction, reading log and alerts, assembled into the SpO₂ payload."""
+    ts = now.isoformat()
+    support = generate_spo2_support(sub, risk, now)
     if support["primary_plan"]: store_spo2_support(pid, support)
-    prediction = predict_spo2_outcome(sub, risk["percentage"], support)
-    record_spo2_reading(pid, spo2, risk["percentage"])
-    alerts = check_spo2_alerts(pid, name, bed, sub, risk["percentage"])
+    prediction = predict_spo2_outcome(sub, risk["percentage"], support, osc_noise)
+    record_spo2_reading(pid, spo2, risk["percentage"], ts)
+    alerts = check_spo2_alerts(pid, name, bed, sub, risk["percentage"], ts)
     return {
         "patient_id": pid, "patient_name": name, "bed": bed,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": ts,
         "sub_parameters": sub, "risk_score": risk,
         "support_plan": support, "support_history": get_spo2_support_history(pid),
         "prediction_output": prediction,
         "hourly_variance_data": get_spo2_log(pid), "alerts": alerts,
     }
+
+# ═════════════════════════════════════════════════════════════════════
+#  BATCH MASTER FUNCTION (whole ward in one pass)
+# ═════════════════════════════════════════════════════════════════════
+_rng = np.random.default_rng()
+SPO2_NOISE_DRAWS = 5  # sub-parameters 2, risk 2, prediction 1
+_SPO2_MASK_POINTS_ARR = np.array(_SPO2_MASK_POINTS)
+
+def run_spo2_analysis_batch(patients: List[dict], with_breakdown: bool = True,
+                            noise: np.ndarray = None, now: datetime = None) -> List[dict]:
+    """
+    run_spo2_analysis for many patients (dicts with pid, name, bed, spo2, rr).
+    Sub-parameters and risk scores are computed as arrays from one
+    (SPO2_NOISE_DRAWS, N) noise draw; support plans, predictions, logs and
+    alerts stay per patient. Callers that only read risk_score["percentage"]
+    can pass with_breakdown=False. A caller running several engines per tick
+    can pass its own (SPO2_NOISE_DRAWS, N) block and clock reading.
+    """
+    n = len(patients)
+    if not n:
+        return []
+    spo2_in = np.array([p["spo2"] for p in patients], dtype=float)
+    rr_in = np.array([p["rr"] for p in patients], dtype=float)
+    z = _rng.standard_normal((SPO2_NOISE_DRAWS, n)) if noise is None else noise
+
+    # 1. Sub-parameters
+    avg_24h = np.clip(np.round(spo2_in + 0.5 + 0.8 * z[0], 1), 80, 100)
+    fluctuation = np.round(np.abs(spo2_in - avg_24h) + 0.5 * z[1], 1)
+    subs = [_spo2_sub(s, r, a, f) for s, r, a, f in
+            zip(spo2_in.tolist(), rr_in.tolist(), avg_24h.tolist(), fluctuation.tolist())]
+
+    # 2. Risk
+    spo2, rr = np.round(spo2_in, 1), np.round(rr_in, 1)
+    mask = ((spo2 < 88) | ((spo2 >= 88) & (spo2 < 92)) << 1 | ((spo2 >= 92) & (spo2 < 94)) << 2
+            | (fluctuation > 3) << 3 | (rr > 25) << 4)
+    raw = _SPO2_MASK_POINTS_ARR[mask]
+    pct = np.minimum(100, np.round(raw / _SPO2_MAX_SCORE * 100, 1))
+    resp_deterioration = np.clip(np.round(pct * 0.9 + 3 * z[2], 1), 2, 95)
+    o2_dependency = np.clip(np.round(pct * 0.7 + 3 * z[3], 1), 2, 95)
+    risks = [_spo2_risk_dict(r, pc, rd, od, _spo2_breakdown(m) if with_breakdown else None)
+             for r, pc, rd, od, m in zip(raw.tolist(), pct.tolist(), resp_deterioration.tolist(),
+                                         o2_dependency.tolist(), mask.tolist())]
+
+    now = now or datetime.now(timezone.utc)
+    return [_spo2_report(p["pid"], p["name"], p["bed"], s, sub, risk, zo, now)
+            for p, s, sub, risk, zo in zip(patients, spo2_in.tolist(), subs, risks, z[4].tolist())]
@@ -3,17 +3,28 @@ Temperature Engine — VITALGUARD 2.0
 Temperature module: sub-parameters, risk, infection/medication engine,
 before/after tracking, prediction, variance, alerts.
 """
-import math, random, time
-from datetime import datetime, timezone, timedelta
+import math
+import numpy as np
+from collections import defaultdict, deque
+from datetime import date, datetime, timezone, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List
+from services.noise_pool import gauss, oscillation
+from services.reading_ring import ReadingRing
 
 # ═════════════════════════════════════════════════════════════════════
 #  1. SUB-PARAMETERS
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_temp_sub_parameters(temp: float, hr: float) -> dict:
-    avg_24h = round(temp + random.gauss(-0.2, 0.3), 1)
+def calc_temp_sub_parameters(temp: float, hr: float, noise=None) -> dict:
+    z = noise if noise is not None else gauss(1)
+    avg_24h = round(temp - 0.2 + 0.3 * z, 1)
     avg_24h = max(34, min(42, avg_24h))
+    return _temp_sub(temp, hr, avg_24h)
+
+def _temp_sub(temp, hr, avg_24h) -> dict:
     return {
         "current_temp": round(temp, 1),
         "avg_24h": avg_24h,
@@ -27,32 +38,46 @@ def calc_temp_sub_parameters(temp: float, hr: float) -> dict:
 #  2. RISK
 # ═════════════════════════════════════════════════════════════════════
 
-def calc_temp_risk(sub: dict) -> dict:
+# (label, points) per risk factor; the three fever tiers are exclusive
+_TEMP_RISK_FACTORS = (
+    ("High Fever >39.5°C", 30),
+    ("Moderate Fever >38.5°C", 20),
+    ("Mild Fever >38°C", 10),
+    ("Hypothermia <35°C", 25),
+    ("Associated Tachycardia HR >100", 10),
+)
+_TEMP_MAX_SCORE = 65
+# Raw score for every possible factor bitmask
+_TEMP_MASK_POINTS = tuple(
+    sum(points for bit, (_, points) in enumerate(_TEMP_RISK_FACTORS) if mask >> bit & 1)
+    for mask in range(1 << len(_TEMP_RISK_FACTORS))
+)
+
+def calc_temp_risk(sub: dict, noise=None, with_breakdown: bool = True) -> dict:
     temp = sub["current_temp"]
-    raw = 0; breakdown = []
-    if temp > 39.5:
-        raw += 30; breakdown.append({"factor": "High Fever >39.5°C", "points": 30})
-    elif temp > 38.5:
-        raw += 20; breakdown.append({"factor": "Moderate Fever >38.5°C", "points": 20})
-    elif temp > 38.0:
-        raw += 10; breakdown.append({"factor": "Mild Fever >38°C", "points": 10})
-    if temp < 35.0:
-        raw += 25; breakdown.append({"factor": "Hypothermia <35°C", "points": 25})
-    if sub["heart_rate"] > 100:
-        raw += 10; breakdown.append({"factor": "Associated Tachycardia HR >100", "points": 10})
-
-    max_score = 65
-    pct = min(100, round((raw / max_score) * 100, 1))
-    infection_prob = min(95, max(2, round(pct * 0.9 + random.gauss(0, 3), 1)))
-    sepsis_risk = min(95, max(1, round(pct * 0.55 + random.gauss(0, 3), 1)))
-
-    if pct >= 75: cat, col = "Critical", "red"
-    elif pct >= 50: cat, col = "High", "orange"
-    elif pct >= 25: cat, col = "Moderate", "yellow"
-    else: cat, col = "Normal", "green"
+    mask = ((temp > 39.5) | (38.5 < temp <= 39.5) << 1 | (38.0 < temp <= 38.5) << 2
+            | (temp < 35.0) << 3 | (sub["heart_rate"] > 100) << 4)
+    raw = _TEMP_MASK_POINTS[mask]
+    pct = min(100, round((raw / _TEMP_MAX_SCORE) * 100, 1))
+    z1, z2 = noise if noise is not None else (gauss(1), gauss(1))
+    infection_prob = min(95, max(2, round(pct * 0.9 + 3 * z1, 1)))
+    sepsis_risk = min(95, max(1, round(pct * 0.55 + 3 * z2, 1)))
+    return _temp_risk_dict(raw, pct, infection_prob, sepsis_risk,
+                           _temp_breakdown(mask) if with_breakdown else None)
+
+def _temp_breakdown(mask: int) -> List[dict]:
+    return [{"factor": label, "points": points}
+            for bit, (label, points) in enumerate(_TEMP_RISK_FACTORS) if mask >> bit & 1]
+
+# (category, color) per 25-point band of the risk percentage; 100% shares the top band
+_TEMP_RISK_BANDS = (("Normal", "green"), ("Moderate", "yellow"), ("High", "orange"),
+                    ("Critical", "red"), ("Critical", "red"))
+
+def _temp_risk_dict(raw, pct, infection_prob, sepsis_risk, breakdown) -> dict:
+    cat, col = _TEMP_RISK_BANDS[int(pct) // 25]
 
     return {
-        "raw_score": raw, "max_possible": max_score, "percentage": pct,
+        "raw_score": raw, "max_possible": _TEMP_MAX_SCORE, "percentage": pct,
         "category": cat, "color": col,
         "infection_progression_prob": infection_prob,
         "sepsis_risk_pct": sepsis_risk,
@@ -69,109 +94,115 @@ DRUG_EFFECTS_TEMP = {
     "Ibuprofen":            {"temp_reduce": 1.0, "class": "NSAID Antipyretic"},
     "Physical Cooling":     {"temp_reduce": 0.5, "class": "Non-pharmacological"},
 }
+# Flat view for the hot path: name → (temp_reduce, class)
+_TEMP_DRUG_FLAT = {name: (eff.get("temp_reduce", 0), eff.get("class", "Antipyretic"))
+                   for name, eff in DRUG_EFFECTS_TEMP.items()}
+_NO_TEMP_DRUG = (0, "Antipyretic")
 
-def generate_temp_prescription(sub: dict, risk: dict) -> dict:
-    temp = sub["current_temp"]
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    if temp > 39.0 or risk["percentage"] > 75:
-        stage = "HIGH FEVER"
-        primary = [
-            {"medication": "Paracetamol (IV)", "dosage": "1g", "frequency": "Every 6 hours",
-             "timing": "N/A (IV)", "meal_period": "N/A", "duration_days": 5,
-             "expected_temp_reduction": 1.8},
-            {"medication": "Physical Cooling", "dosage": "Tepid sponging", "frequency": "Every 2 hours",
-             "timing": "Continuous", "meal_period": "N/A", "duration_days": 3,
-             "expected_temp_reduction": 0.5},
-        ]
-        alternative = [
-            {"medication": "Ibuprofen", "dosage": "400 mg", "frequency": "Every 8 hours",
-             "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 5,
-             "expected_temp_reduction": 1.0},
-        ]
-        notes = "IV antipyretic initiated. Blood cultures x2 MANDATORY. Infection workup: CBC, CRP, Procalcitonin. Sepsis screening."
-    elif temp > 38.0:
-        stage = "MILD FEVER"
-        primary = [
-            {"medication": "Paracetamol (Oral)", "dosage": "500–650 mg", "frequency": "Every 6 hours",
-             "timing": "After food", "meal_period": "As needed", "duration_days": 5,
-             "expected_temp_reduction": 1.2},
-        ]
-        alternative = [
-            {"medication": "Ibuprofen", "dosage": "200 mg", "frequency": "Every 8 hours",
-             "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 3,
-             "expected_temp_reduction": 1.0},
-        ]
-        notes = "Oral antipyretic. Adequate hydration. Monitor for rising trend. Infection workup if fever persists >48 hours."
-    elif temp < 35.0:
-        stage = "HYPOTHERMIA"
-        primary = [
-            {"medication": "Active Warming", "dosage": "Warming blanket + warm IV fluids", "frequency": "Continuous",
-             "timing": "Immediate", "meal_period": "N/A", "duration_days": 2,
-             "expected_temp_increase": 1.5},
-        ]
-        alternative = None
-        notes = "CRITICAL: Hypothermia protocol. Warm IV fluids, forced-air warming blanket. Continuous core temp monitoring. Check thyroid function."
-    else:
-        stage = "NORMAL"
-        primary = []; alternative = None
-        notes = "Temperature within normal limits. No intervention needed. Continue monitoring."
-
-    for plan in [primary, alternative or []]:
-        for med in plan:
-            med["start_date"] = today
-            med["end_date"] = (datetime.now(timezone.utc) + timedelta(days=med["duration_days"])).strftime("%Y-%m-%d")
-
-    return {"stage": stage, "primary_plan": primary, "alternative_plan": alternative,
-            "clinical_notes": notes, "generated_at": datetime.now(timezone.utc).isoformat()}
+class TempStage(IntEnum):
+    HIGH_FEVER = 0
+    MILD_FEVER = 1
+    HYPOTHERMIA = 2
+    NORMAL = 3
+
+# Display name per TempStage
+_TEMP_STAGE_NAMES = tuple(stage.name.replace("_", " ") for stage in TempStage)
+
+# Per TempStage: (primary plan, alternative plan or None, clinical notes)
+_TEMP_PLANS = (
+    (  # HIGH FEVER
+        ({"medication": "Paracetamol (IV)", "dosage": "1g", "frequency": "Every 6 hours",
+          "timing": "N/A (IV)", "meal_period": "N/A", "duration_days": 5,
+          "expected_temp_reduction": 1.8},
+         {"medication": "Physical Cooling", "dosage": "Tepid sponging", "frequency": "Every 2 hours",
+          "timing": "Continuous", "meal_period": "N/A", "duration_days": 3,
+          "expected_temp_reduction": 0.5}),
+        ({"medication": "Ibuprofen", "dosage": "400 mg", "frequency": "Every 8 hours",
+          "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 5,
+          "expected_temp_reduction": 1.0},),
+        "IV antipyretic initiated. Blood cultures x2 MANDATORY. Infection workup: CBC, CRP, Procalcitonin. Sepsis screening.",
+    ),
+    (  # MILD FEVER
+        ({"medication": "Paracetamol (Oral)", "dosage": "500–650 mg", "frequency": "Every 6 hours",
+          "timing": "After food", "meal_period": "As needed", "duration_days": 5,
+          "expected_temp_reduction": 1.2},),
+        ({"medication": "Ibuprofen", "dosage": "200 mg", "frequency": "Every 8 hours",
+          "timing": "After food", "meal_period": "Morning, Afternoon, Night", "duration_days": 3,
+          "expected_temp_reduction": 1.0},),
+        "Oral antipyretic. Adequate hydration. Monitor for rising trend. Infection workup if fever persists >48 hours.",
+    ),
+    (  # HYPOTHERMIA
+        ({"medication": "Active Warming", "dosage": "Warming blanket + warm IV fluids", "frequency": "Continuous",
+          "timing": "Immediate", "meal_period": "N/A", "duration_days": 2,
+          "expected_temp_increase": 1.5},),
+        None,
+        "CRITICAL: Hypothermia protocol. Warm IV fluids, forced-air warming blanket. Continuous core temp monitoring. Check thyroid function.",
+    ),
+    (  # NORMAL
+        (), None,
+        "Temperature within normal limits. No intervention needed. Continue monitoring.",
+    ),
+)
+
+@lru_cache(maxsize=32)
+def _dated_temp_plan(stage: TempStage, today: date) -> tuple:
+    """_TEMP_PLANS entry with start/end dates filled in — built once per stage per day."""
+    primary, alternative, notes = _TEMP_PLANS[stage]
+    def dated(plan):
+        return tuple(MappingProxyType({**med, "start_date": today.strftime("%Y-%m-%d"),
+                                       "end_date": (today + timedelta(days=med["duration_days"])).strftime("%Y-%m-%d")})
+                     for med in plan)
+    return dated(primary), None if alternative is None else dated(alternative), notes
+
+def _pick_temp_stage(temp: float, risk_pct: float) -> TempStage:
+    if temp > 39.0 or risk_pct > 75: return TempStage.HIGH_FEVER
+    if temp > 38.0: return TempStage.MILD_FEVER
+    if temp < 35.0: return TempStage.HYPOTHERMIA
+    return TempStage.NORMAL
+
+def generate_temp_prescription(sub: dict, risk: dict, now: datetime = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    stage = _pick_temp_stage(sub["current_temp"], risk["percentage"])
+    primary, alternative, notes = _dated_temp_plan(stage, now.date())
+
+    return {"stage": _TEMP_STAGE_NAMES[stage], "primary_plan": [dict(med) for med in primary],
+            "alternative_plan": None if alternative is None else [dict(med) for med in alternative],
+            "clinical_notes": notes, "generated_at": now.isoformat()}
 
 # ═════════════════════════════════════════════════════════════════════
 #  4–7. HISTORY, PREDICTION, VARIANCE, ALERTS
 # ═════════════════════════════════════════════════════════════════════
-_temp_history: Dict[str, List[dict]] = {}
-_temp_log: Dict[str, List[dict]] = {}
+_temp_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
+_temp_log: Dict[str, ReadingRing] = defaultdict(lambda: ReadingRing(60))
 
 def store_temp_medication(pid, rx):
-    if pid not in _temp_history: _temp_history[pid] = []
     _temp_history[pid].append({"prescribed_at": rx["generated_at"], "stage": rx["stage"], "medications": rx["primary_plan"]})
-    _temp_history[pid] = _temp_history[pid][-20:]
-def get_temp_med_history(pid): return _temp_history.get(pid, [])
+def get_temp_med_history(pid): return list(_temp_history.get(pid, ()))
 
-def predict_temp_outcome(sub, risk_pct, prescription=None):
-    temp = sub["current_temp"]
-    z_before = 0.040 * max(0, temp - 37.5) + 0.030 * max(0, 35.5 - temp) + 0.012 * (risk_pct / 100)
-    sig_b = 1 / (1 + math.exp(-z_before))
-    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+# (trend, color) indexed by how many of the 40% / 60% worsening thresholds are met
+_TEMP_TRENDS = (("Improving", "green"), ("Stable", "yellow"), ("Worsening", "red"))
 
+def predict_temp_outcome(sub, risk_pct, prescription=None, noise=None):
+    temp = sub["current_temp"]
     active_meds = []; total_reduce = 0
     if prescription and prescription.get("primary_plan"):
         for med in prescription["primary_plan"]:
-            eff = DRUG_EFFECTS_TEMP.get(med["medication"], {})
-            red = eff.get("temp_reduce", 0)
+            red, drug_class = _TEMP_DRUG_FLAT.get(med["medication"], _NO_TEMP_DRUG)
             inc = med.get("expected_temp_increase", 0)
             total_reduce += red
             active_meds.append({
                 "medication": med["medication"], "dosage": med["dosage"],
-                "drug_class": eff.get("class", "Antipyretic"),
+                "drug_class": drug_class,
                 "timing": med["timing"],
                 "expected_effect": f"↓{red}°C" if red else f"↑{inc}°C",
                 "status": "Active",
             })
 
-    temp_after = max(35.0, temp - total_reduce)
-    z_after = 0.040 * max(0, temp_after - 37.5) + 0.030 * max(0, 35.5 - temp_after) + 0.005 * (risk_pct / 100)
-    osc = math.sin(time.time() * 0.1) * 0.03 + random.gauss(0, 0.02)
-    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
-    risk_after = min(95, max(3, round(sig_a * 100, 1)))
+    osc = oscillation() + 0.02 * (noise if noise is not None else gauss(1))
+    risk_before, temp_after, risk_after, ps, pi = _predict_temp_core(temp, risk_pct, total_reduce, osc)
 
-    pw = min(95, max(3, round(sig_a * 100, 1)))
-    ps = min(95, max(3, round((1 - sig_a) * 60, 1)))
-    pi = round(max(2, 100 - pw - ps), 1)
-    t = pw + ps + pi
-    if t != 100: ps = round(ps + (100 - t), 1)
-    if pw >= 60: trend, tc = "Worsening", "red"
-    elif pw >= 40: trend, tc = "Stable", "yellow"
-    else: trend, tc = "Improving", "green"
+    pw = risk_after
+    trend, tc = _TEMP_TRENDS[(pw >= 40) + (pw >= 60)]
 
     return {
         "risk_before_medication": risk_before, "risk_after_medication": risk_after,
@@ -184,33 +215,113 @@ def predict_temp_outcome(sub, risk_pct, prescription=None):
                              "heart_rate": sub["heart_rate"], "current_risk": risk_pct},
     }
 
-def record_temp_reading(pid, temp, risk_pct):
-    if pid not in _temp_log: _temp_log[pid] = []
-    _temp_log[pid].append({"timestamp": datetime.now(timezone.utc).isoformat(), "temp": round(temp, 1), "risk_pct": round(risk_pct, 1)})
-    _temp_log[pid] = _temp_log[pid][-60:]
-def get_temp_log(pid): return _temp_log.get(pid, [])
-
-def check_temp_alerts(pid, name, bed, sub, risk_pct):
-    alerts = []; ts = datetime.now(timezone.utc).isoformat(); temp = sub["current_temp"]
-    if temp > 39.5: alerts.append({"type": "TEMP_ALERT", "severity": "critical", "message": f"High Fever: {temp}°C >39.5", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    elif temp > 38.0: alerts.append({"type": "TEMP_ALERT", "severity": "warning", "message": f"Fever: {temp}°C >38", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if temp < 35.0: alerts.append({"type": "TEMP_ALERT", "severity": "critical", "message": f"Hypothermia: {temp}°C <35", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    if risk_pct > 80: alerts.append({"type": "TEMP_ALERT", "severity": "critical", "message": f"Temp Risk {risk_pct}% >80%", "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts})
-    return alerts
-
-def run_temp_analysis(pid, name, bed, temp, hr):
-    sub = calc_temp_sub_parameters(temp, hr)
-    risk = calc_temp_risk(sub)
-    rx = generate_temp_prescription(sub, risk)
+def _predict_temp_core(temp, risk_pct, total_reduce, osc):
+    """Numeric core of predict_temp_outcome: (risk_before, temp_after, risk_after, ps, pi); floats only."""
+    z_before = 0.040 * max(0, temp - 37.5) + 0.030 * max(0, 35.5 - temp) + 0.012 * (risk_pct / 100)
+    sig_b = 1 / (1 + math.exp(-z_before))
+    risk_before = min(95, max(3, round(sig_b * 100, 1)))
+
+    temp_after = max(35.0, temp - total_reduce)
+    z_after = 0.040 * max(0, temp_after - 37.5) + 0.030 * max(0, 35.5 - temp_after) + 0.005 * (risk_pct / 100)
+    sig_a = 1 / (1 + math.exp(-(z_after + osc)))
+    risk_after = min(95, max(3, round(sig_a * 100, 1)))
+
+    ps = min(95, max(3, round((1 - sig_a) * 60, 1)))
+    pi = round(max(2, 100 - risk_after - ps), 1)
+    t = risk_after + ps + pi
+    if t != 100: ps = round(ps + (100 - t), 1)
+    return risk_before, temp_after, risk_after, ps, pi
+
+def record_temp_reading(pid, temp, risk_pct, timestamp=None):
+    _temp_log[pid].append(timestamp or datetime.now(timezone.utc).isoformat(), round(temp, 1), round(risk_pct, 1))
+def get_temp_log(pid):
+    ring = _temp_log.get(pid)
+    return ring.as_dicts("temp") if ring else []
+
+# (severity, message template) in check order: T >39.5, 38<T≤39.5, T <35, risk >80%
+_TEMP_ALERT_RULES = (
+    ("critical", "High Fever: {}°C >39.5"),
+    ("warning", "Fever: {}°C >38"),
+    ("critical", "Hypothermia: {}°C <35"),
+    ("critical", "Temp Risk {}% >80%"),
+)
+
+def check_temp_alerts(pid, name, bed, sub, risk_pct, timestamp=None):
+    ts = timestamp or datetime.now(timezone.utc).isoformat(); temp = sub["current_temp"]
+    hits = (temp > 39.5, 38.0 < temp <= 39.5, temp < 35.0, risk_pct > 80)
+    values = (temp, temp, temp, risk_pct)
+    return [_temp_alert(severity, message.format(value), pid, name, bed, ts)
+            for hit, value, (severity, message) in zip(hits, values, _TEMP_ALERT_RULES) if hit]
+
+def _temp_alert(severity, message, pid, name, bed, ts):
+    return {"type": "TEMP_ALERT", "severity": severity, "message": message,
+            "patient_id": pid, "patient_name": name, "bed": bed, "timestamp": ts}
+
+def run_temp_analysis(pid, name, bed, temp, hr, noise=None, now=None):
+    """`noise`: the TEMP_NOISE_DRAWS standard normals to use (drawn here if omitted)."""
+    now = now or datetime.now(timezone.utc)  # one clock read for every timestamp below
+    z = noise if noise is not None else _rng.standard_normal(TEMP_NOISE_DRAWS).tolist()
+    sub = calc_temp_sub_parameters(temp, hr, z[0])
+    risk = calc_temp_risk(sub, z[1:3])
+    return _temp_report(pid, name, bed, temp, sub, risk, z[3], now)
+
+def _temp_report(pid, name, bed, temp, sub, risk, osc_noise, now) -> dict:
+    """Prescription, prediction, reading log and alerts, assembled into the Temp payload."""
+    ts = now.isoformat()
+    rx = generate_temp_prescription(sub, risk, now)
     if rx["primary_plan"]: store_temp_medication(pid, rx)
-    prediction = predict_temp_outcome(sub, risk["percentage"], rx)
-    record_temp_reading(pid, temp, risk["percentage"])
-    alerts = check_temp_alerts(pid, name, bed, sub, risk["percentage"])
+    prediction = predict_temp_outcome(sub, risk["percentage"], rx, osc_noise)
+    record_temp_reading(pid, temp, risk["percentage"], ts)
+    alerts = check_temp_alerts(pid, name, bed, sub, risk["percentage"], ts)
     return {
         "patient_id": pid, "patient_name": name, "bed": bed,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": ts,
         "sub_parameters": sub, "risk_score": risk,
         "prescription_plan": rx, "medication_history": get_temp_med_history(pid),
         "prediction_output": prediction,
         "hourly_variance_data": get_temp_log(pid), "alerts": alerts,
     }
+
+# ═════════════════════════════════════════════════════════════════════
+#  BATCH MASTER FUNCTION (whole ward in one pass)
+# ═════════════════════════════════════════════════════════════════════
+_rng = np.random.default_rng()
+TEMP_NOISE_DRAWS = 4  # sub-parameters 1, risk 2, prediction 1
+_TEMP_MASK_POINTS_ARR = np.array(_TEMP_MASK_POINTS)
+
+def run_temp_analysis_batch(patients: List[dict], with_breakdown: bool = True,
+                            noise: np.ndarray = None, now: datetime = None) -> List[dict]:
+    """
+    run_temp_analysis for many patients (dicts with pid, name, bed, temp, hr).
+    Sub-parameters and risk scores are computed as arrays from one
+    (TEMP_NOISE_DRAWS, N) noise draw; prescriptions, predictions, logs and
+    alerts stay per patient. Callers that only read risk_score["percentage"]
+    can pass with_breakdown=False. A caller running several engines per tick
+    can pass its own (TEMP_NOISE_DRAWS, N) block and clock reading.
+    """
+    n = len(patients)
+    if not n:
+        return []
+    temp_in = np.array([p["temp"] for p in patients], dtype=float)
+    hr_in = np.array([p["hr"] for p in patients], dtype=float)
+    z = _rng.standard_normal((TEMP_NOISE_DRAWS, n)) if noise is None else noise
+
+    # 1. Sub-parameters
+    avg_24h = np.clip(np.round(temp_in - 0.2 + 0.3 * z[0], 1), 34, 42)
+    subs = [_temp_sub(t, h, a) for t, h, a in zip(temp_in.tolist(), hr_in.tolist(), avg_24h.tolist())]
+
+    # 2. Risk
+    temp, hr = np.round(temp_in, 1), np.round(hr_in, 1)
+    mask = ((temp > 39.5) | ((temp > 38.5) & (temp <= 39.5)) << 1 | ((temp > 38.0) & (temp <= 38.5)) << 2
+            | (temp < 35.0) << 3 | (hr > 100) << 4)
+    raw = _TEMP_MASK_POINTS_ARR[mask]
+    pct = np.minimum(100, np.round(raw / _TEMP_MAX_SCORE * 100, 1))
+    infection_prob = np.clip(np.round(pct * 0.9 + 3 * z[1], 1), 2, 95)
+    sepsis_risk = np.clip(np.round(pct * 0.55 + 3 * z[2], 1), 1, 95)
+    risks = [_temp_risk_dict(r, pc, ip, sr, _temp_breakdown(m) if with_breakdown else None)
+             for r, pc, ip, sr, m in zip(raw.tolist(), pct.tolist(), infection_prob.tolist(),
+                                         sepsis_risk.tolist(), mask.tolist())]
+
+    now = now or datetime.now(timezone.utc)
+    return [_temp_report(p["pid"], p["name"], p["bed"], t, sub, risk, zo, now)
+            for p, t, sub, risk, zo in zip(patients, temp_in.tolist(), subs, risks, z[3].tolist())]
@@ -5,31 +5,113 @@ Vitals drift around baseline values with configurable "severity" to simulate
 stable, moderate, and critical patient states for demonstration purposes.
 """
 
-import random
-import math
+import threading
+import time
+import numpy as np
+from collections import deque
 from datetime import datetime, timezone
+from typing import TypedDict
 from models.schemas import VitalsReading, PatientBaseline
 
-# In-memory history store: patient_id -> list of VitalsReading
-_vitals_history: dict[str, list[dict]] = {}
+# Readings kept per patient (~3 min at 3s polling)
+HISTORY_SIZE = 60
 
-# Patient severity configs: patient_id -> severity (0=stable, 1=moderate, 2=critical)
-_patient_severity: dict[str, int] = {}
+# Numeric columns used for feature engineering (get_vitals_matrix order)
+VITAL_COLUMNS = ("hr", "spo2", "rr", "temp", "sbp")
+# Columns stored per reading: the feature columns plus display-only dbp
+HISTORY_COLUMNS = VITAL_COLUMNS + ("dbp",)
 
 
-def set_patient_severity(patient_id: str, severity: int):
-    """Override simulated severity for a patient (0=stable, 1=moderate, 2=critical)."""
-    _patient_severity[patient_id] = severity
+class VitalsRow(TypedDict):
+    """One history entry as returned by get_vitals_history (plain dict, no model)."""
+    timestamp: str
+    hr: float
+    spo2: float
+    sbp: float
+    dbp: float
+    rr: float
+    temp: float
+
+
+class _VitalsRing:
+    """
+    Fixed-size ring buffer of vitals (one row per reading, HISTORY_COLUMNS order)
+    with the matching reading timestamps alongside.
+
+    Every row is written twice, at i and i + HISTORY_SIZE, so the last n readings
+    are always one contiguous slice — view() is zero-copy.
+    """
+
+    __slots__ = ("data", "stamps", "head", "count")
+
+    def __init__(self):
+        self.data = np.empty((2 * HISTORY_SIZE, len(HISTORY_COLUMNS)))
+        self.stamps: deque = deque(maxlen=HISTORY_SIZE)
+        self.head = 0   # next write position
+        self.count = 0  # readings stored (≤ HISTORY_SIZE)
 
+    def append(self, timestamp: str, row: tuple):
+        self.stamps.append(timestamp)
+        self.data[self.head] = row
+        self.data[self.head + HISTORY_SIZE] = row
+        self.head = (self.head + 1) % HISTORY_SIZE
+        self.count = min(self.count + 1, HISTORY_SIZE)
 
-def _add_noise(value: float, noise_range: float) -> float:
-    """Add gaussian noise to a vital value."""
-    return value + random.gauss(0, noise_range)
+    def view(self) -> np.ndarray:
+        """Oldest-to-newest (count, 6) view of the stored readings."""
+        end = self.head + HISTORY_SIZE
+        return self.data[end - self.count:end]
 
 
-def _clamp(value: float, min_val: float, max_val: float) -> float:
-    """Clamp a value between min and max."""
-    return max(min_val, min(max_val, value))
+# In-memory history store: patient_id -> ring buffer
+_vitals_rings: dict[str, _VitalsRing] = {}
+
+# Simulation parameters per vital (rows in SIM_COLUMNS order), columns by severity 0/1/2
+SIM_COLUMNS = ("hr", "spo2", "sbp", "dbp", "rr", "temp")
+_SIM_DRIFT = np.array([
+    [0, 12, 28],      # hr   — moderate +10-20 bpm, critical +25-40 bpm
+    [0, -4, -10],     # spo2 — moderate -3 to -6%, critical -8 to -15%
+    [0, 15, -20],     # sbp  — critical drifts into hypotension
+    [0, 8, -10],      # dbp
+    [0, 5, 12],       # rr
+    [0, 0.8, 2.0],    # temp
+])
+_SIM_NOISE = np.array([
+    [3, 6, 10],
+    [0.5, 1.5, 3],
+    [4, 8, 15],
+    [3, 6, 10],
+    [1, 2, 4],
+    [0.1, 0.3, 0.6],
+])
+_SIM_LO = np.array([30, 60, 70, 40, 6, 34.0])[:, None]
+_SIM_HI = np.array([200, 100, 220, 130, 50, 42.0])[:, None]
+# Per-severity rows and 1-D bounds for the scalar path
+_DRIFT_BY_SEVERITY = _SIM_DRIFT.T.copy()
+_NOISE_BY_SEVERITY = _SIM_NOISE.T.copy()
+_SIM_LO_ROW = _SIM_LO[:, 0]
+_SIM_HI_ROW = _SIM_HI[:, 0]
+
+_rng = np.random.default_rng()
+
+# Patient severity configs: patient_id -> severity (0=stable, 1=moderate, 2=critical)
+_patient_severity: dict[str, int] = {}
+
+# Latest reading per patient: the vitals, predict and per-modality routes all poll
+# within the same 3s window, so they share one reading instead of each simulating
+# (and storing) their own. patient_id -> (monotonic time, severity, reading)
+LATEST_READING_TTL_S = 1.0
+_latest: dict[str, tuple[float, int, VitalsReading]] = {}
+
+# Guards history/severity writes so a bulk reset is never observed half-applied.
+# Re-entrant so callers can hold it around reset_patients plus their own updates.
+STATE_LOCK = threading.RLock()
+
+
+def set_patient_severity(patient_id: str, severity: int):
+    """Override simulated severity for a patient (0=stable, 1=moderate, 2=critical)."""
+    with STATE_LOCK:
+        _patient_severity[patient_id] = severity
 
 
 def simulate_vitals(patient_id: str, baseline: PatientBaseline, severity: int = None) -> VitalsReading:
@@ -52,55 +134,125 @@ def simulate_vitals(patient_id: str, baseline: PatientBaseline, severity: int =
     if severity is None:
         severity = _patient_severity.get(patient_id, 0)
 
+    now = time.monotonic()
+    cached = _latest.get(patient_id)
+    if cached and cached[1] == severity and now - cached[0] < LATEST_READING_TTL_S:
+        return cached[2]
+
     ts = datetime.now(timezone.utc).isoformat()
+    # All six vitals (SIM_COLUMNS order) drift, get noise, clamp and round as one array
+    base = (baseline.hr, baseline.spo2, baseline.sbp, baseline.dbp, baseline.rr, baseline.temp)
+    noise = _rng.standard_normal(len(SIM_COLUMNS))
+    hr, spo2, sbp, dbp, rr, temp = np.round(np.clip(
+        base + _DRIFT_BY_SEVERITY[severity] + _NOISE_BY_SEVERITY[severity] * noise,
+        _SIM_LO_ROW, _SIM_HI_ROW), 1).tolist()
+
+    # Values are already clamped floats, so skip model validation
+    reading = VitalsReading.model_construct(
+        timestamp=ts, hr=hr, spo2=spo2, sbp=sbp, dbp=dbp, rr=rr, temp=temp)
 
-    # --- Heart Rate ---
-    # Stable: ±5 bpm noise | Moderate: +10-20 bpm drift | Critical: +25-40 bpm
-    hr_drift = [0, 12, 28][severity]
-    hr = _clamp(_add_noise(baseline.hr + hr_drift, [3, 6, 10][severity]), 30, 200)
-
-    # --- SpO2 ---
-    # Stable: ±1% | Moderate: -3 to -6% | Critical: -8 to -15%
-    spo2_drift = [0, -4, -10][severity]
-    spo2 = _clamp(_add_noise(baseline.spo2 + spo2_drift, [0.5, 1.5, 3][severity]), 60, 100)
-
-    # --- Systolic BP ---
-    # Stable: ±5 mmHg | Moderate: +15 | Critical: +30 or -20 (hypotension)
-    sbp_drift = [0, 15, -20][severity]
-    sbp = _clamp(_add_noise(baseline.sbp + sbp_drift, [4, 8, 15][severity]), 70, 220)
-
-    # --- Diastolic BP ---
-    dbp_drift = [0, 8, -10][severity]
-    dbp = _clamp(_add_noise(baseline.dbp + dbp_drift, [3, 6, 10][severity]), 40, 130)
-
-    # --- Respiration Rate ---
-    rr_drift = [0, 5, 12][severity]
-    rr = _clamp(_add_noise(baseline.rr + rr_drift, [1, 2, 4][severity]), 6, 50)
-
-    # --- Temperature ---
-    temp_drift = [0, 0.8, 2.0][severity]
-    temp = _clamp(_add_noise(baseline.temp + temp_drift, [0.1, 0.3, 0.6][severity]), 34.0, 42.0)
-
-    reading = VitalsReading(
-        timestamp=ts,
-        hr=round(hr, 1),
-        spo2=round(spo2, 1),
-        sbp=round(sbp, 1),
-        dbp=round(dbp, 1),
-        rr=round(rr, 1),
-        temp=round(temp, 1),
-    )
-
-    # Append to in-memory history (keep last 60 readings = ~3 min at 3s polling)
-    if patient_id not in _vitals_history:
-        _vitals_history[patient_id] = []
-    _vitals_history[patient_id].append(reading.model_dump())
-    if len(_vitals_history[patient_id]) > 60:
-        _vitals_history[patient_id].pop(0)
+    with STATE_LOCK:
+        # Append to in-memory history (keep last 60 readings = ~3 min at 3s polling)
+        ring = _vitals_rings.get(patient_id)
+        if ring is None:
+            ring = _vitals_rings[patient_id] = _VitalsRing()
+        ring.append(ts, (hr, spo2, rr, temp, sbp, dbp))
+        _latest[patient_id] = (now, severity, reading)
 
     return reading
 
 
-def get_vitals_history(patient_id: str) -> list[dict]:
+def simulate_vitals_batch(patient_ids: list[str], baselines: dict[str, np.ndarray],
+                          severities=None) -> list[VitalsReading]:
+    """
+    simulate_vitals for many patients at once.
+
+    Args:
+        patient_ids: Patient identifiers
+        baselines: SIM_COLUMNS vital -> baseline array aligned with patient_ids
+                   (e.g. patient_store.BASELINE_COLUMNS)
+        severities: Severity per patient (0/1/2). If None, uses stored severities.
+
+    Returns:
+        One VitalsReading per patient. Readings younger than LATEST_READING_TTL_S
+        are reused as in simulate_vitals; the rest share one (6, N) noise draw
+        and are stored with a single lock acquisition.
+    """
+    if severities is None:
+        severities = [_patient_severity.get(pid, 0) for pid in patient_ids]
+    severities = np.asarray(severities, dtype=np.intp)
+    sev_list = severities.tolist()
+
+    now = time.monotonic()
+    readings: list = [None] * len(patient_ids)
+    fresh = []
+    for i, (pid, severity) in enumerate(zip(patient_ids, sev_list)):
+        cached = _latest.get(pid)
+        if cached and cached[1] == severity and now - cached[0] < LATEST_READING_TTL_S:
+            readings[i] = cached[2]
+        else:
+            fresh.append(i)
+    if not fresh:
+        return readings
+
+    sev = severities[fresh]
+    base = np.stack([np.asarray(baselines[vital], dtype=float)[fresh] for vital in SIM_COLUMNS])
+    noise = _rng.standard_normal(base.shape)
+    values = np.round(np.clip(base + _SIM_DRIFT[:, sev] + _SIM_NOISE[:, sev] * noise, _SIM_LO, _SIM_HI), 1)
+
+    ts = datetime.now(timezone.utc).isoformat()
+    with STATE_LOCK:
+        for i, (hr, spo2, sbp, dbp, rr, temp) in zip(fresh, values.T.tolist()):
+            # Values are already clamped floats, so skip model validation
+            reading = VitalsReading.model_construct(
+                timestamp=ts, hr=hr, spo2=spo2, sbp=sbp, dbp=dbp, rr=rr, temp=temp)
+            pid = patient_ids[i]
+            ring = _vitals_rings.get(pid)
+            if ring is None:
+                ring = _vitals_rings[pid] = _VitalsRing()
+            ring.append(ts, (hr, spo2, rr, temp, sbp, dbp))
+            _latest[pid] = (now, sev_list[i], reading)
+            readings[i] = reading
+    return readings
+
+
+def get_vitals_history(patient_id: str) -> list[VitalsRow]:
     """Return stored vitals history for a patient (for trend chart)."""
-    return _vitals_history.get(patient_id, [])
+    with STATE_LOCK:
+        ring = _vitals_rings.get(patient_id)
+        if ring is None:
+            return []
+        rows = zip(ring.stamps, ring.view().tolist())
+        return [
+            {"timestamp": ts, "hr": hr, "spo2": spo2, "sbp": sbp, "dbp": dbp, "rr": rr, "temp": temp}
+            for ts, (hr, spo2, rr, temp, sbp, dbp) in rows
+        ]
+
+
+def get_vitals_matrix(patient_id: str) -> np.ndarray:
+    """
+    Return stored history as an oldest-to-newest (n, 5) array in VITAL_COLUMNS
+    order (for feature engineering). The array is a copy taken under STATE_LOCK,
+    so callers on worker threads never see a half-appended reading.
+    """
+    with STATE_LOCK:
+        ring = _vitals_rings.get(patient_id)
+        if ring is None:
+            return np.empty((0, len(VITAL_COLUMNS)))
+        return ring.view()[:, :len(VITAL_COLUMNS)].copy()
+
+
+def clear_vitals_history(patient_id: str):
+    """Drop all stored readings for a patient."""
+    with STATE_LOCK:
+        _vitals_rings.pop(patient_id, None)
+        _latest.pop(patient_id, None)
+
+
+def reset_patients(severities: dict[str, int]):
+    """Set severities and drop stored readings for several patients in one locked update."""
+    with STATE_LOCK:
+        _patient_severity.update(severities)
+        for pid in severities:
+            _vitals_rings.pop(pid, None)
+            _latest.pop(pid, None)
@@ -35,6 +35,7 @@ export const suppressAlert = (alertId, reason) =>
 
 // ── Reports & Analytics ───────────────────────────────────────────────────────
 export const getReportsSummary = () => api.get('/reports/summary')
+export const getWardStability = () => api.get('/reports/ward-stability')
 
 // ── Crisis Simulation ─────────────────────────────────────────────────────────
 export const triggerSimulation = () => api.post('/simulation/trigger')
@@ -1,6 +1,7 @@
 /**
  * ReportsPage — VITALGUARD 2.0
- * ICU analytics: 7-day stress trend, alert distribution, patient risk breakdown, KPI cards.
+ * ICU analytics: 7-day stress trend, alert distribution, patient risk breakdown, KPI cards,
+ * ward multi-vital stability table.
  */
 import React, { useState, useEffect } from 'react'
 import { Line, Bar, Doughnut } from 'react-chartjs-2'
@@ -21,14 +22,25 @@ const CHART_DEFAULTS = {
     },
 }
 
+const STABILITY_BADGE = {
+    red: 'bg-red-500/15 text-red-400 border-red-500/20',
+    orange: 'bg-orange-500/15 text-orange-400 border-orange-500/20',
+    yellow: 'bg-yellow-500/15 text-yellow-400 border-yellow-500/20',
+    green: 'bg-green-500/15 text-green-400 border-green-500/20',
+}
+
 export default function ReportsPage() {
     const [data, setData] = useState(null)
+    const [ward, setWard] = useState([])
     const [loading, setLoading] = useState(true)
 
     useEffect(() => {
         api.get('/reports/summary')
             .then(r => { setData(r.data); setLoading(false) })
             .catch(e => { console.error(e); setLoading(false) })
+        api.get('/reports/ward-stability')
+            .then(r => setWard(r.data.patients))
+            .catch(e => console.error(e))
     }, [])
 
     if (loading) return (
@@ -136,6 +148,40 @@ export default function ReportsPage() {
                     </div>
                 </div>
             </div>
+
+            {/* Ward Stability */}
+            <div className="glass-card p-6 border">
+                <h3 className="text-sm font-bold text-white mb-1">Ward Stability — All Vitals</h3>
+                <p className="text-[11px] text-slate-500 mb-5">BP, HR, SpO₂, RR and Temp risk combined per bed, with 24h outlook</p>
+                <table className="w-full text-xs">
+                    <thead>
+                        <tr className="text-slate-500 text-left border-b border-slate-700/50">
+                            <th className="py-2 font-medium">Bed</th>
+                            <th className="py-2 font-medium">Patient</th>
+                            <th className="py-2 font-medium">Stability</th>
+                            <th className="py-2 font-medium">Status</th>
+                            <th className="py-2 font-medium">Deterioration 24h</th>
+                            <th className="py-2 font-medium">ICU Transfer</th>
+                            <th className="py-2 font-medium">Alerts</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {ward.map(p => (
+                            <tr key={p.patient_id} className="border-b border-slate-800/50 text-slate-300">
+                                <td className="py-2">{p.bed}</td>
+                                <td className="py-2">{p.patient_name}</td>
+                                <td className="py-2 font-bold text-white">{p.overall_stability_score}</td>
+                                <td className="py-2">
+                                    <span className={`px-2 py-0.5 rounded-full border ${STABILITY_BADGE[p.stability_color]}`}>{p.stability_status}</span>
+                                </td>
+                                <td className="py-2">{p.predictions.deterioration_24h}%</td>
+                                <td className="py-2">{p.predictions.icu_transfer_probability}%</td>
+                                <td className="py-2">{p.total_alerts}</td>
+                            </tr>
+                        ))}
+                    </tbody>
+                </table>
+            </div>
         </div>
     )
 }